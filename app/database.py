@@ -1,23 +1,146 @@
 # ===== PHASE 1: Project Setup =====
+# ===== PHASE 10: Performance & Scaling =====
 """
 Database connection setup.
 Structured for SQLite now, designed to scale to PostgreSQL later.
+A sync engine/session is kept for scripts and background threads; request
+handlers on the hot path use the async engine (aiosqlite / asyncpg).
+SQLite connections get WAL mode and tuned pragmas; other databases get a
+configurable connection pool.
+When slow-request logging is on, both engines time every statement into the
+current request's query log (see utils/profiling.py).
 """
 
-from sqlalchemy import create_engine
+import os
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 # SQLite for development - easy to swap to PostgreSQL
-DATABASE_URL = "sqlite:///./smartqr.db"
+DATABASE_URL = os.environ.get("SMARTQR_DATABASE_URL", "sqlite:///./smartqr.db")
+
+# Async drivers used when SMARTQR_ASYNC_DATABASE_URL is not given explicitly
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def _to_async_url(url: str) -> str:
+    """Derive the async driver URL from a sync database URL."""
+    parsed = make_url(url)
+    driver = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        return url
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.environ.get("SMARTQR_ASYNC_DATABASE_URL", _to_async_url(DATABASE_URL))
+
+_is_sqlite = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+# SQLite pragmas applied to every new connection (sync and async engines)
+SQLITE_JOURNAL_MODE = os.environ.get("SMARTQR_SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.environ.get("SMARTQR_SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_CACHE_SIZE_KB = int(os.environ.get("SMARTQR_SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SMARTQR_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Connection pool for server databases (PostgreSQL); SQLite keeps SQLAlchemy's defaults
+DB_POOL_SIZE = int(os.environ.get("SMARTQR_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("SMARTQR_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("SMARTQR_DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("SMARTQR_DB_POOL_RECYCLE", "1800"))
+
+# Requests slower than this (ms) are logged with their SQL; 0 disables statement timing
+SLOW_REQUEST_MS = float(os.environ.get("SMARTQR_SLOW_REQUEST_MS", "0"))
+SLOW_REQUEST_MAX_QUERIES = int(os.environ.get("SMARTQR_SLOW_REQUEST_MAX_QUERIES", "50"))
+
+
+def _engine_options(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False}}  # SQLite-specific
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        # WAL lets the redirect path read while the scan writer commits
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+    finally:
+        cursor.close()
+
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # SQLite-specific
-)
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+if _is_sqlite:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+if make_url(ASYNC_DATABASE_URL).get_backend_name() == "sqlite":
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Statements of the current request: {"queries": [(sql, ms), ...], "count": n, "total_ms": t};
+# None outside a traced request. Threadpool handlers and run_sync inherit the request's
+# context, so they record into the same dict.
+query_log: ContextVar[dict | None] = ContextVar("smartqr_query_log", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    # Kept on the execution context (not the connection), so a statement that raises leaves nothing behind
+    if context is not None and query_log.get() is not None:
+        context._smartqr_query_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    log = query_log.get()
+    started = getattr(context, "_smartqr_query_start", None)
+    if log is None or started is None:
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    log["count"] += 1
+    log["total_ms"] += elapsed_ms
+    if len(log["queries"]) < SLOW_REQUEST_MAX_QUERIES:
+        log["queries"].append((statement, elapsed_ms))
+
+
+if SLOW_REQUEST_MS > 0:
+    for _engine in (engine, async_engine.sync_engine):
+        event.listen(_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def pool_status() -> dict:
+    """Connection counts per engine: size, checked_in, checked_out, overflow (pools that track them)."""
+    status = {}
+    for label, pool in (("sync", engine.pool), ("async", async_engine.sync_engine.pool)):
+        counts = {}
+        for name in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, name, None)
+            if method is not None:
+                counts[name.replace("checked", "checked_")] = method()
+        if "overflow" in counts:
+            counts["overflow"] = max(0, counts["overflow"])  # SQLAlchemy counts up from -size
+        status[label] = {"pool": type(pool).__name__, **counts}
+    return status
+
 
 def get_db():
     """Dependency for FastAPI routes - yields database session."""
@@ -26,3 +149,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """Dependency for async FastAPI routes - yields an AsyncSession."""
+    async with AsyncSessionLocal() as db:
+        yield db
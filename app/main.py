@@ -7,51 +7,146 @@
 # ===== PHASE 7: QR Templates =====
 # ===== PHASE 8: Web Interface =====
 # ===== PHASE 9: REST API =====
+# ===== PHASE 10: Performance & Scaling =====
 """
 SmartQR - Dynamic QR Code Management Platform
 FastAPI application entry point.
+
+create_app(profile) builds the app; `app` is built at import for the profile in
+SMARTQR_APP_PROFILE:
+  full      every route (default)
+  redirect  /r/{id} with scan tracking, plus /metrics and /admin: for workers that only
+            serve scans, without the API, the web UI or the render pool
+Route modules are imported only for the selected profile. The render pool and page
+templates are warmed up on a background thread after startup (SMARTQR_WARM_UP=0 skips it).
 """
 
+import asyncio
+import logging
+import os
+import threading
+import time
 from contextlib import asynccontextmanager
 from pathlib import Path
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
+from starlette.concurrency import run_in_threadpool
+
+from app.database import SLOW_REQUEST_MS, SessionLocal, async_engine
+from app.migrations import AUTO_MIGRATE, upgrade_database, verify_schema
+from app.services.live_feed import scan_broadcaster
+from app.services.render_service import render_service
+from app.services.retention_service import partition_maintainer
+from app.services.rollup_service import ensure_rollups_backfilled
+from app.services.tracking_service import scan_writer
+from app.utils.metrics import METRICS_ENABLED, MetricsMiddleware
+from app.utils.peer_bus import peer_bus
+from app.utils.profiling import TRACEMALLOC_AT_STARTUP, SlowRequestMiddleware, start_tracemalloc
+
+import app.models  # noqa: F401 - register models with Base
+
+logger = logging.getLogger(__name__)
+
+APP_PROFILE = os.environ.get("SMARTQR_APP_PROFILE", "full")
+WARM_UP = os.environ.get("SMARTQR_WARM_UP", "1") == "1"
 
-from app.database import Base, engine
-from app.routes import analytics_routes, api_routes, qr_routes, redirect_routes, web_routes
+# Profile -> route modules (app/routes/*) included, in order
+APP_PROFILES = {
+    "full": (
+        "qr_routes",
+        "api_routes",
+        "redirect_routes",
+        "analytics_routes",
+        "web_routes",
+        "metrics_routes",
+        "admin_routes",
+    ),
+    "redirect": ("redirect_routes", "metrics_routes", "admin_routes"),
+}
 
-import app.models  # noqa: F401 - register models with Base before create_all
+
+def _warm_up(profile: str) -> None:
+    """Load what the first image or page request would otherwise wait for."""
+    from app.routes.web_routes import preload_templates
+
+    started = time.perf_counter()
+    try:
+        warmed = render_service.warm_up()
+        pages = preload_templates()
+    except Exception:  # noqa: BLE001 - a cold first request is the only cost
+        logger.exception("Background warm-up failed")
+        return
+    logger.info(
+        "Warm-up (%s): %d render processes, %d templates in %.0f ms",
+        profile, warmed, pages, (time.perf_counter() - started) * 1000,
+    )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Create database tables on startup."""
-    Base.metadata.create_all(bind=engine)
+    """Check the schema version, start the scan writer, live feed and peer bus and the render pool; drain them on shutdown."""
+    profile = app.state.profile
+    if TRACEMALLOC_AT_STARTUP:
+        start_tracemalloc()
+    if AUTO_MIGRATE:
+        await run_in_threadpool(upgrade_database)
+    verify_schema()
+    with SessionLocal() as db:
+        ensure_rollups_backfilled(db)
+    scan_broadcaster.attach(asyncio.get_running_loop())
+    peer_bus.start()
+    scan_writer.start()
+    partition_maintainer.start()
+    if profile == "full":
+        await run_in_threadpool(render_service.start, False)
+        if WARM_UP:
+            threading.Thread(target=_warm_up, args=(profile,), name="warm-up", daemon=True).start()
     yield
-    # shutdown logic if needed
+    partition_maintainer.stop()
+    scan_writer.stop()
+    peer_bus.stop()
+    scan_broadcaster.detach()
+    render_service.stop()
+    await async_engine.dispose()
+
+
+def create_app(profile: str = APP_PROFILE) -> FastAPI:
+    """Build the application with the routes of one profile (see APP_PROFILES)."""
+    if profile not in APP_PROFILES:
+        raise ValueError(f"unknown app profile {profile!r} (choose from {', '.join(APP_PROFILES)})")
+    application = FastAPI(
+        title="SmartQR",
+        description="Dynamic QR Code Management Platform",
+        version="0.1.0",
+        lifespan=lifespan,
+    )
+    application.state.profile = profile
 
+    for name in APP_PROFILES[profile]:
+        # __import__ rather than importlib.import_module: only the former shows up in -X importtime
+        module = __import__(f"app.routes.{name}", fromlist=["router"])
+        application.include_router(module.router)
 
-app = FastAPI(
-    title="SmartQR",
-    description="Dynamic QR Code Management Platform",
-    version="0.1.0",
-    lifespan=lifespan,
-)
+    # Per-route latency histograms and slow-request SQL logs; not installed at all when off
+    if METRICS_ENABLED:
+        application.add_middleware(MetricsMiddleware)
+    if SLOW_REQUEST_MS > 0:
+        application.add_middleware(SlowRequestMiddleware)
 
+    if profile == "full":
+        # Serve generated QR images
+        static_dir = Path(__file__).resolve().parent.parent / "static"
+        application.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
-app.include_router(qr_routes.router)
-app.include_router(api_routes.router)
-app.include_router(redirect_routes.router)
-app.include_router(analytics_routes.router)
-app.include_router(web_routes.router)
+    @application.get("/")
+    def root():
+        """Health check / root endpoint."""
+        if profile != "full":
+            return {"status": "SmartQR Running", "profile": profile}
+        return {"status": "SmartQR Running", "dashboard": "/dashboard", "docs": "/docs"}
 
-# Serve generated QR images
-static_dir = Path(__file__).resolve().parent.parent / "static"
-app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+    return application
 
 
-@app.get("/")
-def root():
-    """Health check / root endpoint."""
-    return {"status": "SmartQR Running", "dashboard": "/dashboard", "docs": "/docs"}
+app = create_app()
@@ -0,0 +1,58 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Schema versioning with Alembic (revisions live in migrations/versions/).
+Startup only compares the database's alembic_version with the newest revision;
+upgrades are applied explicitly with `python run.py db upgrade`, by `python run.py`
+before serving, or at startup when SMARTQR_AUTO_MIGRATE=1.
+"""
+
+import os
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from app.database import engine
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+AUTO_MIGRATE = os.environ.get("SMARTQR_AUTO_MIGRATE", "0") == "1"
+
+
+class SchemaVersionError(RuntimeError):
+    """The database is not at the schema revision this code expects."""
+
+
+def alembic_config() -> Config:
+    return Config(str(ALEMBIC_INI))
+
+
+def head_revision() -> str:
+    """Newest revision in migrations/versions/."""
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def current_revision(bind=None) -> str | None:
+    """Revision recorded in the database (None for an empty or unversioned database)."""
+    with (bind or engine).connect() as conn:
+        return MigrationContext.configure(conn).get_current_revision()
+
+
+def upgrade_database(revision: str = "head") -> None:
+    command.upgrade(alembic_config(), revision)
+
+
+def downgrade_database(revision: str) -> None:
+    command.downgrade(alembic_config(), revision)
+
+
+def verify_schema(bind=None) -> str:
+    """Raise SchemaVersionError unless the database is at the head revision. Returns it."""
+    current, head = current_revision(bind), head_revision()
+    if current != head:
+        raise SchemaVersionError(
+            f"database schema is at revision {current or 'none'}, expected {head}; "
+            "run `python run.py db upgrade` (or set SMARTQR_AUTO_MIGRATE=1)"
+        )
+    return head
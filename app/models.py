@@ -1,14 +1,18 @@
 # ===== PHASE 2: Database Models =====
+# ===== PHASE 10: Performance & Scaling =====
 """
 SQLAlchemy models for QR codes and scan tracking.
+Scan rollup tables hold per-day counters and HyperLogLog visitor sketches
+maintained at ingestion time; scan_partitions catalogs monthly raw-event partitions.
 """
 
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text
+from sqlalchemy import BigInteger, Column, Date, Index, Integer, LargeBinary, String, DateTime, ForeignKey, Text
 from sqlalchemy.orm import relationship
 
 from app.database import Base
+from app.utils.scan_codes import CountryCode, DeviceCode, PackedIP
 
 
 class QRCode(Base):
@@ -18,22 +22,94 @@ class QRCode(Base):
     name = Column(String(255), nullable=False)
     original_data = Column(Text, nullable=False)
     redirect_url = Column(Text, nullable=True)
+    encoded_data = Column(Text, nullable=True)  # payload inside the QR image (NULL for rows created before it was stored)
     fill_color = Column(String(50), default="black")
     back_color = Column(String(50), default="white")
     logo_path = Column(String(500), nullable=True)
+    campaign = Column(String(100), nullable=True)  # free-form tag for cross-QR analytics
     created_at = Column(DateTime, default=datetime.utcnow)
 
     scan_events = relationship("ScanEvent", back_populates="qr_code", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Keyset pagination on the dashboard (newest first)
+        Index("ix_qrcodes_created_at_id", "created_at", "id"),
+        Index("ix_qrcodes_campaign", "campaign"),
+    )
+
 
 class ScanEvent(Base):
+    # Partitioned by month: natively on PostgreSQL, by rotating closed months into
+    # scan_events_YYYYMM tables on SQLite (see services/partition_service.py)
+    # Stored compactly (see utils/scan_codes.py): integer ids, binary IPs and small-integer
+    # device/country codes; attributes still read and write strings
     __tablename__ = "scan_events"
 
-    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
     qr_id = Column(String(36), ForeignKey("qrcodes.id", ondelete="CASCADE"), nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
-    ip_address = Column(String(45), nullable=True)
-    country = Column(String(100), nullable=True)
-    device_type = Column(String(100), nullable=True)
+    ip_address = Column(PackedIP, nullable=True)
+    country = Column(CountryCode, nullable=True)
+    device_type = Column(DeviceCode, nullable=True)
 
     qr_code = relationship("QRCode", back_populates="scan_events")
+
+    __table_args__ = (
+        # Per-QR time ranges (rollup rebuilds, raw event reads) and exact unique-visitor counts
+        Index("ix_scan_events_qr_id_timestamp", "qr_id", "timestamp"),
+        Index("ix_scan_events_qr_id_ip_address", "qr_id", "ip_address"),
+        # Partition rotation and retention select whole months
+        Index("ix_scan_events_timestamp", "timestamp"),
+    )
+
+
+class ScanDailyRollup(Base):
+    __tablename__ = "scan_daily_rollups"
+
+    qr_id = Column(String(36), ForeignKey("qrcodes.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    scans = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Leaderboards over a date window across all QRs (covering: no table lookups)
+        Index("ix_scan_daily_rollups_day_qr_id_scans", "day", "qr_id", "scans"),
+    )
+
+
+class ScanDeviceRollup(Base):
+    __tablename__ = "scan_device_rollups"
+
+    qr_id = Column(String(36), ForeignKey("qrcodes.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    device_type = Column(String(100), primary_key=True)
+    scans = Column(Integer, nullable=False, default=0)
+
+
+class ScanCountryRollup(Base):
+    __tablename__ = "scan_country_rollups"
+
+    qr_id = Column(String(36), ForeignKey("qrcodes.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    country = Column(String(100), primary_key=True)
+    scans = Column(Integer, nullable=False, default=0)
+
+
+class ScanVisitorSketch(Base):
+    __tablename__ = "scan_visitor_sketches"
+
+    qr_id = Column(String(36), ForeignKey("qrcodes.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    registers = Column(LargeBinary, nullable=False)  # serialized HyperLogLog (see utils/hll.py)
+
+
+class ScanPartition(Base):
+    # Catalog of monthly scan_events partitions (rotated tables on SQLite, native partitions on PostgreSQL)
+    __tablename__ = "scan_partitions"
+
+    name = Column(String(64), primary_key=True)
+    month = Column(Date, nullable=False, unique=True)  # first day of the month
+    status = Column(String(16), nullable=False, default="active")  # active | archived
+    row_count = Column(Integer, nullable=True)
+    archive_path = Column(Text, nullable=True)  # NULL when dropped without an archive
+    created_at = Column(DateTime, default=datetime.utcnow)
+    archived_at = Column(DateTime, nullable=True)
@@ -0,0 +1,107 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Admin diagnostics: /admin/profile/*, /admin/slow-requests.
+Disabled (404) unless SMARTQR_ADMIN_TOKEN is set; requests must then send the token
+as `Authorization: Bearer <token>` or `X-Admin-Token`. Each call profiles the worker
+process that serves it (its pid is in the file name and X-Worker-Pid).
+"""
+
+import asyncio
+import hmac
+import os
+import time
+import tracemalloc
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response
+
+from app.utils.profiling import (
+    PROFILE_MAX_SECONDS,
+    ProfilerBusyError,
+    dump_stacks,
+    memory_report,
+    memory_snapshot,
+    sample_cpu,
+    slow_requests,
+    snapshot_bytes,
+)
+
+ADMIN_TOKEN = os.environ.get("SMARTQR_ADMIN_TOKEN", "")
+
+
+def require_admin(request: Request) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("X-Admin-Token", "")
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        supplied = authorization[7:].strip()
+    if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)], include_in_schema=False)
+
+
+def _download(content: bytes | str, kind: str, extension: str, media_type: str, **headers) -> Response:
+    pid = os.getpid()
+    filename = f"smartqr-{kind}-{pid}-{time.strftime('%Y%m%dT%H%M%S')}.{extension}"
+    return Response(
+        content=content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Worker-Pid": str(pid), **headers},
+    )
+
+
+@router.get("/profile/cpu")
+async def cpu_profile(
+    seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+):
+    """Sample all threads for `seconds`; folded stacks for flamegraph.pl or speedscope."""
+    try:
+        folded, samples = await asyncio.to_thread(sample_cpu, seconds, interval_ms / 1000)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _download(folded, "cpu", "folded", "text/plain; charset=utf-8", **{"X-Profile-Samples": str(samples)})
+
+
+@router.get("/profile/stacks")
+def thread_stacks():
+    """Stack trace of every thread in this worker, right now."""
+    return _download(dump_stacks(), "stacks", "txt", "text/plain; charset=utf-8")
+
+
+@router.get("/profile/memory")
+async def memory_profile(
+    seconds: float = Query(10.0, ge=0, le=PROFILE_MAX_SECONDS, description="Tracing window when tracemalloc is off"),
+    limit: int = Query(30, ge=1, le=1000),
+    key: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    diff: bool = Query(False, description="Report growth since the previous snapshot"),
+    fmt: str = Query("text", alias="format", pattern="^(text|snapshot)$"),
+):
+    """tracemalloc snapshot: a top-allocations report, or the raw dump (format=snapshot)."""
+    try:
+        snapshot, previous, was_tracing = await asyncio.to_thread(
+            memory_snapshot, 0 if tracemalloc.is_tracing() else seconds
+        )
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    headers = {"X-Tracemalloc": "continuous" if was_tracing else f"window={seconds}s"}
+    if fmt == "snapshot":
+        content = await asyncio.to_thread(snapshot_bytes, snapshot)
+        return _download(content, "memory", "tracemalloc", "application/octet-stream", **headers)
+    report = await asyncio.to_thread(memory_report, snapshot, previous, limit, key, diff)
+    return _download(report, "memory", "txt", "text/plain; charset=utf-8", **headers)
+
+
+@router.get("/slow-requests")
+def recent_slow_requests():
+    """Requests over SMARTQR_SLOW_REQUEST_MS kept in this worker, with their SQL."""
+    return {
+        "enabled": slow_requests.enabled,
+        "threshold_ms": slow_requests.threshold_ms,
+        "logged": slow_requests.logged,
+        "pid": os.getpid(),
+        "requests": slow_requests.recent(),
+    }
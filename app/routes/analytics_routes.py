@@ -1,25 +1,119 @@
 # ===== PHASE 5: Scan Analytics Backend =====
+# ===== PHASE 10: Performance & Scaling =====
 """
-Analytics routes: stats per QR code.
+Analytics routes: stats per QR code, and a server-sent events feed of live scan counts.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import json
 
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import AsyncSessionLocal, get_async_db
 from app.models import QRCode
-from app.utils.analytics import get_all_stats
+from app.services.live_feed import (
+    LIVE_HEARTBEAT,
+    LIVE_MIN_INTERVAL,
+    TooManySubscribersError,
+    scan_broadcaster,
+)
+from app.utils.analytics import (
+    DEFAULT_MAX_POINTS,
+    DEFAULT_UNIQUE_MODE,
+    get_all_stats,
+    get_total_scans,
+    parse_stats_range,
+)
 
 router = APIRouter(tags=["analytics"])
 
 
 @router.get("/qr/{qr_id}/stats")
-def get_qr_stats(
+async def get_qr_stats(
     qr_id: str,
-    db: Session = Depends(get_db),
+    unique: str = Query(DEFAULT_UNIQUE_MODE, pattern="^(exact|approx)$"),
+    from_: str | None = Query(None, alias="from", description="Start (YYYY-MM-DD or ISO datetime), inclusive"),
+    to: str | None = Query(None, description="End (YYYY-MM-DD or ISO datetime), exclusive"),
+    granularity: str = Query("day", pattern="^(hour|day|week|month)$"),
+    tz: str = Query("UTC", description="IANA time zone for bucketing and naive bounds"),
+    max_points: int = Query(DEFAULT_MAX_POINTS, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    """Return analytics for a QR code: total scans, scans per day, unique vs repeat."""
-    qr = db.query(QRCode).filter(QRCode.id == qr_id).first()
+    """
+    Return analytics for a QR code: total scans, scans per day, unique vs repeat.
+    unique=approx estimates visitors from HyperLogLog sketches instead of scanning raw events.
+    from/to/granularity/tz limit the range and shape the bucketed `series` (max_points buckets).
+    """
+    qr = await db.get(QRCode, qr_id)
     if not qr:
         raise HTTPException(status_code=404, detail="QR code not found")
-    return get_all_stats(db, qr_id)
+    try:
+        rng = parse_stats_range(from_, to, granularity, tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await db.run_sync(get_all_stats, qr_id, unique, rng, max_points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+async def _read_total(qr_id: str) -> int:
+    async with AsyncSessionLocal() as db:
+        return await db.run_sync(get_total_scans, qr_id)
+
+
+@router.get("/qr/{qr_id}/live")
+async def live_qr_stats(qr_id: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Server-sent events: a `snapshot` with the current total, then a `scans` event with the
+    new scans (count, devices, countries, running total) at most every SMARTQR_LIVE_MIN_INTERVAL
+    seconds while scans arrive. Comment lines keep idle connections open.
+    The first `scans` event re-reads the total: scans committed between subscribing and
+    the snapshot read are both in the snapshot and in that first delta.
+    """
+    qr = await db.get(QRCode, qr_id)
+    if not qr:
+        raise HTTPException(status_code=404, detail="QR code not found")
+    try:
+        sub = scan_broadcaster.subscribe(qr_id)
+    except TooManySubscribersError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    # Subscribe before reading the total so no scan is missed (the first delta may repeat some)
+    try:
+        total = await db.run_sync(get_total_scans, qr_id)
+    except BaseException:
+        scan_broadcaster.unsubscribe(sub)
+        raise
+    await db.close()  # release the connection; the stream can stay open for hours
+
+    async def events():
+        running = total
+        reconciled = False
+        try:
+            yield _sse("snapshot", {"qr_id": qr_id, "total_scans": running})
+            while not await request.is_disconnected():
+                delta = await sub.next(timeout=LIVE_HEARTBEAT)
+                if delta is None:
+                    yield b": keep-alive\n\n"
+                    continue
+                if reconciled:
+                    running += delta["scans"]
+                else:
+                    running = await _read_total(qr_id)
+                    reconciled = True
+                yield _sse("scans", {"qr_id": qr_id, "total_scans": running, **delta})
+                await asyncio.sleep(LIVE_MIN_INTERVAL)  # coalesce bursts into one event
+        finally:
+            scan_broadcaster.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,16 +1,41 @@
 # ===== PHASE 9: REST API =====
+# ===== PHASE 10: Performance & Scaling =====
 """
 Public REST API for QR generation and analytics.
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+import json
+from datetime import date, datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_async_db, get_db, pool_status
 from app.models import QRCode
-from app.services.qr_service import create_qr
-from app.utils.analytics import get_all_stats
+from app.services.aggregate_service import aggregate_cache, aggregate_stats, top_qr_codes
+from app.services.bulk_service import (
+    BULK_CONCURRENCY,
+    BulkInputError,
+    bulk_create,
+    detect_format,
+    parse_items,
+    text_lines,
+)
+from app.services.event_export_service import EventFilter, parse_cursor, stream_events
+from app.services.export_service import ExportFilter, stream_pdf, stream_zip
+from app.services.live_feed import scan_broadcaster
+from app.services.qr_service import PRERENDER_ON_CREATE, create_qr, image_url
+from app.services.redirect_cache import redirect_cache
+from app.services.render_service import render_service
+from app.services.retention_service import partition_maintainer
+from app.services.tracking_service import scan_writer
+from app.utils.logo_cache import logo_cache
+from app.utils.peer_bus import peer_bus
+from app.utils.qr_generator import render_cache
+from app.utils.analytics import DEFAULT_MAX_POINTS, DEFAULT_UNIQUE_MODE, get_all_stats, parse_stats_range
 
 router = APIRouter(prefix="/api", tags=["api"])
 
@@ -22,6 +47,7 @@ class CreateQRBody(BaseModel):
     fill_color: str | None = "black"
     back_color: str | None = "white"
     logo_path: str | None = None
+    campaign: str | None = Field(None, max_length=100, description="Tag for cross-QR analytics")
 
 
 @router.post("/qr")
@@ -29,23 +55,101 @@ def api_create_qr(body: CreateQRBody, db: Session = Depends(get_db)):
     """Create a new QR code. Returns JSON with id, image_url, redirect_url."""
     if not body.data.strip():
         raise HTTPException(status_code=400, detail="data cannot be empty")
-    qr = create_qr(
-        db=db,
-        name=body.name,
-        original_data=body.data,
-        redirect_url=body.redirect_url,
-        fill_color=body.fill_color or "black",
-        back_color=body.back_color or "white",
-        logo_path=body.logo_path,
-    )
+    try:
+        qr = create_qr(
+            db=db,
+            name=body.name,
+            original_data=body.data,
+            redirect_url=body.redirect_url,
+            fill_color=body.fill_color or "black",
+            back_color=body.back_color or "white",
+            logo_path=body.logo_path,
+            campaign=body.campaign or None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
     return {
         "id": qr.id,
         "name": qr.name,
-        "image_url": f"/static/qrcodes/{qr.id}.png",
+        "image_url": image_url(qr.id),
         "redirect_url": f"/r/{qr.id}",
     }
 
 
+class ExportBody(BaseModel):
+    ids: list[str] | None = Field(None, description="Export exactly these codes (in this order)")
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+    name_contains: str | None = None
+    limit: int | None = Field(None, ge=1)
+    format: str = Field("zip", pattern="^(zip|pdf)$")
+    image_format: str = Field("png", pattern="^(png|webp|svg)$", description="Image type inside a ZIP")
+    size: int | None = Field(None, ge=64, le=4096, description="Image width/height in pixels")
+    page: str = Field("a4", pattern="^(a4|letter)$")
+    columns: int = Field(4, ge=1, le=12)
+    rows: int = Field(6, ge=1, le=16)
+
+
+@router.post("/qr/bulk")
+async def api_bulk_create_qr(
+    request: Request,
+    fmt: str | None = Query(None, alias="format", pattern="^(json|ndjson|csv)$"),
+    prerender: bool = Query(PRERENDER_ON_CREATE, description="Render each PNG into the render cache"),
+    concurrency: int = Query(BULK_CONCURRENCY, ge=1, le=64, description="Max renders in flight"),
+):
+    """
+    Create many QR codes from a JSON array, NDJSON or CSV body (or a multipart `file` upload).
+    Streams one NDJSON result per item ({index, ok, id | error}) and a final {summary} line.
+    """
+    content_type = request.headers.get("content-type", "")
+    filename = None
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="multipart body must include a 'file' field")
+        content, content_type, filename = await upload.read(), upload.content_type, upload.filename
+    else:
+        content = await request.body()
+    try:
+        items = parse_items(fmt or detect_format(content_type, filename), text_lines(content))
+    except BulkInputError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    async def results():
+        async for result in bulk_create(items, prerender=prerender, concurrency=concurrency):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.post("/qr/export")
+async def api_export_qr(body: ExportBody):
+    """
+    Stream rendered codes selected by id list or filter as a ZIP (images + manifest.csv)
+    or a multi-up PDF print sheet. Nothing is buffered as a whole, so exports of any size are safe.
+    """
+    flt = ExportFilter(
+        ids=body.ids,
+        created_from=body.created_from,
+        created_to=body.created_to,
+        name_contains=body.name_contains,
+        limit=body.limit,
+    )
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    if body.format == "pdf":
+        content = stream_pdf(flt, page=body.page, columns=body.columns, rows_per_page=body.rows, size=body.size or 600)
+        media_type = "application/pdf"
+    else:
+        content = stream_zip(flt, fmt=body.image_format, size=body.size)
+        media_type = "application/zip"
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="smartqr-export-{stamp}.{body.format}"'},
+    )
+
+
 @router.get("/qr/{qr_id}")
 def api_get_qr(qr_id: str, db: Session = Depends(get_db)):
     """Get QR code details by ID."""
@@ -60,15 +164,142 @@ def api_get_qr(qr_id: str, db: Session = Depends(get_db)):
         "fill_color": qr.fill_color,
         "back_color": qr.back_color,
         "logo_path": qr.logo_path,
+        "campaign": qr.campaign,
         "created_at": qr.created_at.isoformat() if qr.created_at else None,
-        "image_url": f"/static/qrcodes/{qr.id}.png",
+        "image_url": image_url(qr.id),
     }
 
 
 @router.get("/qr/{qr_id}/stats")
-def api_get_qr_stats(qr_id: str, db: Session = Depends(get_db)):
-    """Get analytics for a QR code."""
-    qr = db.query(QRCode).filter(QRCode.id == qr_id).first()
+async def api_get_qr_stats(
+    qr_id: str,
+    unique: str = Query(DEFAULT_UNIQUE_MODE, pattern="^(exact|approx)$"),
+    from_: str | None = Query(None, alias="from", description="Start (YYYY-MM-DD or ISO datetime), inclusive"),
+    to: str | None = Query(None, description="End (YYYY-MM-DD or ISO datetime), exclusive"),
+    granularity: str = Query("day", pattern="^(hour|day|week|month)$"),
+    tz: str = Query("UTC", description="IANA time zone for bucketing and naive bounds"),
+    max_points: int = Query(DEFAULT_MAX_POINTS, ge=1, le=10000),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Get analytics for a QR code. unique=exact|approx selects the unique-visitor counter."""
+    qr = await db.get(QRCode, qr_id)
     if not qr:
         raise HTTPException(status_code=404, detail="QR code not found")
-    return get_all_stats(db, qr_id)
+    try:
+        rng = parse_stats_range(from_, to, granularity, tz)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return await db.run_sync(get_all_stats, qr_id, unique, rng, max_points)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+_EVENT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _events_response(flt_args: dict, after: str | None, fmt: str, gzip: bool, filename: str) -> StreamingResponse:
+    try:
+        rng = parse_stats_range(flt_args.pop("from_"), flt_args.pop("to"))
+        flt = EventFilter(start=rng.start, end=rng.end, after=parse_cursor(after) if after else None, **flt_args)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filename = f"{filename}.{fmt}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        stream_events(flt, fmt, gzip),
+        media_type="application/gzip" if gzip else _EVENT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/qr/{qr_id}/events")
+async def api_qr_events(
+    qr_id: str,
+    from_: str | None = Query(None, alias="from", description="Start (YYYY-MM-DD or ISO datetime, UTC), inclusive"),
+    to: str | None = Query(None, description="End (YYYY-MM-DD or ISO datetime, UTC), exclusive"),
+    after: str | None = Query(None, description="Resume after '<timestamp>,<id>' of the last row received"),
+    limit: int | None = Query(None, ge=1),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Stream one QR's raw scan events in (timestamp, id) order."""
+    if not await db.get(QRCode, qr_id):
+        raise HTTPException(status_code=404, detail="QR code not found")
+    args = {"qr_id": qr_id, "from_": from_, "to": to, "limit": limit}
+    return _events_response(args, after, format, gzip, f"scan-events-{qr_id}")
+
+
+@router.get("/events")
+async def api_export_events(
+    from_: str | None = Query(None, alias="from", description="Start (YYYY-MM-DD or ISO datetime, UTC), inclusive"),
+    to: str | None = Query(None, description="End (YYYY-MM-DD or ISO datetime, UTC), exclusive"),
+    after: str | None = Query(None, description="Resume after '<timestamp>,<id>' of the last row received"),
+    limit: int | None = Query(None, ge=1),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+):
+    """Stream raw scan events of every QR in (timestamp, id) order (bulk warehouse export)."""
+    return _events_response({"from_": from_, "to": to, "limit": limit}, after, format, gzip, "scan-events")
+
+
+class AggregateBody(BaseModel):
+    ids: list[str] | None = Field(None, description="Aggregate exactly these codes")
+    campaign: str | None = None
+    from_: date | None = Field(None, alias="from", description="First UTC day (inclusive)")
+    to: date | None = Field(None, description="Last UTC day (exclusive)")
+
+
+def _aggregate_sync(db: Session, body: AggregateBody) -> dict:
+    return aggregate_stats(db, ids=body.ids, campaign=body.campaign, start=body.from_, end=body.to)
+
+
+@router.get("/analytics/top")
+async def api_top_qr_codes(
+    from_: date | None = Query(None, alias="from", description="First UTC day (inclusive)"),
+    to: date | None = Query(None, description="Last UTC day (exclusive)"),
+    limit: int = Query(10, ge=1, le=1000),
+    campaign: str | None = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Leaderboard: codes with the most scans in the window, from the daily rollups."""
+    return await db.run_sync(top_qr_codes, from_, to, limit, campaign)
+
+
+@router.get("/analytics/aggregate")
+async def api_aggregate_campaign(
+    campaign: str | None = None,
+    from_: date | None = Query(None, alias="from", description="First UTC day (inclusive)"),
+    to: date | None = Query(None, description="Last UTC day (exclusive)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Totals, scans per day and device/country breakdowns for a campaign (or every code)."""
+    return await db.run_sync(_aggregate_sync, AggregateBody(campaign=campaign, **{"from": from_}, to=to))
+
+
+@router.post("/analytics/aggregate")
+async def api_aggregate_ids(body: AggregateBody, db: AsyncSession = Depends(get_async_db)):
+    """Same as GET /api/analytics/aggregate for an explicit id list (or a campaign)."""
+    if body.ids is not None and body.campaign is not None:
+        raise HTTPException(status_code=400, detail="give either ids or campaign, not both")
+    try:
+        return await db.run_sync(_aggregate_sync, body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/system/stats")
+def api_system_stats():
+    """Runtime counters for in-process caches and queues."""
+    return {
+        "redirect_cache": redirect_cache.stats(),
+        "scan_writer": scan_writer.stats(),
+        "render_cache": render_cache.stats(),
+        "render_pool": render_service.stats(),
+        "logo_cache": logo_cache.stats(),
+        "partitions": partition_maintainer.stats(),
+        "aggregate_cache": aggregate_cache.stats(),
+        "live_feed": scan_broadcaster.stats(),
+        "peer_bus": peer_bus.stats(),
+        "db_pool": pool_status(),
+    }
@@ -0,0 +1,69 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Prometheus scrape endpoint: /metrics (enabled with SMARTQR_METRICS=1).
+Request latency and stage timings are recorded as they happen (see utils/metrics);
+pool, queue and cache figures are read from their owners at scrape time.
+"""
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.database import pool_status
+from app.services.live_feed import scan_broadcaster
+from app.services.redirect_cache import redirect_cache
+from app.services.render_service import render_service
+from app.services.tracking_service import scan_writer
+from app.utils.metrics import METRICS_ENABLED, Gauge, registry
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _db_pool() -> dict:
+    return {
+        (engine, state): value
+        for engine, counts in pool_status().items()
+        for state, value in counts.items()
+        if state != "pool"
+    }
+
+
+def _scan_writer() -> dict:
+    stats = scan_writer.stats()
+    return {(): stats["queue_depth"]}
+
+
+def _render_pool() -> dict:
+    stats = render_service.stats()
+    return {("pending",): stats["pending"], ("workers",): stats["workers"]}
+
+
+def _redirect_cache(field: str):
+    return lambda: {(): redirect_cache.stats()[field]}
+
+
+registry.register(Gauge(
+    "smartqr_db_pool_connections", "Database pool connections by engine and state", ("engine", "state"), _db_pool
+))
+registry.register(Gauge("smartqr_scan_queue_depth", "Scans waiting for the background writer", (), _scan_writer))
+registry.register(Gauge("smartqr_render_pool", "Render pool pending tasks and workers", ("state",), _render_pool))
+registry.register(Gauge(
+    "smartqr_live_subscribers", "Open live scan feed connections", (),
+    lambda: {(): scan_broadcaster.stats()["subscribers"]},
+))
+registry.register(Gauge("smartqr_redirect_cache_entries", "Redirect targets cached", (), _redirect_cache("size")))
+registry.register(Gauge(
+    "smartqr_redirect_cache_hits_total", "Redirect cache hits", (), _redirect_cache("hits"), kind="counter"
+))
+registry.register(Gauge(
+    "smartqr_redirect_cache_misses_total", "Redirect cache misses", (), _redirect_cache("misses"), kind="counter"
+))
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of every registered metric."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (set SMARTQR_METRICS=1)")
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -1,20 +1,29 @@
 # ===== PHASE 3: Basic QR Generation =====
 # ===== PHASE 6: Styling Engine =====
 # ===== PHASE 7: QR Templates =====
+# ===== PHASE 10: Performance & Scaling =====
 """
-QR creation routes.
+QR creation routes and the on-demand image endpoint.
 """
 
+import os
 from datetime import datetime
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.services.qr_service import create_qr
+from app.database import get_async_db, get_db
+from app.models import QRCode
+from app.services.qr_service import create_qr, get_render_params, image_url
+from app.services.render_service import RenderBusyError, RenderTimeoutError, render_service
+from app.utils.qr_generator import IMAGE_FORMATS, render_cache_key
 from app.utils.qr_templates import format_calendar_event, format_vcard, format_wifi
 
+# Browser/CDN cache lifetime for rendered images; ETags allow cheap revalidation after that
+IMAGE_MAX_AGE = int(os.environ.get("SMARTQR_IMAGE_MAX_AGE", "86400"))
+
 
 router = APIRouter(prefix="/qr", tags=["qr"])
 
@@ -26,6 +35,7 @@ class CreateQRRequest(BaseModel):
     fill_color: str | None = "black"
     back_color: str | None = "white"
     logo_path: str | None = None
+    campaign: str | None = Field(None, max_length=100)
 
 
 class CreateTemplateQRRequest(BaseModel):
@@ -41,7 +51,7 @@ def _qr_response(qr):
     return {
         "id": qr.id,
         "name": qr.name,
-        "image_url": f"/static/qrcodes/{qr.id}.png",
+        "image_url": image_url(qr.id),
         "redirect_url": f"/r/{qr.id}" if qr.redirect_url else None,
     }
 
@@ -54,15 +64,19 @@ def create_qr_endpoint(
     """Create a new QR code and save to DB. Supports custom colors and optional logo."""
     if not request.data.strip():
         raise HTTPException(status_code=400, detail="Data cannot be empty")
-    qr = create_qr(
-        db=db,
-        name=request.name,
-        original_data=request.data,
-        redirect_url=request.redirect_url,
-        fill_color=request.fill_color or "black",
-        back_color=request.back_color or "white",
-        logo_path=request.logo_path,
-    )
+    try:
+        qr = create_qr(
+            db=db,
+            name=request.name,
+            original_data=request.data,
+            redirect_url=request.redirect_url,
+            fill_color=request.fill_color or "black",
+            back_color=request.back_color or "white",
+            logo_path=request.logo_path,
+            campaign=request.campaign or None,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
     return _qr_response(qr)
 
 
@@ -121,14 +135,55 @@ def create_template_qr_endpoint(
     else:
         raise HTTPException(status_code=400, detail="template_type must be wifi, vcard, or calendar")
 
-    qr = create_qr(
-        db=db,
-        name=request.name,
-        original_data=formatted,
-        redirect_url=formatted,
-        fill_color=request.fill_color or "black",
-        back_color=request.back_color or "white",
-        logo_path=request.logo_path,
-        use_redirect=False,
-    )
+    try:
+        qr = create_qr(
+            db=db,
+            name=request.name,
+            original_data=formatted,
+            redirect_url=formatted,
+            fill_color=request.fill_color or "black",
+            back_color=request.back_color or "white",
+            logo_path=request.logo_path,
+            use_redirect=False,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
     return _qr_response(qr)
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+@router.get("/{qr_id}/image")
+async def qr_image_endpoint(
+    qr_id: str,
+    request: Request,
+    fmt: str = Query("png", alias="format", pattern="^(png|webp|svg)$"),
+    size: int | None = Query(None, ge=64, le=4096, description="Target width/height in pixels"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Render a QR image on demand (PNG, WebP or SVG) with a strong ETag and Cache-Control."""
+    qr = await db.get(QRCode, qr_id)
+    if not qr:
+        raise HTTPException(status_code=404, detail="QR code not found")
+
+    params = get_render_params(qr)
+    etag = f'"{render_cache_key(**params, fmt=fmt, size=size)}"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={IMAGE_MAX_AGE}"}
+    if _etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        content = await render_service.render_async(**params, fmt=fmt, size=size)
+    except RenderBusyError as e:
+        raise HTTPException(status_code=503, detail="Renderer busy, retry shortly", headers={"Retry-After": "1"}) from e
+    except RenderTimeoutError as e:
+        raise HTTPException(status_code=504, detail="Render timed out") from e
+    except ValueError as e:
+        # Rows stored before colors were validated on create
+        raise HTTPException(status_code=422, detail=f"Cannot render this QR code: {e}") from e
+    return Response(content=content, media_type=IMAGE_FORMATS[fmt], headers=headers)
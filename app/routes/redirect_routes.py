@@ -1,15 +1,19 @@
 # ===== PHASE 4: Dynamic Redirect System =====
+# ===== PHASE 10: Performance & Scaling =====
 """
 Redirect routes: /r/{qr_id} fetches QR, logs scan, redirects.
+Redirect targets are served from an in-memory cache (see redirect_cache);
+the handler is async so the hot path never occupies a threadpool worker.
 """
 
 from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
-from app.models import QRCode
-from app.services.tracking_service import log_scan
+from app.database import get_async_db
+from app.services.redirect_cache import get_redirect_target_async
+from app.services.tracking_service import record_scan
+from app.utils.metrics import stage
 
 
 router = APIRouter(tags=["redirect"])
@@ -38,24 +42,25 @@ def _infer_device_type(user_agent: str | None) -> str | None:
 
 
 @router.get("/r/{qr_id}")
-def redirect_to_url(
+async def redirect_to_url(
     qr_id: str,
     request: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Fetch QR, log scan event, redirect to stored redirect_url."""
-    qr = db.query(QRCode).filter(QRCode.id == qr_id).first()
-    if not qr:
+    with stage("redirect.lookup"):
+        target = await get_redirect_target_async(db, qr_id)
+    if target is None:
         raise HTTPException(status_code=404, detail="QR code not found")
 
-    # Log scan event
+    # Log scan event (queued for the background writer)
     ip = _get_client_ip(request)
     ua = request.headers.get("User-Agent")
     device = _infer_device_type(ua)
-    log_scan(db, qr_id=qr_id, ip_address=ip, device_type=device)
+    with stage("redirect.record_scan"):
+        await record_scan(db, qr_id=qr_id, ip_address=ip, device_type=device)
 
     # Redirect to stored URL (redirect_url or original_data)
-    target = qr.redirect_url or qr.original_data
     if not target:
         raise HTTPException(status_code=400, detail="QR has no redirect URL")
     return RedirectResponse(url=target, status_code=302)
@@ -1,44 +1,116 @@
 # ===== PHASE 8: Web Interface =====
+# ===== PHASE 10: Performance & Scaling =====
 """
 Web UI routes: dashboard, create form, stats page.
 """
 
+import base64
+import binascii
 from datetime import datetime
 from pathlib import Path
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.database import get_db
-from app.models import QRCode
-from app.services.qr_service import create_qr
+from app.database import get_async_db, get_db
+from app.models import QRCode, ScanDailyRollup
+from app.services.qr_service import create_qr, image_url
 from app.utils.analytics import get_all_stats
 from app.utils.qr_templates import format_calendar_event, format_vcard, format_wifi
 
 router = APIRouter(tags=["web"])
 _templates_dir = Path(__file__).resolve().parent.parent / "templates"
-templates = Jinja2Templates(directory=str(_templates_dir))
+
+
+class _LazyTemplates:
+    """Jinja2Templates created on first use, so processes that never render a page skip importing Jinja2."""
+
+    _templates = None
+
+    def __getattr__(self, name):
+        if self._templates is None:
+            from fastapi.templating import Jinja2Templates
+
+            self._templates = Jinja2Templates(directory=str(_templates_dir))
+        return getattr(self._templates, name)
+
+
+templates = _LazyTemplates()
+
+
+def preload_templates() -> int:
+    """Import Jinja2 and compile every page template (background warm-up). Returns the count."""
+    names = templates.env.list_templates()
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
+
+DASHBOARD_PAGE_SIZE = 48
+
+
+def _encode_cursor(created_at: datetime, qr_id: str) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of the last row on a page."""
+    raw = f"{created_at.isoformat()}|{qr_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, qr_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), qr_id
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail="Invalid page cursor") from e
 
 
 @router.get("/dashboard", response_class=HTMLResponse)
-def dashboard(request: Request, db: Session = Depends(get_db), created: str | None = None):
-    """List all QR codes."""
-    qrcodes = db.query(QRCode).order_by(QRCode.created_at.desc()).all()
+def dashboard(
+    request: Request,
+    db: Session = Depends(get_db),
+    created: str | None = None,
+    after: str | None = None,
+    limit: int = Query(DASHBOARD_PAGE_SIZE, ge=1, le=200),
+):
+    """List QR codes newest first, one keyset page at a time, with scan counts from rollups."""
+    scan_count = (
+        select(func.coalesce(func.sum(ScanDailyRollup.scans), 0))
+        .where(ScanDailyRollup.qr_id == QRCode.id)
+        .correlate(QRCode)
+        .scalar_subquery()
+    )
+    query = db.query(QRCode.id, QRCode.name, QRCode.created_at, scan_count.label("scan_count"))
+    if after:
+        created_at, qr_id = _decode_cursor(after)
+        query = query.filter(tuple_(QRCode.created_at, QRCode.id) < tuple_(created_at, qr_id))
+    rows = query.order_by(QRCode.created_at.desc(), QRCode.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].created_at, rows[-1].id)
     items = [
         {
-            "id": qr.id,
-            "name": qr.name,
-            "image_url": f"/static/qrcodes/{qr.id}.png",
-            "scan_count": len(qr.scan_events),
-            "created_at": qr.created_at,
+            "id": row.id,
+            "name": row.name,
+            "image_url": image_url(row.id),
+            "scan_count": row.scan_count,
+            "created_at": row.created_at,
         }
-        for qr in qrcodes
+        for row in rows
     ]
     return templates.TemplateResponse(
         "dashboard.html",
-        {"request": request, "qrcodes": items, "created": created},
+        {
+            "request": request,
+            "qrcodes": items,
+            "created": created,
+            "next_cursor": next_cursor,
+            "is_first_page": after is None,
+            "limit": limit,
+        },
     )
 
 
@@ -132,18 +204,18 @@ async def create_submit(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/stats/{qr_id}", response_class=HTMLResponse)
-def stats_page(request: Request, qr_id: str, db: Session = Depends(get_db)):
+async def stats_page(request: Request, qr_id: str, db: AsyncSession = Depends(get_async_db)):
     """Stats page for a QR code."""
-    qr = db.query(QRCode).filter(QRCode.id == qr_id).first()
+    qr = await db.get(QRCode, qr_id)
     if not qr:
         raise HTTPException(status_code=404, detail="QR code not found")
-    stats = get_all_stats(db, qr_id)
+    stats = await db.run_sync(get_all_stats, qr_id)
     context = {
         "request": request,
         "qr": {
             "id": qr.id,
             "name": qr.name,
-            "image_url": f"/static/qrcodes/{qr.id}.png",
+            "image_url": image_url(qr.id),
         },
         "stats": stats,
     }
@@ -0,0 +1,367 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Production server (`python run.py prod`): a pre-forking supervisor around uvicorn.
+
+The master process reads its settings (CLI > SMARTQR_* environment > config file),
+applies migrations once, imports the app and binds the listening socket, then forks
+the workers, which share the socket and the already-imported code. Workers that
+exit are replaced. Signals to the master:
+    SIGTERM / SIGINT  graceful stop: workers finish in-flight requests first
+    SIGHUP            rolling restart: each worker is stopped once its replacement serves
+Workers tell each other about cache invalidations over the peer bus (utils/peer_bus.py).
+
+Nothing from the app is imported at module level: settings must reach the
+environment before app modules read it.
+"""
+
+import os
+import random
+import select
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+import traceback
+from dataclasses import dataclass, field
+
+import uvicorn
+
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    tomllib = None
+
+
+def _flag(value) -> bool:
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+
+# Setting name -> parser; each can come from the config file's [server] table or SMARTQR_<NAME>
+_SETTINGS = {
+    "host": str,
+    "port": int,
+    "workers": int,
+    "database_url": str,
+    "graceful_timeout": float,
+    "max_requests": int,
+    "backlog": int,
+    "log_level": str,
+    "access_log": _flag,
+}
+
+# A worker that exits before serving this many times in a row stops the server
+MAX_BOOT_FAILURES = 5
+
+
+@dataclass
+class ServerConfig:
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = 0  # 0: one per available CPU
+    database_url: str | None = None
+    graceful_timeout: float = 30.0
+    max_requests: int = 0  # recycle a worker after this many requests (0: never)
+    backlog: int = 2048
+    log_level: str = "info"
+    access_log: bool = False
+    env: dict[str, str] = field(default_factory=dict)  # [env] table: SMARTQR_* defaults
+
+
+def available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0)) or 1
+    return os.cpu_count() or 1
+
+
+def load_config(path: str | None = None, **overrides) -> ServerConfig:
+    """
+    Settings from a TOML file (`path` or SMARTQR_CONFIG), then SMARTQR_* environment
+    variables, then `overrides` (CLI flags; None means not given).
+    """
+    values: dict = {}
+    env: dict[str, str] = {}
+    path = path or os.environ.get("SMARTQR_CONFIG")
+    if path:
+        if tomllib is None:
+            raise ValueError("config files need Python 3.11+ (tomllib); use SMARTQR_* variables instead")
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+        server = data.get("server", {})
+        unknown = sorted(set(server) - set(_SETTINGS))
+        if unknown:
+            raise ValueError(f"unknown [server] settings in {path}: {', '.join(unknown)}")
+        values.update({name: _SETTINGS[name](value) for name, value in server.items()})
+        env = {str(name): str(value) for name, value in data.get("env", {}).items()}
+    for name, parse in _SETTINGS.items():
+        raw = os.environ.get(f"SMARTQR_{name.upper()}")
+        if raw is not None:
+            values[name] = parse(raw)
+    values.update({name: value for name, value in overrides.items() if value is not None})
+    return ServerConfig(**values, env=env)
+
+
+def _prepare_environment(config: ServerConfig, workers: int, forking: bool) -> str | None:
+    """Export settings for the app modules; returns the peer bus directory this run created."""
+    for name, value in config.env.items():
+        os.environ.setdefault(name, value)  # the real environment wins over the file
+    if config.database_url:
+        os.environ["SMARTQR_DATABASE_URL"] = config.database_url
+    # The master migrates once before forking; workers must not race to do it again
+    os.environ["SMARTQR_AUTO_MIGRATE"] = "0"
+    # Share the cores between workers' render pools instead of each sizing to the machine
+    os.environ.setdefault("SMARTQR_RENDER_WORKERS", str(max(1, min(4, available_cpus() // workers))))
+    if forking and workers > 1 and not os.environ.get("SMARTQR_PEER_BUS_DIR"):
+        bus_dir = tempfile.mkdtemp(prefix="smartqr-bus-")
+        os.environ["SMARTQR_PEER_BUS_DIR"] = bus_dir
+        return bus_dir
+    return None
+
+
+def _say(message: str) -> None:
+    print(f"SmartQR [{os.getpid()}]: {message}", file=sys.stderr, flush=True)
+
+
+def _bind(config: ServerConfig) -> socket.socket:
+    family = socket.AF_INET6 if ":" in config.host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((config.host, config.port))
+    sock.listen(config.backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """Forks and watches the workers; runs in the master process only."""
+
+    def __init__(self, app, sock: socket.socket, config: ServerConfig, workers: int):
+        self.app = app
+        self.sock = sock
+        self.config = config
+        self.workers = workers
+        self._slots: dict[int, int] = {}  # pid -> slot (0 .. workers-1)
+        self._booting: dict[int, int] = {}  # ready-pipe fd -> pid
+        self._ready: set[int] = set()
+        self._boot_failures = 0
+        self._signals: list[int] = []
+        self._stopping = False
+        self._wake_r, self._wake_w = os.pipe()
+
+    def _on_signal(self, signum, frame) -> None:
+        self._signals.append(signum)
+
+    def run(self) -> int:
+        os.set_blocking(self._wake_w, False)
+        signal.set_wakeup_fd(self._wake_w)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(signum, self._on_signal)
+        _say(f"Listening on http://{self.config.host}:{self.config.port} with {self.workers} workers")
+        for slot in range(self.workers):
+            self._spawn(slot)
+        exit_code = 0
+        while not self._stopping:
+            self._tick(1.0)
+            if self._boot_failures >= MAX_BOOT_FAILURES:
+                _say(f"Workers failed to start {self._boot_failures} times in a row; stopping")
+                exit_code = 1
+                self._stopping = True
+        self._shutdown()
+        return exit_code
+
+    def _spawn(self, slot: int) -> int:
+        ready_r, ready_w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            self._worker(slot, ready_w)  # never returns
+        os.close(ready_w)
+        self._slots[pid] = slot
+        self._booting[ready_r] = pid
+        return pid
+
+    def _worker(self, slot: int, ready_w: int) -> None:
+        code = 1
+        try:
+            signal.set_wakeup_fd(-1)
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)  # reloads are the master's business
+            for fd in (self._wake_r, self._wake_w, *self._booting):
+                os.close(fd)
+            _init_worker(slot)
+            server = WorkerServer(self._uvicorn_config(), ready_w)
+            server.run(sockets=[self.sock])
+            code = 0 if server.started else 1
+        except BaseException:  # noqa: BLE001 - report, then leave without running the master's cleanup
+            traceback.print_exc()
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(code)
+
+    def _uvicorn_config(self) -> uvicorn.Config:
+        limit = self.config.max_requests
+        if limit:
+            # Jitter by up to 10% so workers don't recycle together; done here rather than with
+            # uvicorn's limit_max_requests_jitter, which older supported uvicorn versions lack.
+            # SystemRandom: forked workers inherit the master's PRNG state.
+            limit += random.SystemRandom().randint(0, limit // 10)
+        return uvicorn.Config(
+            self.app,
+            lifespan="on",
+            log_level=self.config.log_level,
+            access_log=self.config.access_log,
+            timeout_graceful_shutdown=self.config.graceful_timeout,
+            limit_max_requests=limit or None,
+            backlog=self.config.backlog,
+        )
+
+    def _tick(self, timeout: float) -> None:
+        """Wait for a signal, a worker becoming ready, or `timeout`; then act on what happened."""
+        try:
+            readable, _, _ = select.select([self._wake_r, *self._booting], [], [], timeout)
+        except InterruptedError:
+            readable = []
+        for fd in readable:
+            if fd == self._wake_r:
+                os.read(self._wake_r, 512)
+                continue
+            pid = self._booting.pop(fd)
+            if os.read(fd, 1):
+                self._ready.add(pid)
+                self._boot_failures = 0
+            os.close(fd)
+        signals, self._signals = self._signals, []
+        for signum in signals:
+            if signum in (signal.SIGTERM, signal.SIGINT):
+                _say("Shutting down")
+                self._stopping = True
+            elif signum == signal.SIGHUP and not self._stopping:
+                self._rolling_restart()
+        self._reap()
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot = self._slots.pop(pid, None)
+            was_ready = pid in self._ready
+            self._ready.discard(pid)
+            if slot is None or self._stopping:
+                continue
+            if not was_ready:
+                self._boot_failures += 1
+            if slot in self._slots.values():
+                continue  # replaced during a rolling restart
+            _say(f"Worker {pid} exited ({_describe(status)}); starting a new one")
+            self._spawn(slot)
+
+    def _rolling_restart(self) -> None:
+        _say("Rolling restart")
+        for old_pid, slot in list(self._slots.items()):
+            new_pid = self._spawn(slot)
+            deadline = time.monotonic() + max(30.0, self.config.graceful_timeout)
+            while new_pid not in self._ready and new_pid in self._slots and time.monotonic() < deadline:
+                self._tick(0.5)
+                if self._stopping:
+                    return
+            if new_pid not in self._ready:
+                _say(f"Replacement for worker {old_pid} did not start; keeping the remaining workers")
+                if new_pid in self._slots:
+                    _signal(new_pid, signal.SIGTERM)
+                return
+            _signal(old_pid, signal.SIGTERM)
+
+    def _shutdown(self) -> None:
+        for pid in list(self._slots):
+            _signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.config.graceful_timeout + 5
+        while self._slots and time.monotonic() < deadline:
+            self._tick(0.2)
+        for pid in list(self._slots):
+            _say(f"Worker {pid} did not stop in time; killing it")
+            _signal(pid, signal.SIGKILL)
+        while self._slots:
+            self._tick(0.2)
+        self.sock.close()
+
+
+def _signal(pid: int, signum: int) -> None:
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def _describe(status: int) -> str:
+    if os.WIFSIGNALED(status):
+        return f"signal {signal.Signals(os.WTERMSIG(status)).name}"
+    return f"code {os.waitstatus_to_exitcode(status)}"
+
+
+def _init_worker(slot: int) -> None:
+    """Per-worker setup after fork: fresh DB connections, one partition maintainer per host."""
+    from app.database import async_engine, engine
+    from app.services.retention_service import partition_maintainer
+
+    # Connections opened by the master must not be shared with the children
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    if slot != 0:
+        partition_maintainer.interval = 0
+
+
+class WorkerServer(uvicorn.Server):
+    """uvicorn.Server that tells the master (through a pipe) once it is serving."""
+
+    def __init__(self, config: uvicorn.Config, ready_fd: int):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        if self.started:
+            os.write(self.ready_fd, b"1")
+        os.close(self.ready_fd)
+
+
+def serve(config: ServerConfig) -> int:
+    """Run the production server until it is stopped. Returns the exit code."""
+    workers = config.workers if config.workers > 0 else available_cpus()
+    forking = hasattr(os, "fork")
+    bus_dir = _prepare_environment(config, workers, forking)
+    try:
+        from app.database import SessionLocal, engine
+        from app.migrations import upgrade_database
+        from app.services.rollup_service import ensure_rollups_backfilled
+
+        upgrade_database()
+        with SessionLocal() as db:
+            ensure_rollups_backfilled(db)
+        engine.dispose()
+        if not forking:
+            _say("os.fork is unavailable: using uvicorn's worker processes (no preloading)")
+            uvicorn.run(
+                "app.main:app", host=config.host, port=config.port, workers=workers,
+                log_level=config.log_level, access_log=config.access_log,
+                timeout_graceful_shutdown=config.graceful_timeout, backlog=config.backlog,
+            )
+            return 0
+        from app.main import app
+
+        if app.state.profile == "full":
+            # Every worker renders pages: compile the templates once, before the fork
+            from app.routes.web_routes import preload_templates
+
+            preload_templates()
+        sock = _bind(config)
+        return Supervisor(app, sock, config, workers).run()
+    finally:
+        if bus_dir:
+            shutil.rmtree(bus_dir, ignore_errors=True)
@@ -0,0 +1,166 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Cross-QR analytics: leaderboards and totals over a campaign or an id list.
+Every answer comes from the daily/device/country rollups with one grouped query
+per dimension, however many codes are selected, and is cached for
+SMARTQR_AGGREGATE_CACHE_TTL seconds. Counts are by UTC day.
+"""
+
+import hashlib
+import os
+import time
+from datetime import date, datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.models import QRCode, ScanCountryRollup, ScanDailyRollup, ScanDeviceRollup
+from app.utils.cache import MISSING, LRUCache
+
+AGGREGATE_CACHE_SIZE = int(os.environ.get("SMARTQR_AGGREGATE_CACHE_SIZE", "256"))
+AGGREGATE_CACHE_TTL = float(os.environ.get("SMARTQR_AGGREGATE_CACHE_TTL", "30"))
+AGGREGATE_MAX_IDS = int(os.environ.get("SMARTQR_AGGREGATE_MAX_IDS", "10000"))
+
+aggregate_cache = LRUCache(AGGREGATE_CACHE_SIZE, ttl=AGGREGATE_CACHE_TTL)
+
+
+def _window(model, start: date | None, end: date | None) -> list:
+    conditions = []
+    if start is not None:
+        conditions.append(model.day >= start)
+    if end is not None:
+        conditions.append(model.day < end)
+    return conditions
+
+
+def _selection(model, ids: list[str] | None, campaign: str | None) -> list:
+    """Conditions restricting a rollup model to the selected codes."""
+    if ids is not None:
+        return [model.qr_id.in_(ids)]
+    if campaign is not None:
+        return [model.qr_id.in_(select(QRCode.id).where(QRCode.campaign == campaign))]
+    return []
+
+
+def _cached(key, compute):
+    """Serve from aggregate_cache; results carry cached + generated_at."""
+    result = aggregate_cache.get(key)
+    if result is not MISSING:
+        return {**result, "cached": True}
+    result = compute()
+    result["generated_at"] = datetime.utcnow().isoformat()
+    aggregate_cache.set(key, result)
+    return {**result, "cached": False}
+
+
+def top_qr_codes(
+    db: Session,
+    start: date | None = None,
+    end: date | None = None,
+    limit: int = 10,
+    campaign: str | None = None,
+) -> dict:
+    """The `limit` codes with most scans for days start <= day < end (optionally one campaign)."""
+
+    def compute() -> dict:
+        began = time.perf_counter()
+        scans = func.sum(ScanDailyRollup.scans).label("scans")
+        ranked = (
+            select(ScanDailyRollup.qr_id, scans)
+            .where(*_window(ScanDailyRollup, start, end), *_selection(ScanDailyRollup, None, campaign))
+            .group_by(ScanDailyRollup.qr_id)
+            .order_by(scans.desc(), ScanDailyRollup.qr_id)
+            .limit(limit)
+            .subquery()
+        )
+        rows = db.execute(
+            select(ranked.c.qr_id, QRCode.name, QRCode.campaign, ranked.c.scans)
+            .join(QRCode, QRCode.id == ranked.c.qr_id)
+            .order_by(ranked.c.scans.desc(), ranked.c.qr_id)
+        ).all()
+        return {
+            "from": start.isoformat() if start else None,
+            "to": end.isoformat() if end else None,
+            "campaign": campaign,
+            "limit": limit,
+            "items": [
+                {"rank": rank, "qr_id": qr_id, "name": name, "campaign": tag, "scans": count}
+                for rank, (qr_id, name, tag, count) in enumerate(rows, start=1)
+            ],
+            "query_ms": round((time.perf_counter() - began) * 1000, 2),
+        }
+
+    return _cached(("top", start, end, limit, campaign), compute)
+
+
+def _breakdown(db: Session, column, conditions: list) -> list[dict]:
+    model = column.class_
+    total = func.sum(model.scans)
+    rows = db.execute(
+        select(column, total).where(*conditions).group_by(column).order_by(total.desc(), column)
+    ).all()
+    return [{"value": value, "count": count} for value, count in rows]
+
+
+def aggregate_stats(
+    db: Session,
+    ids: list[str] | None = None,
+    campaign: str | None = None,
+    start: date | None = None,
+    end: date | None = None,
+) -> dict:
+    """
+    Totals across an id list or a campaign (one of them; neither means every code):
+    scan count, codes with scans, scans per day, device and country breakdowns.
+    """
+    if ids is not None:
+        ids = sorted(set(ids))
+        if len(ids) > AGGREGATE_MAX_IDS:
+            raise ValueError(f"at most {AGGREGATE_MAX_IDS} ids per request")
+    selection_key = hashlib.sha1("\n".join(ids).encode()).hexdigest() if ids is not None else None
+
+    def compute() -> dict:
+        began = time.perf_counter()
+        per_day = db.execute(
+            select(ScanDailyRollup.day, func.sum(ScanDailyRollup.scans), func.count(ScanDailyRollup.qr_id))
+            .where(*_window(ScanDailyRollup, start, end), *_selection(ScanDailyRollup, ids, campaign))
+            .group_by(ScanDailyRollup.day)
+            .order_by(ScanDailyRollup.day)
+        ).all()
+        active = db.execute(
+            select(func.count(func.distinct(ScanDailyRollup.qr_id)))
+            .where(*_window(ScanDailyRollup, start, end), *_selection(ScanDailyRollup, ids, campaign))
+        ).scalar() or 0
+        if ids is not None:
+            codes = db.execute(select(func.count()).select_from(QRCode).where(QRCode.id.in_(ids))).scalar()
+        elif campaign is not None:
+            codes = db.execute(select(func.count()).select_from(QRCode).where(QRCode.campaign == campaign)).scalar()
+        else:
+            codes = db.execute(select(func.count()).select_from(QRCode)).scalar()
+        devices = _breakdown(
+            db,
+            ScanDeviceRollup.device_type,
+            _window(ScanDeviceRollup, start, end) + _selection(ScanDeviceRollup, ids, campaign),
+        )
+        countries = _breakdown(
+            db,
+            ScanCountryRollup.country,
+            _window(ScanCountryRollup, start, end) + _selection(ScanCountryRollup, ids, campaign),
+        )
+        return {
+            "from": start.isoformat() if start else None,
+            "to": end.isoformat() if end else None,
+            "campaign": campaign,
+            "ids": len(ids) if ids is not None else None,
+            "qr_codes": codes or 0,
+            "qr_codes_scanned": active,
+            "total_scans": sum(count for _, count, _ in per_day),
+            "scans_per_day": [
+                {"date": str(day), "count": count, "qr_codes": scanned} for day, count, scanned in per_day
+            ],
+            "device_breakdown": devices,
+            "country_breakdown": countries,
+            "query_ms": round((time.perf_counter() - began) * 1000, 2),
+        }
+
+    return _cached(("aggregate", selection_key, campaign, start, end), compute)
@@ -0,0 +1,210 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Bulk QR creation.
+Items arrive as a JSON array, NDJSON or CSV. Valid rows are inserted in batched
+transactions (one multi-row INSERT + commit per batch) and, optionally, rendered
+into the render cache through the render pool with a per-request concurrency cap.
+Results are produced per item as they complete, followed by a summary, so the
+route can stream them back as NDJSON.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import os
+import time
+from typing import AsyncIterator, Iterable, Iterator
+
+from sqlalchemy import insert
+
+from app.database import AsyncSessionLocal
+from app.models import QRCode
+from app.services.qr_service import build_qr, get_render_params, image_url
+from app.services.redirect_cache import invalidate_redirect
+from app.services.render_service import render_service
+from app.services.styling_service import validate_color
+
+BULK_BATCH_SIZE = int(os.environ.get("SMARTQR_BULK_BATCH_SIZE", "500"))
+BULK_CONCURRENCY = int(os.environ.get("SMARTQR_BULK_CONCURRENCY", "4"))
+BULK_MAX_ITEMS = int(os.environ.get("SMARTQR_BULK_MAX_ITEMS", "100000"))
+
+# Input formats accepted by /api/qr/bulk
+BULK_FORMATS = ("json", "ndjson", "csv")
+
+_FIELDS = ("name", "data", "redirect_url", "fill_color", "back_color", "logo_path", "campaign")
+
+
+class BulkInputError(ValueError):
+    """The request body as a whole cannot be parsed."""
+
+
+def detect_format(content_type: str | None, filename: str | None = None) -> str:
+    """Map a Content-Type (or upload filename) to one of BULK_FORMATS."""
+    ct = (content_type or "").split(";")[0].strip().lower()
+    name = (filename or "").lower()
+    if ct in ("application/x-ndjson", "application/ndjson", "application/jsonl") or name.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if ct in ("text/csv", "application/csv") or name.endswith(".csv"):
+        return "csv"
+    if ct in ("application/json", "") or name.endswith(".json"):
+        return "json"
+    raise BulkInputError(f"unsupported content type {ct!r}; use JSON, NDJSON or CSV")
+
+
+def text_lines(content: bytes) -> io.StringIO:
+    """Decode an uploaded body into a line iterator (UTF-8, optional BOM)."""
+    try:
+        return io.StringIO(content.decode("utf-8-sig"), newline="")
+    except UnicodeDecodeError as e:
+        raise BulkInputError("body must be UTF-8 text") from e
+
+
+def _ndjson_items(lines: Iterable[str]) -> Iterator[dict | Exception]:
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ValueError(f"invalid JSON line: {e.msg}")
+
+
+def _csv_items(reader: csv.DictReader) -> Iterator[dict]:
+    for row in reader:
+        yield {k: (v if v != "" else None) for k, v in row.items() if k in _FIELDS}
+
+
+def parse_items(fmt: str, lines: Iterable[str]) -> Iterator[dict | Exception]:
+    """
+    Iterate raw item dicts from JSON-array / NDJSON / CSV text lines.
+    Whole-body problems raise BulkInputError up front; an unparseable NDJSON line
+    yields the exception instead, so it is reported as a failed item.
+    """
+    if fmt == "json":
+        try:
+            items = json.loads("".join(lines))
+        except json.JSONDecodeError as e:
+            raise BulkInputError(f"invalid JSON: {e}") from e
+        if not isinstance(items, list):
+            raise BulkInputError("JSON body must be an array of objects")
+        return iter(items)
+    if fmt == "ndjson":
+        return _ndjson_items(lines)
+    reader = csv.DictReader(lines)
+    if not reader.fieldnames or not {"name", "data"} <= set(reader.fieldnames):
+        raise BulkInputError("CSV header must include 'name' and 'data' columns")
+    return _csv_items(reader)
+
+
+def _validate(item) -> dict:
+    """Normalise one item to create_qr arguments; raises ValueError when invalid."""
+    if not isinstance(item, dict):
+        raise ValueError("item must be an object")
+    for field in _FIELDS:
+        value = item.get(field)
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f"'{field}' must be a string")
+    name = (item.get("name") or "").strip()
+    data = (item.get("data") or "").strip()
+    if not name:
+        raise ValueError("name is required")
+    if not data:
+        raise ValueError("data cannot be empty")
+    return {
+        "name": name,
+        "original_data": data,
+        "redirect_url": item.get("redirect_url"),
+        "fill_color": validate_color(item.get("fill_color"), "black"),
+        "back_color": validate_color(item.get("back_color"), "white"),
+        "logo_path": item.get("logo_path"),
+        "campaign": (item.get("campaign") or "").strip()[:100] or None,
+    }
+
+
+def _row(qr: QRCode) -> dict:
+    return {column.key: getattr(qr, column.key) for column in QRCode.__table__.columns if column.key != "created_at"}
+
+
+async def _insert_batch(batch: list[QRCode]) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(QRCode), [_row(qr) for qr in batch])
+        await db.commit()
+    for qr in batch:
+        invalidate_redirect(qr.id)
+
+
+async def _prerender(qr: QRCode, slots: asyncio.Semaphore) -> str | None:
+    """Render the default PNG into the render cache. Returns an error message or None."""
+    async with slots:
+        try:
+            # Queue behind other requests when the shared pool is saturated instead of failing
+            await render_service.render_async(busy_wait=render_service.timeout, **get_render_params(qr))
+        except Exception as e:  # noqa: BLE001 - reported per item
+            return str(e) or e.__class__.__name__
+    return None
+
+
+async def bulk_create(
+    items: Iterable[dict | Exception],
+    prerender: bool = False,
+    concurrency: int = BULK_CONCURRENCY,
+    batch_size: int = BULK_BATCH_SIZE,
+) -> AsyncIterator[dict]:
+    """
+    Create QR codes from raw items, yielding one result dict per item and a final summary.
+    Results for invalid items are yielded immediately; valid ones after their batch commits
+    (and renders, if prerender). Every result carries the item's input `index`.
+    """
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(max(1, concurrency))
+    totals = {"total": 0, "created": 0, "failed": 0, "rendered": 0}
+    batch: list[tuple[int, QRCode]] = []
+
+    async def flush():
+        try:
+            await _insert_batch([qr for _, qr in batch])
+        except Exception as e:  # noqa: BLE001 - a failed batch is reported item by item
+            totals["failed"] += len(batch)
+            for index, _ in batch:
+                yield {"index": index, "ok": False, "error": f"database error: {e.__class__.__name__}"}
+            return
+        errors = [None] * len(batch)
+        if prerender:
+            errors = await asyncio.gather(*(_prerender(qr, slots) for _, qr in batch))
+        for (index, qr), error in zip(batch, errors):
+            totals["created"] += 1
+            result = {"index": index, "ok": True, "id": qr.id, "name": qr.name, "image_url": image_url(qr.id)}
+            if prerender:
+                result["rendered"] = error is None
+                if error is None:
+                    totals["rendered"] += 1
+                else:
+                    result["render_error"] = error
+            yield result
+
+    for index, item in enumerate(items):
+        totals["total"] += 1
+        if index >= BULK_MAX_ITEMS:
+            totals["failed"] += 1
+            yield {"index": index, "ok": False, "error": f"limit of {BULK_MAX_ITEMS} items reached; rest ignored"}
+            break
+        try:
+            if isinstance(item, Exception):
+                raise item
+            qr = build_qr(**_validate(item))
+        except ValueError as e:
+            totals["failed"] += 1
+            yield {"index": index, "ok": False, "error": str(e)}
+            continue
+        batch.append((index, qr))
+        if len(batch) >= batch_size:
+            async for result in flush():
+                yield result
+            batch = []
+    if batch:
+        async for result in flush():
+            yield result
+
+    totals["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    yield {"summary": totals}
@@ -0,0 +1,143 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Streaming export of raw scan events as NDJSON or CSV, optionally gzipped on the fly.
+Events are read in keyset pages ordered by (timestamp, id): each page is a short
+read transaction against the tables overlapping the cursor, so memory stays flat,
+no long-lived snapshot holds back the scan writer, and an interrupted pull can be
+resumed with the last (timestamp, id) it received.
+"""
+
+import asyncio
+import csv
+import io
+import json
+import os
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator
+
+from sqlalchemy import select, tuple_, union_all
+from sqlalchemy.orm import Session
+
+from app.database import AsyncSessionLocal
+from app.models import ScanEvent
+from app.services.partition_service import scan_tables
+
+EVENT_EXPORT_PAGE_SIZE = int(os.environ.get("SMARTQR_EVENT_EXPORT_PAGE_SIZE", "5000"))
+
+EVENT_FIELDS = [col.name for col in ScanEvent.__table__.columns]
+EVENT_FORMATS = ("ndjson", "csv")
+
+
+@dataclass
+class EventFilter:
+    """Which events to export: one QR (or all), [start, end) in naive UTC, resume cursor, row cap."""
+
+    qr_id: str | None = None
+    start: datetime | None = None
+    end: datetime | None = None
+    after: tuple[datetime, int] | None = None
+    limit: int | None = None
+    page_size: int = EVENT_EXPORT_PAGE_SIZE
+
+
+def parse_cursor(value: str) -> tuple[datetime, int]:
+    """'2025-01-31T23:59:59.123456,4711' -> (timestamp, id). Raises ValueError."""
+    timestamp, _, event_id = value.rpartition(",")
+    try:
+        return datetime.fromisoformat(timestamp), int(event_id)
+    except ValueError:
+        raise ValueError("after must be '<ISO timestamp>,<event id>' from the last exported row") from None
+
+
+def _page_statement(db: Session, flt: EventFilter, cursor: tuple[datetime, int] | None, size: int):
+    """Top `size` events after cursor: a keyset query per overlapping table, merged."""
+    start = cursor[0] if cursor and (flt.start is None or cursor[0] > flt.start) else flt.start
+    parts = []
+    for source in scan_tables(db, start, flt.end):
+        ts = source.c.timestamp
+        query = select(*[source.c[name] for name in EVENT_FIELDS]).where(ts.isnot(None))
+        if flt.qr_id is not None:
+            query = query.where(source.c.qr_id == flt.qr_id)
+        if flt.start is not None:
+            query = query.where(ts >= flt.start)
+        if flt.end is not None:
+            query = query.where(ts < flt.end)
+        if cursor is not None:
+            query = query.where(tuple_(ts, source.c.id) > tuple_(*cursor))
+        parts.append(query.order_by(ts, source.c.id).limit(size))
+    if len(parts) == 1:
+        return parts[0]
+    merged = union_all(*(select(*part.subquery().c) for part in parts)).subquery()
+    return select(*merged.c).order_by(merged.c.timestamp, merged.c.id).limit(size)
+
+
+async def iter_event_pages(flt: EventFilter) -> AsyncIterator[list[dict]]:
+    """Yield pages of event dicts in (timestamp, id) order."""
+    cursor = flt.after
+    remaining = flt.limit
+    while remaining is None or remaining > 0:
+        size = flt.page_size if remaining is None else min(flt.page_size, remaining)
+        async with AsyncSessionLocal() as db:
+            stmt = await db.run_sync(_page_statement, flt, cursor, size)
+            rows = [dict(row) for row in (await db.execute(stmt)).mappings()]
+        if not rows:
+            return
+        cursor = (rows[-1]["timestamp"], rows[-1]["id"])
+        yield rows
+        if remaining is not None:
+            remaining -= len(rows)
+        if len(rows) < size:
+            return
+        await asyncio.sleep(0)  # let redirects in between pages
+
+
+def _ndjson(rows: list[dict]) -> bytes:
+    lines = []
+    for row in rows:
+        row["timestamp"] = row["timestamp"].isoformat()
+        lines.append(json.dumps(row, separators=(",", ":")))
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _CSVEncoder:
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._writer = csv.DictWriter(self._buffer, fieldnames=EVENT_FIELDS)
+
+    def header(self) -> bytes:
+        self._writer.writeheader()
+        return self._drain()
+
+    def rows(self, rows: list[dict]) -> bytes:
+        for row in rows:
+            row["timestamp"] = row["timestamp"].isoformat()
+        self._writer.writerows(rows)
+        return self._drain()
+
+    def _drain(self) -> bytes:
+        data = self._buffer.getvalue().encode("utf-8")
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return data
+
+
+async def stream_events(flt: EventFilter, fmt: str = "ndjson", gzip: bool = False) -> AsyncIterator[bytes]:
+    """Encoded export body; with gzip=True the bytes form a single gzip member."""
+    if fmt not in EVENT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EVENT_FORMATS)}")
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None  # wbits=31: gzip header
+
+    def out(data: bytes) -> bytes:
+        return compressor.compress(data) if compressor else data
+
+    encoder = _CSVEncoder() if fmt == "csv" else None
+    if encoder is not None:
+        yield out(encoder.header())
+    async for rows in iter_event_pages(flt):
+        chunk = out(encoder.rows(rows) if encoder is not None else _ndjson(rows))
+        if chunk:
+            yield chunk
+    if compressor is not None:
+        yield compressor.flush()
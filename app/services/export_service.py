@@ -0,0 +1,172 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Streaming export of rendered QR codes as a ZIP archive or a multi-up PDF print sheet.
+Rows are read in keyset-ordered chunks and each chunk is rendered through the render
+pool before being written, so memory stays flat regardless of how many codes are
+exported. Archives are produced incrementally and never buffered as a whole.
+"""
+
+import asyncio
+import csv
+import io
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator
+
+from sqlalchemy import select, tuple_
+
+from app.database import AsyncSessionLocal
+from app.models import QRCode
+from app.services.qr_service import get_encoded_data, get_render_params
+from app.services.render_service import render_service
+from app.utils.pdf_sheet import PAGE_SIZES, PDFSheetWriter
+
+EXPORT_CHUNK_SIZE = int(os.environ.get("SMARTQR_EXPORT_CHUNK_SIZE", "200"))
+EXPORT_CONCURRENCY = int(os.environ.get("SMARTQR_EXPORT_CONCURRENCY", "8"))
+
+# Uncompressed images (SVG) are deflated in the ZIP; PNG/WebP are stored as-is
+_ZIP_COMPRESSION = {"png": zipfile.ZIP_STORED, "webp": zipfile.ZIP_STORED, "svg": zipfile.ZIP_DEFLATED}
+
+
+@dataclass
+class ExportFilter:
+    """Which codes to export: an explicit id list, or created_at range / name substring."""
+
+    ids: list[str] | None = None
+    created_from: datetime | None = None
+    created_to: datetime | None = None
+    name_contains: str | None = None
+    limit: int | None = None
+    chunk_size: int = field(default=EXPORT_CHUNK_SIZE)
+
+
+async def iter_export_chunks(flt: ExportFilter) -> AsyncIterator[list[QRCode]]:
+    """Yield QRCode rows in chunks: id lists in request order, filters by (created_at, id)."""
+    remaining = flt.limit
+    async with AsyncSessionLocal() as db:
+        if flt.ids is not None:
+            ids = list(dict.fromkeys(flt.ids))[:remaining]
+            for start in range(0, len(ids), flt.chunk_size):
+                chunk = ids[start:start + flt.chunk_size]
+                rows = {qr.id: qr for qr in (await db.scalars(select(QRCode).where(QRCode.id.in_(chunk)))).all()}
+                found = [rows[qr_id] for qr_id in chunk if qr_id in rows]
+                db.expunge_all()
+                if found:
+                    yield found
+            return
+
+        query = select(QRCode)
+        if flt.created_from is not None:
+            query = query.where(QRCode.created_at >= flt.created_from)
+        if flt.created_to is not None:
+            query = query.where(QRCode.created_at < flt.created_to)
+        if flt.name_contains:
+            pattern = flt.name_contains.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query = query.where(QRCode.name.ilike(f"%{pattern}%", escape="\\"))
+        cursor = None
+        while remaining is None or remaining > 0:
+            page = query
+            if cursor is not None:
+                page = page.where(tuple_(QRCode.created_at, QRCode.id) > cursor)
+            size = flt.chunk_size if remaining is None else min(flt.chunk_size, remaining)
+            rows = (await db.scalars(page.order_by(QRCode.created_at, QRCode.id).limit(size))).all()
+            db.expunge_all()
+            if not rows:
+                return
+            yield list(rows)
+            if remaining is not None:
+                remaining -= len(rows)
+            cursor = (rows[-1].created_at, rows[-1].id)
+
+
+async def _render_chunk(rows: list[QRCode], fmt: str, size: int | None, slots: asyncio.Semaphore) -> list:
+    """Render a chunk concurrently; each entry is the image bytes or the exception raised."""
+
+    async def render(qr: QRCode):
+        async with slots:
+            return await render_service.render_async(
+                busy_wait=render_service.timeout, store=False, **get_render_params(qr), fmt=fmt, size=size
+            )
+
+    return await asyncio.gather(*(render(qr) for qr in rows), return_exceptions=True)
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only, unseekable file object that hands written bytes back to the generator."""
+
+    def __init__(self):
+        self._parts: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+async def stream_zip(
+    flt: ExportFilter, fmt: str = "png", size: int | None = None, concurrency: int = EXPORT_CONCURRENCY
+) -> AsyncIterator[bytes]:
+    """
+    ZIP with one {id}.{fmt} image per code plus manifest.csv (id, name, file, data, error).
+    Entries use data descriptors, so the archive is written front to back without seeking.
+    """
+    sink = _StreamSink()
+    slots = asyncio.Semaphore(max(1, concurrency))
+    # The manifest is the last entry; spool it to disk once it outgrows 1 MB
+    manifest_file = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+", newline="", encoding="utf-8")
+    manifest = csv.writer(manifest_file)
+    manifest.writerow(["id", "name", "file", "data", "error"])
+    with manifest_file, zipfile.ZipFile(sink, mode="w", allowZip64=True) as zf:
+        async for rows in iter_export_chunks(flt):
+            images = await _render_chunk(rows, fmt, size, slots)
+            for qr, image in zip(rows, images):
+                filename = f"{qr.id}.{fmt}"
+                if isinstance(image, BaseException):
+                    manifest.writerow([qr.id, qr.name, "", get_encoded_data(qr), str(image) or image.__class__.__name__])
+                    continue
+                info = zipfile.ZipInfo(filename, date_time=(qr.created_at or datetime.utcnow()).timetuple()[:6])
+                info.compress_type = _ZIP_COMPRESSION[fmt]
+                zf.writestr(info, image)
+                manifest.writerow([qr.id, qr.name, filename, get_encoded_data(qr), ""])
+            yield sink.drain()
+
+        manifest_file.seek(0)
+        with zf.open(zipfile.ZipInfo("manifest.csv", date_time=datetime.utcnow().timetuple()[:6]), "w") as entry:
+            while block := manifest_file.read(64 * 1024):
+                entry.write(block.encode("utf-8"))
+                yield sink.drain()
+    yield sink.drain()
+
+
+async def stream_pdf(
+    flt: ExportFilter,
+    page: str = "a4",
+    columns: int = 4,
+    rows_per_page: int = 6,
+    size: int | None = 600,
+    concurrency: int = EXPORT_CONCURRENCY,
+) -> AsyncIterator[bytes]:
+    """Multi-up print sheet: columns x rows codes per page, each labelled with its name."""
+    writer = PDFSheetWriter(PAGE_SIZES[page], columns=columns, rows=rows_per_page)
+    slots = asyncio.Semaphore(max(1, concurrency))
+    yield writer.begin()
+    async for rows in iter_export_chunks(flt):
+        images = await _render_chunk(rows, "png", size, slots)
+        out = []
+        for qr, image in zip(rows, images):
+            if isinstance(image, BaseException):
+                out.append(writer.add(None, f"{qr.name} (render failed)"))
+            else:
+                out.append(writer.add(image, qr.name))
+        yield b"".join(out)
+    yield writer.finish()
@@ -0,0 +1,158 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+In-process pub/sub for live scan counts (the stats page's SSE feed).
+log_scans publishes each committed batch once; the broadcaster hops to the event
+loop with a single call_soon_threadsafe and merges the batch's per-QR deltas into
+every subscriber's pending slot. A subscriber holds at most one merged delta, so a
+slow client never queues up memory and nothing polls the database.
+With several worker processes each batch's deltas are also relayed over the peer
+bus, so a subscriber sees scans recorded by any worker on the host.
+"""
+
+import asyncio
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+
+from app.services.rollup_service import UNKNOWN
+from app.utils.peer_bus import peer_bus
+
+LIVE_MAX_SUBSCRIBERS = int(os.environ.get("SMARTQR_LIVE_MAX_SUBSCRIBERS", "10000"))
+LIVE_MIN_INTERVAL = float(os.environ.get("SMARTQR_LIVE_MIN_INTERVAL", "0.5"))
+LIVE_HEARTBEAT = float(os.environ.get("SMARTQR_LIVE_HEARTBEAT", "15"))
+
+
+class TooManySubscribersError(RuntimeError):
+    """The live feed is at SMARTQR_LIVE_MAX_SUBSCRIBERS."""
+
+
+class Subscription:
+    """One listener for one QR: pending merged delta plus a wake-up event (event loop only)."""
+
+    def __init__(self, qr_id: str):
+        self.qr_id = qr_id
+        self._pending: dict | None = None
+        self._ready = asyncio.Event()
+
+    def _merge(self, delta: dict) -> None:
+        if self._pending is None:
+            self._pending = {"scans": 0, "devices": Counter(), "countries": Counter(), "last_scan": None}
+        self._pending["scans"] += delta["scans"]
+        self._pending["devices"].update(delta["devices"])
+        self._pending["countries"].update(delta["countries"])
+        self._pending["last_scan"] = delta["last_scan"]
+        self._ready.set()
+
+    async def next(self, timeout: float | None = None) -> dict | None:
+        """Wait for scans and return the merged delta, or None after `timeout` seconds without any."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._ready.clear()
+        delta, self._pending = self._pending, None
+        return {
+            "scans": delta["scans"],
+            "devices": dict(delta["devices"]),
+            "countries": dict(delta["countries"]),
+            "last_scan": delta["last_scan"],
+        }
+
+
+class ScanBroadcaster:
+    def __init__(self, max_subscribers: int):
+        self.max_subscribers = max_subscribers
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._subscribers: dict[str, set[Subscription]] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+
+    def attach(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Bind to the event loop subscribers live on (called at startup)."""
+        self._loop = loop
+
+    def detach(self) -> None:
+        self._loop = None
+
+    def subscribe(self, qr_id: str) -> Subscription:
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise TooManySubscribersError(f"live feed is limited to {self.max_subscribers} subscribers")
+            sub = Subscription(qr_id)
+            self._subscribers.setdefault(qr_id, set()).add(sub)
+            self._count += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.qr_id)
+            if subs is None or sub not in subs:
+                return
+            subs.discard(sub)
+            self._count -= 1
+            if not subs:
+                del self._subscribers[sub.qr_id]
+
+    def publish(self, records: list[dict]) -> None:
+        """Announce committed scan records (qr_id, timestamp, device_type, country). Safe from any thread."""
+        relay = peer_bus.running
+        if not relay and (self._loop is None or not self._subscribers):
+            return
+        # Sibling workers may have subscribers for any QR: relay deltas for the whole batch
+        deltas = _deltas(records, None if relay else self._subscribers)
+        if relay and deltas:
+            peer_bus.publish("scans", deltas)
+        self._deliver(deltas)
+
+    def _deliver(self, deltas: dict[str, dict]) -> None:
+        loop = self._loop
+        deltas = {qr_id: delta for qr_id, delta in deltas.items() if qr_id in self._subscribers}
+        if loop is None or not deltas:
+            return
+        self.published += 1
+        try:
+            loop.call_soon_threadsafe(self._fan_out, deltas)
+        except RuntimeError:
+            pass  # loop closed during shutdown
+
+    def _fan_out(self, deltas: dict[str, dict]) -> None:
+        for qr_id, delta in deltas.items():
+            with self._lock:
+                subs = list(self._subscribers.get(qr_id, ()))
+            for sub in subs:
+                sub._merge(delta)
+            self.delivered += len(subs)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self._count,
+            "qr_codes": len(self._subscribers),
+            "max_subscribers": self.max_subscribers,
+            "published_batches": self.published,
+            "deliveries": self.delivered,
+        }
+
+
+def _deltas(records: list[dict], only=None) -> dict[str, dict]:
+    """Per-QR merged deltas for a batch of scan records (restricted to QR ids in `only`)."""
+    deltas: dict[str, dict] = {}
+    for record in records:
+        qr_id = record["qr_id"]
+        if only is not None and qr_id not in only:
+            continue
+        delta = deltas.get(qr_id)
+        if delta is None:
+            delta = deltas[qr_id] = {"scans": 0, "devices": Counter(), "countries": Counter(), "last_scan": None}
+        delta["scans"] += 1
+        delta["devices"][record.get("device_type") or UNKNOWN] += 1
+        delta["countries"][record.get("country") or UNKNOWN] += 1
+        timestamp = record.get("timestamp") or datetime.utcnow()
+        delta["last_scan"] = timestamp.isoformat()
+    return deltas
+
+
+scan_broadcaster = ScanBroadcaster(LIVE_MAX_SUBSCRIBERS)
+peer_bus.subscribe("scans", scan_broadcaster._deliver)
@@ -0,0 +1,199 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Monthly partitioning of raw scan events.
+
+PostgreSQL: scan_events is a natively range-partitioned table (see migration 0005);
+ensure_partitions creates the upcoming monthly partitions ahead of time.
+
+SQLite: new scans always land in scan_events; rotate_partitions moves every closed
+month into its own scan_events_YYYYMM table. Retained months are listed in the
+scan_partitions catalog.
+
+scan_source() returns the scan_events rows for a date range as one selectable,
+reading only the partitions that overlap it; scan_tables() lists those tables.
+"""
+
+import logging
+from datetime import date, datetime
+
+from sqlalchemy import Index, MetaData, and_, column, delete, insert, select, table, text, union_all
+from sqlalchemy.orm import Session
+
+from app.models import ScanEvent, ScanPartition
+
+logger = logging.getLogger(__name__)
+
+# Months (including the current one) with a native partition created ahead on PostgreSQL
+PARTITION_MONTHS_AHEAD = 2
+
+
+def month_start(value: date | datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"scan_events_{month:%Y%m}"
+
+
+def _as_datetime(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day)
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def _scan_columns():
+    return [column(col.name, col.type) for col in ScanEvent.__table__.columns]
+
+
+def partition_table(name: str):
+    """Lightweight table construct for a monthly partition (same columns as scan_events)."""
+    return table(name, *_scan_columns())
+
+
+def list_partitions(db: Session, status: str | None = None) -> list[ScanPartition]:
+    """Catalog entries, oldest month first."""
+    query = db.query(ScanPartition)
+    if status is not None:
+        query = query.filter(ScanPartition.status == status)
+    return query.order_by(ScanPartition.month).all()
+
+
+def retained_since(db: Session) -> date | None:
+    """First day after the newest archived month (raw events before it are gone), or None."""
+    newest = (
+        db.query(ScanPartition.month)
+        .filter(ScanPartition.status == "archived")
+        .order_by(ScanPartition.month.desc())
+        .first()
+    )
+    return next_month(newest[0]) if newest else None
+
+
+def scan_tables(db: Session, start: datetime | None = None, end: datetime | None = None) -> list:
+    """
+    Tables holding raw scan events for start <= timestamp < end, oldest first: active
+    monthly partitions overlapping the range (SQLite), then scan_events. On PostgreSQL
+    this is always [scan_events]; the planner prunes native partitions itself.
+    """
+    events = ScanEvent.__table__
+    if _dialect(db) == "postgresql":
+        return [events]
+    months = db.query(ScanPartition.name).filter(ScanPartition.status == "active")
+    if start is not None:
+        months = months.filter(ScanPartition.month >= month_start(start))
+    if end is not None:
+        months = months.filter(ScanPartition.month <= end.date())
+    return [partition_table(name) for (name,) in months.order_by(ScanPartition.month)] + [events]
+
+
+def scan_source(db: Session, start: datetime | None = None, end: datetime | None = None):
+    """
+    Raw scan events with start <= timestamp < end as a subquery named scan_events, with the
+    same columns as ScanEvent. Bounds are optional. Rows with a NULL timestamp are only
+    included when no bounds are given.
+    """
+    columns = [col.name for col in ScanEvent.__table__.columns]
+    selects = []
+    for source in scan_tables(db, start, end):
+        ts = source.c.timestamp
+        conditions = []
+        if start is not None:
+            conditions.append(ts >= start)
+        if end is not None:
+            conditions.append(ts < end)
+        cols = [source.c[name] for name in columns]
+        selects.append(select(*cols).where(and_(*conditions)) if conditions else select(*cols))
+    stmt = selects[0] if len(selects) == 1 else union_all(*selects)
+    return stmt.subquery("scan_events")
+
+
+def _record_partition(db: Session, month: date) -> ScanPartition:
+    name = partition_name(month)
+    part = db.get(ScanPartition, name)
+    if part is None:
+        part = ScanPartition(name=name, month=month, status="active")
+        db.add(part)
+    return part
+
+
+def _create_sqlite_partition(db: Session, name: str) -> None:
+    """Create scan_events_YYYYMM with the scan_events columns and indexes (no FK)."""
+    metadata = MetaData()
+    partition = ScanEvent.__table__.to_metadata(metadata, name=name)
+    for index in list(partition.indexes):
+        partition.indexes.discard(index)
+    for constraint in list(partition.foreign_key_constraints):
+        partition.constraints.discard(constraint)
+    partition.create(db.connection(), checkfirst=True)
+    Index(f"ix_{name}_qr_id_timestamp", partition.c.qr_id, partition.c.timestamp).create(db.connection(), checkfirst=True)
+    Index(f"ix_{name}_qr_id_ip_address", partition.c.qr_id, partition.c.ip_address).create(db.connection(), checkfirst=True)
+    Index(f"ix_{name}_timestamp", partition.c.timestamp).create(db.connection(), checkfirst=True)
+
+
+def rotate_partitions(db: Session, now: datetime | None = None) -> dict[str, int]:
+    """
+    SQLite: move each closed month's events from scan_events into scan_events_YYYYMM
+    (one transaction per month). Months already archived are left alone.
+    Returns {partition name: rows moved}. No-op on PostgreSQL. Commits.
+    """
+    if _dialect(db) == "postgresql":
+        return {}
+    current = month_start(now or datetime.utcnow())
+    events = ScanEvent.__table__
+    oldest = db.execute(
+        select(events.c.timestamp)
+        .where(events.c.timestamp < _as_datetime(current))
+        .order_by(events.c.timestamp)
+        .limit(1)
+    ).scalar()
+    moved = {}
+    month = month_start(oldest) if oldest else current
+    while month < current:
+        name = partition_name(month)
+        part = db.get(ScanPartition, name)
+        window = and_(events.c.timestamp >= _as_datetime(month), events.c.timestamp < _as_datetime(next_month(month)))
+        has_rows = db.execute(select(events.c.id).where(window).limit(1)).first() is not None
+        if has_rows and (part is None or part.status == "active"):
+            _create_sqlite_partition(db, name)
+            cols = [col.name for col in events.columns]
+            count = db.execute(
+                insert(partition_table(name)).from_select(cols, select(*[events.c[c] for c in cols]).where(window))
+            ).rowcount
+            db.execute(delete(events).where(window))
+            part = _record_partition(db, month)
+            part.row_count = (part.row_count or 0) + count
+            db.commit()
+            moved[name] = count
+            logger.info("Rotated %d scan events into %s", count, name)
+        month = next_month(month)
+    return moved
+
+
+def ensure_partitions(db: Session, now: datetime | None = None, months_ahead: int = PARTITION_MONTHS_AHEAD) -> list[str]:
+    """
+    PostgreSQL: create native monthly partitions from the current month through months_ahead.
+    Returns the names of partitions created. No-op on SQLite. Commits.
+    """
+    if _dialect(db) != "postgresql":
+        return []
+    created = []
+    month = month_start(now or datetime.utcnow())
+    for _ in range(months_ahead + 1):
+        name = partition_name(month)
+        exists = db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if exists is None:
+            db.execute(text(
+                f"CREATE TABLE {name} PARTITION OF scan_events "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month(month).isoformat()}')"
+            ))
+            created.append(name)
+        _record_partition(db, month)
+        month = next_month(month)
+    db.commit()
+    return created
@@ -2,9 +2,11 @@
 # ===== PHASE 4: Dynamic Redirect System =====
 # ===== PHASE 6: Styling Engine =====
 # ===== PHASE 7: QR Templates =====
+# ===== PHASE 10: Performance & Scaling =====
 """
 Service layer for QR code creation.
-Generates QR image and stores DB record.
+Stores the DB record; images are rendered on demand by /qr/{id}/image
+(optionally pre-rendered to static/qrcodes/ at create time).
 QR encodes redirect URL (e.g. /r/{id}) so scans are tracked.
 """
 
@@ -13,14 +15,48 @@ import uuid
 from sqlalchemy.orm import Session
 
 from app.models import QRCode
-from app.services.styling_service import resolve_logo_path
-from app.utils.qr_generator import generate_qr_image
+from app.services.redirect_cache import invalidate_redirect
+from app.services.render_service import render_service
+from app.services.styling_service import resolve_logo_path, validate_color
+from app.utils.metrics import stage
 
 BASE_URL = os.environ.get("SMARTQR_BASE_URL", "http://127.0.0.1:8000")
+# Also write static/qrcodes/{id}.png at create time (legacy static URLs)
+PRERENDER_ON_CREATE = os.environ.get("SMARTQR_PRERENDER_ON_CREATE", "0") == "1"
 
+# Template payloads are encoded directly; everything else goes through /r/{id}
+_DIRECT_PAYLOAD_PREFIXES = ("WIFI:", "BEGIN:VCARD", "BEGIN:VCALENDAR")
 
-def create_qr(
-    db: Session,
+
+def image_url(qr_id: str) -> str:
+    """Public URL of the on-demand image endpoint for a QR code."""
+    return f"/qr/{qr_id}/image"
+
+
+def get_encoded_data(qr: QRCode) -> str:
+    """
+    Payload inside the QR image. Rows created before encoded_data was stored fall back
+    to the creation rules: templates encode their data, everything else the redirect URL.
+    """
+    if qr.encoded_data:
+        return qr.encoded_data
+    if qr.original_data.startswith(_DIRECT_PAYLOAD_PREFIXES):
+        return qr.original_data
+    return f"{BASE_URL.rstrip('/')}/r/{qr.id}"
+
+
+def get_render_params(qr: QRCode) -> dict:
+    """Styling arguments for qr_generator.render_qr / render_cache_key for a stored QR code."""
+    resolved_logo = resolve_logo_path(qr.logo_path)
+    return {
+        "data": get_encoded_data(qr),
+        "fill_color": qr.fill_color or "black",
+        "back_color": qr.back_color or "white",
+        "logo_path": str(resolved_logo) if resolved_logo else None,
+    }
+
+
+def build_qr(
     name: str,
     original_data: str,
     redirect_url: str | None = None,
@@ -28,42 +64,62 @@ def create_qr(
     back_color: str = "white",
     logo_path: str | None = None,
     use_redirect: bool = True,
+    campaign: str | None = None,
 ) -> QRCode:
     """
-    Create a QR code: generate PNG, save to static/qrcodes/, store in DB.
+    Build an unsaved QRCode row: assigns the id and the payload encoded in the image.
     use_redirect=True: QR encodes redirect URL (scans tracked). Default for URLs.
     use_redirect=False: QR encodes data directly (WiFi/vCard/Calendar templates).
-    Returns the QRCode model instance.
     """
     qr_id = str(uuid.uuid4())
-    filename = f"{qr_id}.png"
 
     if use_redirect:
         data_to_encode = f"{BASE_URL.rstrip('/')}/r/{qr_id}"
     else:
         data_to_encode = original_data
 
-    resolved_logo = resolve_logo_path(logo_path)
-    generate_qr_image(
-        data=data_to_encode,
-        filename=filename,
-        fill_color=fill_color,
-        back_color=back_color,
-        logo_path=str(resolved_logo) if resolved_logo else None,
-    )
-
-    # Store record in database
-    qr = QRCode(
+    return QRCode(
         id=qr_id,
         name=name,
         original_data=original_data,
         redirect_url=redirect_url or original_data,
+        encoded_data=data_to_encode,
         fill_color=fill_color,
         back_color=back_color,
-        logo_path=logo_path if resolved_logo else None,
+        logo_path=logo_path if resolve_logo_path(logo_path) else None,
+        campaign=campaign,
     )
+
+
+def create_qr(
+    db: Session,
+    name: str,
+    original_data: str,
+    redirect_url: str | None = None,
+    fill_color: str = "black",
+    back_color: str = "white",
+    logo_path: str | None = None,
+    use_redirect: bool = True,
+    campaign: str | None = None,
+) -> QRCode:
+    """
+    Create a QR code and store it in DB. The image is rendered lazily by /qr/{id}/image;
+    with SMARTQR_PRERENDER_ON_CREATE=1 a PNG is also saved to static/qrcodes/.
+    See build_qr for use_redirect.
+    Returns the QRCode model instance; raises ValueError for an invalid color.
+    """
+    fill_color = validate_color(fill_color, "black")
+    back_color = validate_color(back_color, "white")
+    qr = build_qr(name, original_data, redirect_url, fill_color, back_color, logo_path, use_redirect, campaign)
+    if PRERENDER_ON_CREATE:
+        render_service.generate(**get_render_params(qr), filename=f"{qr.id}.png")
+
+    # Store record in database
     db.add(qr)
-    db.commit()
+    with stage("create.commit"):
+        db.commit()
     db.refresh(qr)
+    # Drop any negative entry cached for this id before it existed
+    invalidate_redirect(qr.id)
 
     return qr
@@ -0,0 +1,126 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+In-memory cache of QR id -> redirect target for the /r/{qr_id} hot path.
+Unknown ids are cached as negative entries with a shorter TTL.
+Entries are invalidated whenever a QRCode row is inserted, updated or deleted,
+both at flush time and again after the transaction commits; committed
+invalidations are also sent to sibling worker processes over the peer bus.
+A target read from the database is only cached if no invalidation ran during the
+read, so a lookup that raced an edit cannot re-insert the old target.
+"""
+
+import os
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.models import QRCode
+from app.utils.cache import MISSING, LRUCache
+from app.utils.metrics import stage
+from app.utils.peer_bus import peer_bus
+
+REDIRECT_CACHE_SIZE = int(os.environ.get("SMARTQR_REDIRECT_CACHE_SIZE", "10000"))
+REDIRECT_CACHE_TTL = float(os.environ.get("SMARTQR_REDIRECT_CACHE_TTL", "300"))
+REDIRECT_CACHE_NEGATIVE_TTL = float(os.environ.get("SMARTQR_REDIRECT_CACHE_NEGATIVE_TTL", "30"))
+
+redirect_cache = LRUCache(maxsize=REDIRECT_CACHE_SIZE, ttl=REDIRECT_CACHE_TTL)
+
+_PENDING_KEY = "smartqr_redirect_invalidations"
+
+
+def _target_select(qr_id: str):
+    return select(QRCode.redirect_url, QRCode.original_data).where(QRCode.id == qr_id)
+
+
+def _remember(qr_id: str, row, generation: int) -> str | None:
+    # Not cached if an invalidation (local or from a peer) ran while the row was read
+    if row is None:
+        redirect_cache.set(qr_id, None, ttl=REDIRECT_CACHE_NEGATIVE_TTL, generation=generation)
+        return None
+    target = row.redirect_url or row.original_data or ""
+    redirect_cache.set(qr_id, target, generation=generation)
+    return target
+
+
+def get_redirect_target(db: Session, qr_id: str) -> str | None:
+    """
+    Return the redirect target for a QR code, or None if the id is unknown.
+    An empty string means the QR exists but has nothing to redirect to.
+    """
+    cached = redirect_cache.get(qr_id)
+    if cached is not MISSING:
+        return cached
+    generation = redirect_cache.generation
+    with stage("redirect.db_query"):
+        row = db.execute(_target_select(qr_id)).first()
+    return _remember(qr_id, row, generation)
+
+
+async def get_redirect_target_async(db: AsyncSession, qr_id: str) -> str | None:
+    """Async variant of get_redirect_target for the /r/{qr_id} route."""
+    cached = redirect_cache.get(qr_id)
+    if cached is not MISSING:
+        return cached
+    generation = redirect_cache.generation
+    with stage("redirect.db_query"):
+        row = (await db.execute(_target_select(qr_id))).first()
+    return _remember(qr_id, row, generation)
+
+
+def invalidate_redirect(qr_id: str) -> None:
+    """Drop the cached target (or negative entry) for a QR id."""
+    redirect_cache.invalidate(qr_id)
+
+
+def _on_qrcode_change(mapper, connection, target) -> None:
+    invalidate_redirect(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(QRCode, _event_name, _on_qrcode_change)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_bulk_qrcode_statement(orm_execute_state) -> None:
+    """Bulk UPDATE/DELETE on qrcodes bypasses mapper events; flush the whole cache after commit."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is QRCode:
+        orm_execute_state.session.info[_PENDING_KEY] = None
+        redirect_cache.clear()
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    # A concurrent reader may have re-filled an entry with the pre-commit value; drop it again
+    if _PENDING_KEY not in session.info:
+        return
+    pending = session.info.pop(_PENDING_KEY)
+    if pending is None:
+        redirect_cache.clear()
+    else:
+        for qr_id in pending:
+            invalidate_redirect(qr_id)
+    peer_bus.publish("redirect", None if pending is None else sorted(pending))
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+def _on_peer_invalidation(qr_ids: list[str] | None) -> None:
+    """A sibling worker committed QR changes (None: a bulk statement, drop everything)."""
+    if qr_ids is None:
+        redirect_cache.clear()
+        return
+    for qr_id in qr_ids:
+        invalidate_redirect(qr_id)
+
+
+peer_bus.subscribe("redirect", _on_peer_invalidation)
@@ -0,0 +1,240 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Process-pool render service.
+CPU-bound Pillow work (QR matrix -> image, logo resize/composite, PNG/WebP encode)
+runs in worker processes so it neither holds the GIL nor stalls request handling.
+The render cache is still consulted in the parent process first.
+
+Backpressure: at most `max_pending` renders may be queued or running; further
+submissions fail fast with RenderBusyError. Each render waits at most `timeout`
+seconds (RenderTimeoutError). With workers=0 renders run inline.
+With SMARTQR_METRICS=1 workers send their stage timings back with each image.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from app.utils.metrics import METRICS_ENABLED, record_stages, render_failures
+from app.utils.qr_generator import (
+    _render_image,
+    _render_image_timed,
+    generate_qr_image,
+    preload_logos,
+    prepare_render,
+    render_cache,
+    render_qr,
+)
+
+logger = logging.getLogger(__name__)
+
+RENDER_WORKERS = int(os.environ.get("SMARTQR_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+RENDER_MAX_PENDING = int(os.environ.get("SMARTQR_RENDER_MAX_PENDING", str(max(1, RENDER_WORKERS) * 8)))
+RENDER_TIMEOUT = float(os.environ.get("SMARTQR_RENDER_TIMEOUT", "10"))
+
+
+class RenderBusyError(RuntimeError):
+    """Too many renders queued; the caller should retry later."""
+
+
+class RenderTimeoutError(TimeoutError):
+    """A render did not finish within the configured timeout."""
+
+
+def _warm_up() -> int:
+    """Runs once per worker: import qrcode/Pillow, render a tiny code and preload logos."""
+    _render_image("warm-up", "black", "white", None, 1, 0)
+    preload_logos()
+    return os.getpid()
+
+
+class RenderService:
+    """Submits renders to a ProcessPoolExecutor with bounded in-flight work and per-task timeouts."""
+
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        self.workers = max(0, workers)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max(1, max_pending))
+        self.max_pending = max(1, max_pending)
+        self._pool: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.inline = 0
+
+    @property
+    def running(self) -> bool:
+        return self._pool is not None
+
+    def start(self, warm_up: bool = True) -> None:
+        """Create the worker pool; with warm_up, block until every worker has rendered once."""
+        if self.running:
+            return
+        if self.workers > 0:
+            # spawn: workers import only qr_generator, not the app (and inherit no threads/sockets)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        if warm_up:
+            self.warm_up()
+
+    def warm_up(self) -> int:
+        """
+        Render once in every pool worker (inline mode: in this process), paying for the
+        qrcode/Pillow imports and logo decoding before the first request does. Returns the
+        number of processes warmed.
+        """
+        pool = self._pool
+        if pool is None:
+            if self.workers > 0:
+                return 0  # stopped
+            _warm_up()
+            return 1
+        pids = {f.result() for f in [pool.submit(_warm_up) for _ in range(self.workers)]}
+        logger.info("Render pool warmed up (%d workers)", len(pids))
+        return len(pids)
+
+    def stop(self) -> None:
+        """Shut the pool down, cancelling queued renders."""
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _submit(self, render_args: tuple) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            render_failures.inc("busy")
+            raise RenderBusyError(f"more than {self.max_pending} renders pending")
+        try:
+            future = self._pool.submit(_render_image_timed if METRICS_ENABLED else _render_image, *render_args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._on_done)
+        with self._lock:
+            self.submitted += 1
+        return future
+
+    def _on_done(self, future: Future) -> None:
+        # Slots are held until the worker actually finishes, even if the caller timed out
+        self._slots.release()
+        with self._lock:
+            if future.cancelled() or future.exception() is not None:
+                self.failures += 1
+                render_failures.inc("error")
+            else:
+                self.completed += 1
+
+    @staticmethod
+    def _content(result) -> bytes:
+        """Pool result -> image bytes, recording worker stage timings when metrics are on."""
+        if METRICS_ENABLED:
+            content, timings = result
+            record_stages(timings)
+            return content
+        return result
+
+    def _render_in_pool(self, *render_args) -> bytes:
+        """Blocking renderer for qr_generator (used from sync code / threadpool handlers)."""
+        if not self.running:
+            with self._lock:
+                self.inline += 1
+            try:
+                return _render_image(*render_args)
+            except Exception:
+                render_failures.inc("error")
+                raise
+        future = self._submit(render_args)
+        try:
+            return self._content(future.result(timeout=self.timeout))
+        except FutureTimeoutError as e:
+            with self._lock:
+                self.timeouts += 1
+            render_failures.inc("timeout")
+            raise RenderTimeoutError(f"render exceeded {self.timeout}s") from e
+
+    def render(self, **params) -> bytes:
+        """Render (cache first) and wait for the result. Params as for qr_generator.render_qr."""
+        return render_qr(**params, renderer=self._render_in_pool)
+
+    def generate(self, **params) -> str:
+        """generate_qr_image with the pixel work done in the pool."""
+        return generate_qr_image(**params, renderer=self._render_in_pool)
+
+    async def render_async(self, busy_wait: float = 0.0, store: bool = True, **params) -> bytes:
+        """
+        Render without occupying a thread: await the pool future from the event loop.
+        Only a memory-tier cache hit is answered inline; logo hashing and the disk tier
+        (lookup and store) run in the default thread pool.
+        busy_wait: seconds to keep retrying (with backoff) while the pool is saturated,
+        for batch jobs that should queue rather than fail. store=False skips writing the
+        result to the render cache (one-off exports should not evict hot entries).
+        """
+        if params.get("logo_path"):
+            key, render_args = await asyncio.to_thread(prepare_render, **params)  # stats/hashes the logo
+        else:
+            key, render_args = prepare_render(**params)
+        content = render_cache.get_memory(key)
+        if content is None:
+            if render_cache.disk_enabled:
+                content = await asyncio.to_thread(render_cache.get_disk, key)
+            else:
+                content = render_cache.get_disk(key)
+        if content is not None:
+            return content
+        if not self.running:
+            content = await asyncio.to_thread(self._render_in_pool, *render_args)
+        else:
+            deadline = time.monotonic() + busy_wait
+            delay = 0.01
+            while True:
+                try:
+                    future = self._submit(render_args)
+                    break
+                except RenderBusyError:
+                    if time.monotonic() + delay > deadline:
+                        raise
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, 0.5)
+            try:
+                content = self._content(await asyncio.wait_for(asyncio.wrap_future(future), self.timeout))
+            except asyncio.TimeoutError as e:
+                with self._lock:
+                    self.timeouts += 1
+                render_failures.inc("timeout")
+                raise RenderTimeoutError(f"render exceeded {self.timeout}s") from e
+        if store:
+            if render_cache.disk_enabled:
+                await asyncio.to_thread(render_cache.put, key, content)
+            else:
+                render_cache.put(key, content)
+        return content
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "running": self.running,
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.submitted - self.completed - self.failures,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts,
+                "failures": self.failures,
+                "inline": self.inline,
+                "timeout": self.timeout,
+            }
+
+
+render_service = RenderService(RENDER_WORKERS, RENDER_MAX_PENDING, RENDER_TIMEOUT)
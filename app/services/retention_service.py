@@ -0,0 +1,238 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Retention for raw scan partitions.
+Months older than SMARTQR_SCAN_RETENTION_MONTHS are archived to compressed NDJSON
+(or Parquet when pyarrow is installed) and dropped. Before a month is dropped, its
+row count is checked against the daily rollups; on a mismatch the month's rollups
+are rebuilt from the raw rows first. Stats keep working from rollups and sketches.
+A background maintainer rotates (SQLite), pre-creates partitions (PostgreSQL) and
+applies retention periodically.
+"""
+
+import gzip
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import ScanDailyRollup, ScanEvent, ScanPartition
+from app.services.partition_service import (
+    ensure_partitions,
+    month_start,
+    next_month,
+    partition_table,
+    rotate_partitions,
+)
+from app.services.rollup_service import rebuild_rollups
+
+logger = logging.getLogger(__name__)
+
+SCAN_RETENTION_MONTHS = int(os.environ.get("SMARTQR_SCAN_RETENTION_MONTHS", "0"))  # 0 = keep forever
+SCAN_ARCHIVE_FORMAT = os.environ.get("SMARTQR_SCAN_ARCHIVE_FORMAT", "ndjson")  # ndjson | parquet | none
+SCAN_ARCHIVE_DIR = Path(os.environ.get("SMARTQR_SCAN_ARCHIVE_DIR", "archive/scans"))
+PARTITION_MAINTENANCE_INTERVAL = float(os.environ.get("SMARTQR_PARTITION_MAINTENANCE_INTERVAL", "3600"))
+
+ARCHIVE_FORMATS = ("ndjson", "parquet", "none")
+_ARCHIVE_BATCH = 5000
+
+
+def _month_rows(db: Session, part: ScanPartition):
+    """Select of the partition's raw rows (native partition or rotated table have the same name)."""
+    source = partition_table(part.name)
+    return select(*[source.c[col.name] for col in ScanEvent.__table__.columns])
+
+
+def _rollups_match(db: Session, part: ScanPartition) -> tuple[int, int]:
+    """(raw row count, rolled-up scan count) for the partition's month."""
+    raw = db.execute(select(func.count()).select_from(_month_rows(db, part).subquery())).scalar() or 0
+    rolled = db.execute(
+        select(func.coalesce(func.sum(ScanDailyRollup.scans), 0)).where(
+            ScanDailyRollup.day >= part.month, ScanDailyRollup.day < next_month(part.month)
+        )
+    ).scalar() or 0
+    return raw, rolled
+
+
+def _write_ndjson(db: Session, part: ScanPartition, path: Path) -> int:
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as out:
+        for row in db.execute(_month_rows(db, part).execution_options(yield_per=_ARCHIVE_BATCH)).mappings():
+            record = {k: v.isoformat() if isinstance(v, (datetime, date)) else v for k, v in row.items()}
+            out.write(json.dumps(record, separators=(",", ":")) + "\n")
+            count += 1
+    return count
+
+
+def _write_parquet(db: Session, part: ScanPartition, path: Path) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("SMARTQR_SCAN_ARCHIVE_FORMAT=parquet requires pyarrow (pip install pyarrow)") from e
+    count = 0
+    writer = None
+    result = db.execute(_month_rows(db, part).execution_options(yield_per=_ARCHIVE_BATCH)).mappings()
+    try:
+        for batch in result.partitions():
+            table = pa.Table.from_pylist([dict(row) for row in batch])
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+            writer.write_table(table)
+            count += len(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def _drop_partition(db: Session, part: ScanPartition) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text(f"ALTER TABLE scan_events DETACH PARTITION {part.name}"))
+    db.execute(text(f"DROP TABLE IF EXISTS {part.name}"))
+
+
+def archive_partition(db: Session, part: ScanPartition, fmt: str = SCAN_ARCHIVE_FORMAT) -> Path | None:
+    """
+    Verify rollups for the month, export its raw rows (unless fmt is "none"), drop the
+    partition and mark it archived. Returns the archive path. Commits.
+    """
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f"archive format must be one of {', '.join(ARCHIVE_FORMATS)}")
+    raw, rolled = _rollups_match(db, part)
+    if raw != rolled:
+        logger.warning("Rollups for %s cover %d of %d scans; rebuilding before archiving", part.name, rolled, raw)
+        rebuild_rollups(db, since=part.month, until=next_month(part.month))
+        raw, rolled = _rollups_match(db, part)
+        if raw != rolled:
+            raise RuntimeError(f"rollups for {part.name} still cover {rolled} of {raw} scans; not archiving")
+
+    path = None
+    if fmt != "none":
+        SCAN_ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+        suffix = ".ndjson.gz" if fmt == "ndjson" else ".parquet"
+        path = SCAN_ARCHIVE_DIR / f"{part.name}{suffix}"
+        tmp = path.with_name(path.name + ".tmp")
+        written = (_write_ndjson if fmt == "ndjson" else _write_parquet)(db, part, tmp)
+        if written != raw:
+            tmp.unlink(missing_ok=True)
+            raise RuntimeError(f"archived {written} of {raw} rows from {part.name}; not dropping")
+        os.replace(tmp, path)
+
+    _drop_partition(db, part)
+    part.status = "archived"
+    part.row_count = raw
+    part.archive_path = str(path) if path else None
+    part.archived_at = datetime.utcnow()
+    db.commit()
+    logger.info("Archived %d scan events from %s to %s", raw, part.name, path or "(dropped)")
+    return path
+
+
+def apply_retention(db: Session, now: datetime | None = None, months: int = SCAN_RETENTION_MONTHS) -> list[str]:
+    """Archive active partitions older than `months` full months. Returns archived partition names."""
+    if months <= 0:
+        return []
+    cutoff = month_start(now or datetime.utcnow())
+    for _ in range(months):
+        cutoff = month_start(date.fromordinal(cutoff.toordinal() - 1))
+    expired = (
+        db.query(ScanPartition)
+        .filter(ScanPartition.status == "active", ScanPartition.month < cutoff)
+        .order_by(ScanPartition.month)
+        .all()
+    )
+    archived = []
+    for part in expired:
+        archive_partition(db, part)
+        archived.append(part.name)
+    return archived
+
+
+# pg_try_advisory_lock key so only one process maintains partitions at a time
+_MAINTENANCE_LOCK_KEY = 0x5351_5041  # "SQPA"
+
+
+def maintain_partitions(db: Session, now: datetime | None = None) -> dict:
+    """One maintenance pass: rotate closed months (SQLite), create upcoming partitions (PostgreSQL), apply retention."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return _maintain(db, now)
+    # Session-level lock on a dedicated connection: the pass itself commits several times
+    with bind.connect() as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": _MAINTENANCE_LOCK_KEY}).scalar():
+            return {"skipped": "another process is maintaining partitions"}
+        try:
+            return _maintain(db, now)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _MAINTENANCE_LOCK_KEY})
+
+
+def _maintain(db: Session, now: datetime | None) -> dict:
+    return {
+        "rotated": rotate_partitions(db, now),
+        "created": ensure_partitions(db, now),
+        "archived": apply_retention(db, now),
+    }
+
+
+class PartitionMaintainer:
+    """Runs maintain_partitions on a daemon thread every `interval` seconds (0 disables)."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.runs = 0
+        self.failures = 0
+        self.last_run: datetime | None = None
+        self.last_result: dict | None = None
+
+    def start(self) -> None:
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="partition-maintainer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_once(self) -> dict:
+        with SessionLocal() as db:
+            result = maintain_partitions(db)
+        self.runs += 1
+        self.last_run = datetime.utcnow()
+        self.last_result = result
+        return result
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:  # noqa: BLE001 - keep maintaining on the next tick
+                self.failures += 1
+                logger.exception("Scan partition maintenance failed")
+            self._stop.wait(self.interval)
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "retention_months": SCAN_RETENTION_MONTHS,
+            "archive_format": SCAN_ARCHIVE_FORMAT,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_result": self.last_result,
+        }
+
+
+partition_maintainer = PartitionMaintainer(PARTITION_MAINTENANCE_INTERVAL)
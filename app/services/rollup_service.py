@@ -0,0 +1,234 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Incrementally maintained scan rollups (per QR per day, per device type, per country)
+and per-day HyperLogLog unique-visitor sketches.
+apply_rollups runs in the same transaction as the scan inserts, so counters never
+drift from raw events; rebuild_rollups recomputes them from the retained raw
+partitions (rollups for archived months are kept as they are).
+"""
+
+from collections import Counter, defaultdict
+from datetime import date, datetime, time
+
+from sqlalchemy import delete, func, insert, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import ScanCountryRollup, ScanDailyRollup, ScanDeviceRollup, ScanVisitorSketch
+from app.services.partition_service import retained_since, scan_source
+from app.utils.hll import HyperLogLog
+
+# Rollup key used for scans with no device type / country
+UNKNOWN = "unknown"
+
+_UPSERT_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def _upsert_counts(db: Session, model, key_cols: tuple[str, ...], counts: Counter) -> None:
+    """Add counts to rollup rows, creating them as needed (INSERT ... ON CONFLICT DO UPDATE)."""
+    if not counts:
+        return
+    rows = [dict(zip(key_cols, key), scans=n) for key, n in counts.items()]
+    dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key_cols),
+            set_={"scans": model.scans + stmt.excluded.scans},
+        )
+        db.execute(stmt, rows)
+        return
+    # Portable fallback: update, then insert the rows that did not exist yet
+    for row in rows:
+        match = [getattr(model, col) == row[col] for col in key_cols]
+        result = db.execute(update(model).where(*match).values(scans=model.scans + row["scans"]))
+        if result.rowcount == 0:
+            db.execute(insert(model).values(**row))
+
+
+def _store_sketches(db: Session, sketches: dict) -> None:
+    """Upsert (qr_id, day) -> HyperLogLog sketches, replacing the stored registers."""
+    rows = [
+        {"qr_id": qr_id, "day": day, "registers": sketch.to_bytes()}
+        for (qr_id, day), sketch in sketches.items()
+    ]
+    if not rows:
+        return
+    dialect_insert = _UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(ScanVisitorSketch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["qr_id", "day"],
+            set_={"registers": stmt.excluded.registers},
+        )
+        db.execute(stmt, rows)
+        return
+    for row in rows:
+        result = db.execute(
+            update(ScanVisitorSketch)
+            .where(ScanVisitorSketch.qr_id == row["qr_id"], ScanVisitorSketch.day == row["day"])
+            .values(registers=row["registers"])
+        )
+        if result.rowcount == 0:
+            db.execute(insert(ScanVisitorSketch).values(**row))
+
+
+def _apply_sketches(db: Session, visitors: dict) -> None:
+    """Merge new visitor IPs into the stored per-day sketches (read-modify-write, row-locked where supported)."""
+    if not visitors:
+        return
+    keys = list(visitors)
+    existing = db.execute(
+        select(ScanVisitorSketch.qr_id, ScanVisitorSketch.day, ScanVisitorSketch.registers)
+        .where(or_(*(
+            (ScanVisitorSketch.qr_id == qr_id) & (ScanVisitorSketch.day == day) for qr_id, day in keys
+        )))
+        .with_for_update()
+    ).all()
+    sketches = {(qr_id, day): HyperLogLog.from_bytes(registers) for qr_id, day, registers in existing}
+    for key, ips in visitors.items():
+        sketch = sketches.setdefault(key, HyperLogLog())
+        for ip in ips:
+            sketch.add(ip)
+    _store_sketches(db, {key: sketches[key] for key in keys})
+
+
+def apply_rollups(db: Session, records: list[dict]) -> None:
+    """
+    Fold scan records (qr_id, timestamp, device_type, country, ip_address) into the rollup tables.
+    Records must be in stored form (scan_codes.normalize_scan) so they match a rebuild. Does not commit.
+    """
+    daily: Counter = Counter()
+    devices: Counter = Counter()
+    countries: Counter = Counter()
+    visitors: dict = defaultdict(set)
+    for record in records:
+        day = (record.get("timestamp") or datetime.utcnow()).date()
+        qr_id = record["qr_id"]
+        daily[(qr_id, day)] += 1
+        devices[(qr_id, day, record.get("device_type") or UNKNOWN)] += 1
+        countries[(qr_id, day, record.get("country") or UNKNOWN)] += 1
+        if record.get("ip_address"):
+            visitors[(qr_id, day)].add(record["ip_address"])
+    _upsert_counts(db, ScanDailyRollup, ("qr_id", "day"), daily)
+    _upsert_counts(db, ScanDeviceRollup, ("qr_id", "day", "device_type"), devices)
+    _upsert_counts(db, ScanCountryRollup, ("qr_id", "day", "country"), countries)
+    _apply_sketches(db, visitors)
+
+
+def _day_window(model, qr_id: str | None, since: date | None, until: date | None) -> list:
+    conditions = []
+    if qr_id:
+        conditions.append(model.qr_id == qr_id)
+    if since is not None:
+        conditions.append(model.day >= since)
+    if until is not None:
+        conditions.append(model.day < until)
+    return conditions
+
+
+def rebuild_rollups(
+    db: Session,
+    qr_id: str | None = None,
+    since: date | None = None,
+    until: date | None = None,
+    batch_size: int = 1000,
+) -> int:
+    """
+    Recompute rollups from raw scan events (all QRs, or one when qr_id is given) for days in
+    [since, until). Days whose raw partitions were archived are never touched: since defaults
+    to the first retained day. Returns the number of scan events folded in. Commits.
+    """
+    retained = retained_since(db)
+    if retained is not None and (since is None or since < retained):
+        since = retained
+    events = scan_source(
+        db,
+        start=datetime.combine(since, time.min) if since else None,
+        end=datetime.combine(until, time.min) if until else None,
+    )
+    day = func.date(events.c.timestamp)
+    dimensions = (
+        (ScanDailyRollup, ()),
+        (ScanDeviceRollup, (("device_type", events.c.device_type),)),
+        (ScanCountryRollup, (("country", events.c.country),)),
+    )
+    for model, extra in dimensions:
+        db.execute(delete(model).where(*_day_window(model, qr_id, since, until)))
+        extra_cols = [col for _, col in extra]
+        source = select(events.c.qr_id, day, *extra_cols, func.count(events.c.id)).where(
+            events.c.timestamp.isnot(None)
+        )
+        if qr_id:
+            source = source.where(events.c.qr_id == qr_id)
+        source = source.group_by(events.c.qr_id, day, *extra_cols)
+        if not extra:
+            db.execute(insert(model).from_select(["qr_id", "day", "scans"], source))
+            continue
+        # Device/country are stored as codes; read them back decoded and insert the labels
+        names = [name for name, _ in extra]
+        for batch in db.execute(source.execution_options(yield_per=batch_size)).partitions():
+            rows = []
+            for row_qr_id, row_day, *labels, scans in batch:
+                if isinstance(row_day, str):
+                    row_day = datetime.strptime(row_day, "%Y-%m-%d").date()
+                row = {"qr_id": row_qr_id, "day": row_day, "scans": scans}
+                row.update((name, label or UNKNOWN) for name, label in zip(names, labels))
+                rows.append(row)
+            db.execute(insert(model), rows)
+
+    _rebuild_sketches(db, events, qr_id, since, until, batch_size)
+
+    total = select(func.count(events.c.id)).where(events.c.timestamp.isnot(None))
+    if qr_id:
+        total = total.where(events.c.qr_id == qr_id)
+    folded = db.execute(total).scalar() or 0
+    db.commit()
+    return folded
+
+
+def _rebuild_sketches(
+    db: Session,
+    events,
+    qr_id: str | None = None,
+    since: date | None = None,
+    until: date | None = None,
+    batch_size: int = 1000,
+) -> None:
+    """Recompute visitor sketches by streaming raw IPs; holds at most one batch of sketches in memory."""
+    db.execute(delete(ScanVisitorSketch).where(*_day_window(ScanVisitorSketch, qr_id, since, until)))
+
+    day = func.date(events.c.timestamp)
+    source = (
+        select(events.c.qr_id, day, events.c.ip_address)
+        .where(events.c.ip_address.isnot(None), events.c.timestamp.isnot(None))
+        .order_by(events.c.qr_id, day)
+        .execution_options(yield_per=batch_size)
+    )
+    if qr_id:
+        source = source.where(events.c.qr_id == qr_id)
+    pending: dict = {}
+    for row_qr_id, row_day, ip in db.execute(source):
+        if isinstance(row_day, str):
+            row_day = datetime.strptime(row_day, "%Y-%m-%d").date()
+        key = (row_qr_id, row_day)
+        if key not in pending and len(pending) >= batch_size:
+            _store_sketches(db, pending)
+            pending = {}
+        pending.setdefault(key, HyperLogLog()).add(ip)
+    _store_sketches(db, pending)
+
+
+def ensure_rollups_backfilled(db: Session) -> bool:
+    """Rebuild rollups once for databases that have scans but no rollup rows yet. Returns True if rebuilt."""
+    has_rollups = db.query(ScanDailyRollup.qr_id).limit(1).first() is not None
+    if has_rollups:
+        return False
+    has_scans = db.execute(select(scan_source(db).c.id).limit(1)).first() is not None
+    if not has_scans:
+        return False
+    rebuild_rollups(db)
+    return True
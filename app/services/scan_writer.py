@@ -0,0 +1,214 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Background writer for scan events.
+The redirect path enqueues lightweight event records; a daemon thread drains the
+queue and hands batches to a flush callable (multi-row INSERT) when either the
+batch size or the flush interval is reached.
+A batch that fails is retried with exponential backoff (the flush callable must
+be one transaction, so a failed attempt wrote nothing). If it still fails it is
+split in halves so one bad record cannot take the rest of the batch with it;
+only records that could not be written on their own count as failed.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# What to do when the queue is full:
+#   sync        - reject the record so the caller writes it inline (no data loss)
+#   drop_newest - discard the incoming record
+#   drop_oldest - discard the oldest queued record to make room
+OVERFLOW_POLICIES = ("sync", "drop_newest", "drop_oldest")
+
+
+class ScanWriter:
+    """Bounded queue + single writer thread that flushes records in batches."""
+
+    def __init__(
+        self,
+        flush: Callable[[list[dict]], None],
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.5,
+        overflow: str = "sync",
+        retries: int = 3,
+        retry_backoff: float = 0.1,
+    ):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {', '.join(OVERFLOW_POLICIES)}")
+        self._flush_fn = flush
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.retries = max(0, retries)
+        self.retry_backoff = retry_backoff
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_queue))
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        # Metrics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.failed = 0
+        self.retried = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the writer thread (no-op if already running)."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="scan-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the writer thread after flushing everything still queued."""
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, record: dict) -> bool:
+        """
+        Enqueue a record without blocking.
+        Returns False when the caller must write the record itself (writer not
+        running, or queue full under the 'sync' policy).
+        """
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            if self.overflow == "sync":
+                with self._lock:
+                    self.rejected += 1
+                return False
+            if self.overflow == "drop_oldest":
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    self._queue.put_nowait(record)
+                except queue.Full:
+                    pass
+            with self._lock:
+                self.dropped += 1
+            return True
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+        self._drain()
+
+    def _drain(self) -> None:
+        """Flush whatever is left in the queue (called on shutdown)."""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._flush(batch)
+
+    def _flush(self, batch: list[dict]) -> None:
+        started = time.perf_counter()
+        written = len(batch) if self._attempt(batch) else self._retry(batch)
+        if written < len(batch):
+            logger.error("Dropped %d of %d scan events after %d retries", len(batch) - written, len(batch), self.retries)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.written += written
+            self.failed += len(batch) - written
+            self.flushes += 1
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self._total_flush_ms += elapsed_ms
+
+    def _attempt(self, batch: list[dict]) -> bool:
+        try:
+            self._flush_fn(batch)
+            return True
+        except Exception:
+            logger.warning("Failed to write %d scan events", len(batch), exc_info=True)
+            return False
+
+    def _retry(self, batch: list[dict]) -> int:
+        """Retry a failed batch with backoff, then bisect it. Returns the number of records written."""
+        delay = self.retry_backoff
+        for _ in range(self.retries):
+            time.sleep(delay)
+            delay *= 2
+            with self._lock:
+                self.retried += 1
+            if self._attempt(batch):
+                return len(batch)
+        return self._bisect(batch)
+
+    def _bisect(self, batch: list[dict]) -> int:
+        """Write the halves of a failed batch on their own to isolate records that cannot be written."""
+        if len(batch) == 1:
+            return 0
+        half = len(batch) // 2
+        written = 0
+        for part in (batch[:half], batch[half:]):
+            part_written = len(part) if self._attempt(part) else self._bisect(part)
+            written += part_written
+            if part_written == 0 and len(part) > 1:
+                # Not one bad record: every row of this half failed, so the database is the problem
+                break
+        return written
+
+    def stats(self) -> dict:
+        """Queue depth, throughput and flush latency counters."""
+        with self._lock:
+            return {
+                "running": self.running,
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "overflow_policy": self.overflow,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "rejected": self.rejected,
+                "failed": self.failed,
+                "retried": self.retried,
+                "flushes": self.flushes,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "max_flush_ms": round(self.max_flush_ms, 3),
+                "avg_flush_ms": round(self._total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+            }
@@ -1,10 +1,19 @@
 # ===== PHASE 6: Styling Engine =====
+# ===== PHASE 10: Performance & Scaling =====
 """
 Styling service: validates and resolves colors and logo paths for QR generation.
 """
 
+import os
 from pathlib import Path
 
+from app.utils.cache import MISSING, LRUCache
+
+# Seconds a logo path lookup (including "file missing") is reused
+LOGO_PATH_TTL = float(os.environ.get("SMARTQR_LOGO_PATH_TTL", "30"))
+
+_resolved_logos = LRUCache(maxsize=256, ttl=LOGO_PATH_TTL)
+
 
 def _get_project_root() -> Path:
     return Path(__file__).resolve().parent.parent.parent
@@ -14,17 +23,33 @@ def resolve_logo_path(logo_path: str | None) -> Path | None:
     """
     Resolve logo path relative to project root.
     Returns absolute Path if file exists, else None.
+    Results are memoized for SMARTQR_LOGO_PATH_TTL seconds.
     """
     if not logo_path or not logo_path.strip():
         return None
+    cached = _resolved_logos.get(logo_path)
+    if cached is not MISSING:
+        return cached
     path = Path(logo_path.strip())
     if not path.is_absolute():
         path = _get_project_root() / path
-    return path if path.exists() else None
+    resolved = path if path.exists() else None
+    _resolved_logos.set(logo_path, resolved)
+    return resolved
 
 
-def validate_color(color: str | None) -> str:
-    """Return a valid color string; default to black/white if invalid."""
+def validate_color(color: str | None, default: str = "black") -> str:
+    """
+    Return the color string the renderer will accept, or `default` when empty.
+    Raises ValueError for a color Pillow cannot parse (it would fail every render).
+    """
     if not color or not color.strip():
-        return "black"
-    return color.strip()
+        return default
+    color = color.strip()
+    from PIL import ImageColor  # lazy: keeps Pillow out of processes that never render
+
+    try:
+        ImageColor.getrgb(color)
+    except ValueError:
+        raise ValueError(f"invalid color: {color!r}") from None
+    return color
@@ -1,28 +1,130 @@
 # ===== PHASE 4: Dynamic Redirect System =====
+# ===== PHASE 10: Performance & Scaling =====
 """
 Service for logging QR scan events.
+Scans from the redirect path go through a background batched writer
+(record_scan). log_scan is the async single-event insert; log_scan_sync and
+log_scans keep a plain Session API for scripts and the writer thread.
+Every write path normalizes records to their stored form (utils/scan_codes),
+updates the scan rollups in the same transaction and, once committed, announces
+the scans to live stats subscribers (live_feed).
 """
 
+import os
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.database import SessionLocal
 from app.models import ScanEvent
+from app.services.live_feed import scan_broadcaster
+from app.services.rollup_service import apply_rollups
+from app.services.scan_writer import ScanWriter
+from app.utils.metrics import stage
+from app.utils.scan_codes import normalize_scan
+
+SCAN_QUEUE_SIZE = int(os.environ.get("SMARTQR_SCAN_QUEUE_SIZE", "10000"))
+SCAN_BATCH_SIZE = int(os.environ.get("SMARTQR_SCAN_BATCH_SIZE", "500"))
+SCAN_FLUSH_INTERVAL = float(os.environ.get("SMARTQR_SCAN_FLUSH_INTERVAL", "0.5"))
+SCAN_QUEUE_OVERFLOW = os.environ.get("SMARTQR_SCAN_QUEUE_OVERFLOW", "sync")
+SCAN_FLUSH_RETRIES = int(os.environ.get("SMARTQR_SCAN_FLUSH_RETRIES", "3"))
 
 
-def log_scan(
+def log_scan_sync(
     db: Session,
     qr_id: str,
     ip_address: str | None = None,
     country: str | None = None,
     device_type: str | None = None,
+) -> ScanEvent:
+    """Log a scan event for a QR code (sync Session, for scripts)."""
+    record = normalize_scan(
+        {
+            "qr_id": qr_id,
+            "timestamp": datetime.utcnow(),
+            "ip_address": ip_address,
+            "country": country,
+            "device_type": device_type,
+        }
+    )
+    event = ScanEvent(**record)
+    db.add(event)
+    apply_rollups(db, [record])
+    with stage("scan.commit"):
+        db.commit()
+    scan_broadcaster.publish([record])
+    db.refresh(event)
+    return event
+
+
+async def log_scan(
+    db: AsyncSession,
+    qr_id: str,
+    ip_address: str | None = None,
+    country: str | None = None,
+    device_type: str | None = None,
 ) -> ScanEvent:
     """Log a scan event for a QR code."""
-    event = ScanEvent(
+    return await db.run_sync(
+        log_scan_sync,
         qr_id=qr_id,
         ip_address=ip_address,
         country=country,
         device_type=device_type,
     )
-    db.add(event)
-    db.commit()
-    db.refresh(event)
-    return event
+
+
+def log_scans(db: Session, records: list[dict]) -> int:
+    """Insert many scan events with a single multi-row INSERT, update rollups and commit. Returns row count."""
+    if not records:
+        return 0
+    records = [normalize_scan(record) for record in records]
+    with stage("scan.insert"):
+        db.execute(insert(ScanEvent), records)
+        apply_rollups(db, records)
+    with stage("scan.commit"):
+        db.commit()
+    scan_broadcaster.publish(records)
+    return len(records)
+
+
+def _write_batch(records: list[dict]) -> None:
+    db = SessionLocal()
+    try:
+        log_scans(db, records)
+    finally:
+        db.close()
+
+
+scan_writer = ScanWriter(
+    _write_batch,
+    max_queue=SCAN_QUEUE_SIZE,
+    batch_size=SCAN_BATCH_SIZE,
+    flush_interval=SCAN_FLUSH_INTERVAL,
+    overflow=SCAN_QUEUE_OVERFLOW,
+    retries=SCAN_FLUSH_RETRIES,
+)
+
+
+async def record_scan(
+    db: AsyncSession,
+    qr_id: str,
+    ip_address: str | None = None,
+    country: str | None = None,
+    device_type: str | None = None,
+) -> None:
+    """
+    Record a scan without waiting for the database when the background writer is running.
+    Falls back to an immediate insert when the writer is stopped or rejects the record.
+    """
+    record = {
+        "qr_id": qr_id,
+        "timestamp": datetime.utcnow(),
+        "ip_address": ip_address,
+        "country": country,
+        "device_type": device_type,
+    }
+    if not scan_writer.submit(record):
+        await db.run_sync(log_scans, [record])
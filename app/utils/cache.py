@@ -0,0 +1,102 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Small thread-safe LRU cache with optional TTL and hit/miss/eviction counters.
+Used for hot lookups (e.g. redirect targets) that must stay bounded in memory.
+Every invalidate/clear bumps `generation`; a reader that captured it before loading
+a value passes it to set(), which drops the value if an invalidation happened
+meanwhile (it may have been loaded before the change was committed).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+# Returned by LRUCache.get when a key is absent or expired (cached values may be None)
+MISSING = object()
+
+
+class LRUCache:
+    """Bounded LRU mapping; entries expire after `ttl` seconds when a TTL is set."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_sets = 0
+        self.generation = 0
+
+    def get(self, key, default=MISSING):
+        """Return cached value (refreshing its LRU position) or `default`."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float | None = None, generation: int | None = None) -> bool:
+        """
+        Store value; `ttl` overrides the cache default for this entry. With `generation`
+        (self.generation read before the value was loaded) nothing is stored if any key
+        was invalidated since. Returns whether the value was stored.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.stale_sets += 1
+                return False
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def invalidate(self, key) -> None:
+        """Drop a single key if present."""
+        with self._lock:
+            self.generation += 1
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Counters and current size, suitable for JSON responses."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_sets": self.stale_sets,
+            }
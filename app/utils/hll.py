@@ -0,0 +1,66 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+HyperLogLog cardinality sketch used for approximate unique-visitor counts.
+
+With the default precision p=12 (4096 one-byte registers, 4 KB per sketch) the
+relative standard error is 1.04 / sqrt(4096) ~= 1.6%, i.e. ~95% of estimates land
+within +/-3.3% of the true count. Below ~10k distinct values the estimator
+switches to linear counting and is close to exact. Sketches are merged with a
+register-wise max, so the union of any set of days has the same error bound.
+"""
+
+import hashlib
+import math
+
+DEFAULT_PRECISION = 12
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Mergeable distinct-count estimator with 2**precision registers."""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION, registers: bytes | None = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is not None and len(registers) != self.m:
+            raise ValueError(f"expected {self.m} registers, got {len(registers)}")
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    def add(self, value: str) -> None:
+        """Add one value (e.g. an IP address) to the sketch."""
+        h = _hash64(value)
+        suffix_bits = 64 - self.precision
+        index = h >> suffix_bits
+        rest = h & ((1 << suffix_bits) - 1)
+        rank = suffix_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog") -> None:
+        """Fold another sketch (same precision) into this one."""
+        if other.precision != self.precision:
+            raise ValueError("cannot merge sketches with different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        """Estimated number of distinct values added."""
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        """Serialize as one precision byte followed by the registers."""
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        return cls(precision=data[0], registers=data[1:])
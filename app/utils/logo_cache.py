@@ -0,0 +1,64 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+In-memory cache of decoded logo images for styled QR codes.
+Entries are keyed by (path, mtime, file size, target size): the decoded RGBA
+original is stored once and each LANCZOS-resized variant alongside it, so a
+replaced logo file is picked up automatically. Bounded by an LRU.
+"""
+
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from app.utils.cache import MISSING, LRUCache
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+LOGO_CACHE_SIZE = int(os.environ.get("SMARTQR_LOGO_CACHE_SIZE", "64"))
+
+logo_cache = LRUCache(maxsize=LOGO_CACHE_SIZE)
+
+
+def _file_stamp(path: Path) -> tuple | None:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def _fit(logo: "Image.Image", max_side: int) -> "Image.Image":
+    from PIL import Image
+
+    w, h = logo.size
+    if w <= max_side and h <= max_side:
+        return logo
+    ratio = min(max_side / w, max_side / h)
+    return logo.resize((int(w * ratio), int(h * ratio)), Image.Resampling.LANCZOS)
+
+
+def load_logo(path: Path, max_side: int | None = None) -> "Image.Image | None":
+    """
+    Decoded RGBA logo, scaled down to fit max_side x max_side (None = original size).
+    Returns None if the file is missing. Cached images are shared: do not modify them.
+    """
+    stamp = _file_stamp(path)
+    if stamp is None:
+        return None
+    key = (stamp, max_side)
+    logo = logo_cache.get(key)
+    if logo is not MISSING:
+        return logo
+    if max_side is None:
+        from PIL import Image
+
+        with Image.open(path) as img:
+            logo = img.convert("RGBA")
+    else:
+        original = load_logo(path, None)
+        if original is None:
+            return None
+        logo = _fit(original, max_side)
+    logo_cache.set(key, logo)
+    return logo
@@ -0,0 +1,284 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Minimal Prometheus-style metrics: counters, histograms and callback gauges in one
+registry, rendered in the text exposition format by GET /metrics.
+Everything is off unless SMARTQR_METRICS=1: stage() then returns a shared no-op
+timer and the request middleware is not installed, so the hot paths pay one
+attribute check.
+
+    with stage("redirect.lookup"):
+        ...
+
+Stages timed in a render pool worker are captured with capture_stages() and
+replayed in the parent with record_stages().
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable
+
+METRICS_ENABLED = os.environ.get("SMARTQR_METRICS", "0") == "1"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _lines(self) -> list[str]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._lines()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0.0)
+
+    def _lines(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, *labels) -> None:
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            slots = self._values.get(labels)
+            if slots is None:
+                slots = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            slots[index] += 1
+            slots[-1] += value
+
+    def count(self, *labels) -> int:
+        slots = self._values.get(labels)
+        return int(sum(slots[:-1])) if slots else 0
+
+    def _lines(self) -> list[str]:
+        with self._lock:
+            items = sorted((labels, list(slots)) for labels, slots in self._values.items())
+        lines = []
+        for labels, slots in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), slots[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_format_value(slots[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    Read at scrape time: `collect()` returns {label values tuple: value}.
+    kind="counter" exposes totals that are already counted elsewhere (e.g. cache hits).
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str],
+        collect: Callable[[], dict[tuple, float]],
+        kind: str = "gauge",
+    ):
+        super().__init__(name, help, labelnames)
+        self._collect = collect
+        self.kind = kind
+
+    def _lines(self) -> list[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in sorted(self._collect().items())
+            if value is not None
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric; registering the same name again returns the existing one."""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        """Text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "smartqr_http_request_duration_seconds",
+    "HTTP request latency by route template, until the response body is sent",
+    ("method", "route", "status"),
+))
+http_not_found = registry.register(Counter(
+    "smartqr_http_not_found_total", "Responses with status 404 by route template", ("route",)
+))
+stage_duration = registry.register(Histogram(
+    "smartqr_stage_duration_seconds", "Time spent in internal stages of request handling", ("stage",)
+))
+render_failures = registry.register(Counter(
+    "smartqr_render_failures_total", "QR renders that failed (error, timeout, busy)", ("reason",)
+))
+
+
+_capture = threading.local()
+
+
+class _StageTimer:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        captured = getattr(_capture, "timings", None)
+        if captured is not None:
+            captured[self.name] = captured.get(self.name, 0.0) + elapsed
+        else:
+            stage_duration.observe(elapsed, self.name)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+def stage(name: str):
+    """Context manager timing one internal stage into smartqr_stage_duration_seconds."""
+    return _StageTimer(name) if METRICS_ENABLED else _NOOP
+
+
+@contextmanager
+def capture_stages():
+    """Collect this thread's stage timings into a dict instead of the registry."""
+    previous = getattr(_capture, "timings", None)
+    timings: dict[str, float] = {}
+    _capture.timings = timings
+    try:
+        yield timings
+    finally:
+        _capture.timings = previous
+
+
+def record_stages(timings: dict[str, float]) -> None:
+    for name, elapsed in timings.items():
+        stage_duration.observe(elapsed, name)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template (never the raw path)."""
+
+    def __init__(self, app):
+        self.app = app
+        self._paths: dict | None = None
+
+    def _route(self, scope) -> str:
+        route = scope.get("route")
+        if route is not None and hasattr(route, "path"):
+            return route.path or "/"
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        # Older Starlette only sets the endpoint: map it back to its route's path
+        if self._paths is None:
+            routes = getattr(scope.get("app"), "routes", [])
+            self._paths = {getattr(r, "endpoint", getattr(r, "app", None)): r.path for r in routes}
+        return self._paths.get(endpoint, "unmatched")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = self._route(scope)
+            http_request_duration.observe(time.perf_counter() - started, scope["method"], route, str(status))
+            if status == 404:
+                http_not_found.inc(route)
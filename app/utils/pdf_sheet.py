@@ -0,0 +1,190 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Minimal streaming PDF writer for multi-up QR print sheets.
+Objects are emitted as soon as they are complete, so only the current page's
+layout and the xref offsets are held in memory. PNG image data is embedded
+as-is (FlateDecode with PNG predictors) without decoding pixels.
+"""
+
+import io
+import struct
+import zlib
+
+# Page sizes in PDF points (1/72 inch)
+PAGE_SIZES = {
+    "a4": (595.28, 841.89),
+    "letter": (612.0, 792.0),
+}
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _pdf_image_from_pixels(png: bytes) -> tuple[dict, bytes]:
+    """Fallback for PNGs that cannot be passed through (alpha, interlaced, 16-bit): decode to RGB."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(png)) as img:
+        rgb = img.convert("RGB")
+        dict_ = {"Width": rgb.width, "Height": rgb.height, "ColorSpace": "/DeviceRGB", "BitsPerComponent": 8}
+        return dict_, zlib.compress(rgb.tobytes())
+
+
+def png_to_pdf_image(png: bytes) -> tuple[dict, bytes]:
+    """
+    Image XObject dictionary entries and stream data for a PNG.
+    Gray, RGB and palette PNGs keep their compressed IDAT data untouched.
+    """
+    if not png.startswith(_PNG_SIGNATURE):
+        raise ValueError("not a PNG image")
+    pos = len(_PNG_SIGNATURE)
+    header = palette = None
+    idat = []
+    while pos + 8 <= len(png):
+        length, ctype = struct.unpack(">I4s", png[pos:pos + 8])
+        chunk = png[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if ctype == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif ctype == b"PLTE":
+            palette = chunk
+        elif ctype == b"IDAT":
+            idat.append(chunk)
+        elif ctype == b"IEND":
+            break
+    if header is None:
+        raise ValueError("PNG has no IHDR chunk")
+    width, height, bit_depth, color_type, _, _, interlace = header
+    if interlace or bit_depth == 16 or color_type not in (0, 2, 3) or (color_type == 3 and not palette):
+        return _pdf_image_from_pixels(png)
+
+    colors = 3 if color_type == 2 else 1
+    if color_type == 3:
+        colorspace = f"[/Indexed /DeviceRGB {len(palette) // 3 - 1} <{palette.hex()}>]"
+    else:
+        colorspace = "/DeviceRGB" if color_type == 2 else "/DeviceGray"
+    dict_ = {
+        "Width": width,
+        "Height": height,
+        "ColorSpace": colorspace,
+        "BitsPerComponent": bit_depth,
+        "DecodeParms": f"<< /Predictor 15 /Colors {colors} /BitsPerComponent {bit_depth} /Columns {width} >>",
+    }
+    return dict_, b"".join(idat)
+
+
+def _pdf_text(value: str) -> str:
+    """PDF literal string (WinAnsi) with special characters escaped."""
+    text = value.encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+class PDFSheetWriter:
+    """
+    Lays out QR images in a columns x rows grid with a label under each one.
+    Call begin(), then add() per code, then finish(); each returns the bytes to send next.
+    """
+
+    # Object numbers reserved up front; the catalog and page tree are written last
+    _CATALOG, _PAGES, _FONT = 1, 2, 3
+
+    def __init__(
+        self,
+        page_size: tuple[float, float] = PAGE_SIZES["a4"],
+        columns: int = 4,
+        rows: int = 6,
+        margin: float = 36.0,
+        label_size: float = 7.0,
+    ):
+        self.page_width, self.page_height = page_size
+        self.columns = max(1, columns)
+        self.rows = max(1, rows)
+        self.margin = margin
+        self.label_size = label_size
+        self.cell_width = (self.page_width - 2 * margin) / self.columns
+        self.cell_height = (self.page_height - 2 * margin) / self.rows
+        self.image_side = max(1.0, min(self.cell_width, self.cell_height - 2 * label_size) - 8)
+        self._next_obj = 4
+        self._offsets: dict[int, int] = {}
+        self._position = 0
+        self._page_ids: list[int] = []
+        self._cell = 0
+        self._ops: list[str] = []
+        self._images: list[int] = []
+
+    def _emit(self, data: bytes) -> bytes:
+        self._position += len(data)
+        return data
+
+    def _object(self, num: int, body: bytes) -> bytes:
+        self._offsets[num] = self._position
+        return self._emit(f"{num} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def _stream(self, num: int, entries: str, data: bytes) -> bytes:
+        return self._object(num, f"<< {entries} /Length {len(data)} >>\nstream\n".encode() + data + b"\nendstream")
+
+    def _allocate(self) -> int:
+        num = self._next_obj
+        self._next_obj += 1
+        return num
+
+    def begin(self) -> bytes:
+        out = self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        font = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"
+        return out + self._object(self._FONT, font)
+
+    def add(self, png: bytes | None, label: str) -> bytes:
+        """Place one code (png=None leaves the image slot empty) and its label in the next cell."""
+        out = b""
+        if self._cell == self.columns * self.rows:
+            out += self._finish_page()
+        row, col = divmod(self._cell, self.columns)
+        self._cell += 1
+        left = self.margin + col * self.cell_width
+        top = self.page_height - self.margin - row * self.cell_height
+        x = left + (self.cell_width - self.image_side) / 2
+        y = top - 4 - self.image_side
+
+        if png is not None:
+            entries, data = png_to_pdf_image(png)
+            num = self._allocate()
+            fields = " ".join(f"/{k} {v}" for k, v in entries.items())
+            out += self._stream(num, f"/Type /XObject /Subtype /Image {fields} /Filter /FlateDecode", data)
+            self._ops.append(f"q {self.image_side:.2f} 0 0 {self.image_side:.2f} {x:.2f} {y:.2f} cm /Im{len(self._images)} Do Q")
+            self._images.append(num)
+
+        # Helvetica averages ~0.5em per character: truncate to fit, then center
+        max_chars = max(1, int(self.cell_width / (self.label_size * 0.5)) - 1)
+        text = label if len(label) <= max_chars else label[: max_chars - 1] + "..."
+        text_x = left + max(0.0, (self.cell_width - len(text) * self.label_size * 0.5) / 2)
+        text_y = y - self.label_size - 2
+        self._ops.append(f"BT /F1 {self.label_size:g} Tf {text_x:.2f} {text_y:.2f} Td {_pdf_text(text)} Tj ET")
+        return out
+
+    def _finish_page(self) -> bytes:
+        content_id, page_id = self._allocate(), self._allocate()
+        out = self._stream(content_id, "", "\n".join(self._ops).encode("latin-1"))
+        xobjects = " ".join(f"/Im{i} {num} 0 R" for i, num in enumerate(self._images))
+        page = (
+            f"<< /Type /Page /Parent {self._PAGES} 0 R /MediaBox [0 0 {self.page_width:g} {self.page_height:g}] "
+            f"/Resources << /Font << /F1 {self._FONT} 0 R >> /XObject << {xobjects} >> >> /Contents {content_id} 0 R >>"
+        )
+        out += self._object(page_id, page.encode())
+        self._page_ids.append(page_id)
+        self._cell = 0
+        self._ops = []
+        self._images = []
+        return out
+
+    def finish(self) -> bytes:
+        """Close the last page and write the page tree, catalog, xref table and trailer."""
+        out = b""
+        if self._cell or not self._page_ids:
+            out += self._finish_page()
+        kids = " ".join(f"{num} 0 R" for num in self._page_ids)
+        out += self._object(self._PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._page_ids)} >>".encode())
+        out += self._object(self._CATALOG, f"<< /Type /Catalog /Pages {self._PAGES} 0 R >>".encode())
+        xref_at = self._position
+        lines = [f"xref\n0 {self._next_obj}\n", "0000000000 65535 f \n"]
+        lines += [f"{self._offsets[num]:010d} 00000 n \n" for num in range(1, self._next_obj)]
+        lines.append(f"trailer\n<< /Size {self._next_obj} /Root {self._CATALOG} 0 R >>\nstartxref\n{xref_at}\n%%EOF\n")
+        return out + self._emit("".join(lines).encode())
@@ -0,0 +1,152 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Best-effort messages between the worker processes of one host, so per-worker
+in-memory state follows changes made in a sibling (redirect cache invalidations,
+live scan counts). Each worker binds a Unix datagram socket named after its pid in
+SMARTQR_PEER_BUS_DIR and sends every message to the other sockets found there.
+Off (publish is a no-op) unless that directory is set; `python run.py prod` sets it.
+
+    peer_bus.subscribe("redirect", handler)   # handler(payload), on the bus thread
+    peer_bus.publish("redirect", ["abc123"])  # to every other worker
+
+Delivery is not guaranteed (a full receive buffer drops the message), so caches
+kept consistent this way must still expire on their own.
+"""
+
+import json
+import logging
+import os
+import socket
+import threading
+from pathlib import Path
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+PEER_BUS_DIR = os.environ.get("SMARTQR_PEER_BUS_DIR", "")
+
+# Stay well under the default Unix datagram limit; larger payloads are split
+MAX_DATAGRAM = 48 * 1024
+
+
+class PeerBus:
+    def __init__(self, directory: str):
+        self.directory = Path(directory) if directory else None
+        self._handlers: dict[str, list[Callable]] = {}
+        self._receiver: socket.socket | None = None
+        self._sender: socket.socket | None = None
+        self._path: Path | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None and hasattr(socket, "AF_UNIX")
+
+    @property
+    def running(self) -> bool:
+        return self._receiver is not None
+
+    def subscribe(self, topic: str, handler: Callable) -> None:
+        """Call handler(payload) for every message on `topic` sent by another worker."""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def start(self) -> None:
+        """Bind this worker's socket and start receiving (called at startup)."""
+        if not self.enabled or self.running:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._path = self.directory / f"{os.getpid()}.sock"
+        self._path.unlink(missing_ok=True)
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(str(self._path))
+        receiver.settimeout(0.5)
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+        self._receiver = receiver
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="peer-bus", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if not self.running:
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+        self._receiver.close()
+        self._sender.close()
+        self._receiver = self._sender = None
+        self._path.unlink(missing_ok=True)
+
+    def _peers(self) -> list[Path]:
+        try:
+            return [path for path in self.directory.glob("*.sock") if path != self._path]
+        except OSError:
+            return []
+
+    def publish(self, topic: str, payload: list | dict | None) -> None:
+        """Send to every other worker. Safe from any thread; never blocks."""
+        sender = self._sender
+        if sender is None:
+            return
+        peers = self._peers()
+        if not peers:
+            return
+        for datagram in _encode(topic, payload):
+            for peer in peers:
+                try:
+                    sender.sendto(datagram, str(peer))
+                    self.sent += 1
+                except BlockingIOError:
+                    self.dropped += 1
+                except (ConnectionRefusedError, FileNotFoundError):
+                    peer.unlink(missing_ok=True)  # a worker that exited without cleaning up
+                except OSError:
+                    self.dropped += 1
+                    logger.debug("Peer bus send to %s failed", peer, exc_info=True)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                datagram = self._receiver.recv(MAX_DATAGRAM * 2)
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            self.received += 1
+            try:
+                message = json.loads(datagram)
+                handlers = self._handlers.get(message["topic"], ())
+                for handler in handlers:
+                    handler(message["payload"])
+            except Exception:  # noqa: BLE001 - one bad message must not stop the bus
+                logger.exception("Peer bus message handling failed")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self.running,
+            "peers": len(self._peers()) if self.running else 0,
+            "sent": self.sent,
+            "received": self.received,
+            "dropped": self.dropped,
+        }
+
+
+def _encode(topic: str, payload) -> list[bytes]:
+    """One datagram per message, splitting list/dict payloads that are too large."""
+    datagram = json.dumps({"topic": topic, "payload": payload}, separators=(",", ":")).encode()
+    if len(datagram) <= MAX_DATAGRAM or not payload or len(payload) < 2:
+        return [datagram]
+    items = list(payload.items()) if isinstance(payload, dict) else list(payload)
+    half = len(items) // 2
+    kind = dict if isinstance(payload, dict) else list
+    return _encode(topic, kind(items[:half])) + _encode(topic, kind(items[half:]))
+
+
+peer_bus = PeerBus(PEER_BUS_DIR)
@@ -0,0 +1,258 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+On-demand diagnostics for a live worker (served by routes/admin_routes.py):
+  sample_cpu       - time-boxed sampling profiler over every thread, as folded stacks
+                     (flamegraph.pl / speedscope input); the sampled process keeps serving
+  dump_stacks      - one readable stack trace per thread, right now
+  memory_snapshot  - tracemalloc snapshot: top allocation sites, a diff against the
+                     previous snapshot, or the raw dump for tracemalloc.Snapshot.load
+  SlowRequestMiddleware - logs requests slower than SMARTQR_SLOW_REQUEST_MS with the
+                     SQL they ran (timed by the engine events in app/database.py)
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from app.database import SLOW_REQUEST_MS, query_log
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MAX_SECONDS = float(os.environ.get("SMARTQR_PROFILE_MAX_SECONDS", "60"))
+TRACEMALLOC_FRAMES = int(os.environ.get("SMARTQR_TRACEMALLOC_FRAMES", "25"))
+# Trace allocations from startup (continuous, slower) instead of only during a snapshot window
+TRACEMALLOC_AT_STARTUP = os.environ.get("SMARTQR_TRACEMALLOC", "0") == "1"
+SLOW_REQUEST_HISTORY = int(os.environ.get("SMARTQR_SLOW_REQUEST_HISTORY", "100"))
+
+_ROOT = Path(__file__).resolve().parent.parent.parent
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusyError(RuntimeError):
+    """Another profile or snapshot is already running in this process."""
+
+
+def _frame_label(code) -> str:
+    path = Path(code.co_filename)
+    try:
+        where = path.relative_to(_ROOT)
+    except ValueError:
+        where = Path(*path.parts[-2:]) if len(path.parts) > 1 else path
+    return f"{code.co_name} ({where}:{code.co_firstlineno})".replace(";", ",")
+
+
+@contextmanager
+def _exclusive():
+    if not _profile_lock.acquire(blocking=False):
+        raise ProfilerBusyError("a profile is already running in this process")
+    try:
+        yield
+    finally:
+        _profile_lock.release()
+
+
+def sample_cpu(seconds: float, interval: float = 0.005) -> tuple[str, int]:
+    """
+    Sample every thread's stack each `interval` seconds for `seconds` (capped at
+    SMARTQR_PROFILE_MAX_SECONDS). Returns (folded stacks "thread;outer;...;inner count", samples).
+    Threads blocked in I/O or locks are sampled too, so idle time shows up under its wait call.
+    """
+    seconds = max(0.1, min(seconds, PROFILE_MAX_SECONDS))
+    stacks: Counter = Counter()
+    samples = 0
+    me = threading.get_ident()
+    with _exclusive():
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                labels.append(names.get(ident, f"thread-{ident}").replace(";", ","))
+                stacks[";".join(reversed(labels))] += 1
+            samples += 1
+            time.sleep(interval)
+    folded = "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    return folded, samples
+
+
+def dump_stacks() -> str:
+    """Current stack of every thread, most recent call last."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    parts = []
+    for ident, frame in sys._current_frames().items():
+        parts.append(f'Thread "{names.get(ident, ident)}" ({ident}):\n')
+        parts.extend(traceback.format_stack(frame))
+        parts.append("\n")
+    return "".join(parts)
+
+
+_last_snapshot: tracemalloc.Snapshot | None = None
+
+
+def start_tracemalloc() -> None:
+    """Begin continuous allocation tracing (SMARTQR_TRACEMALLOC=1)."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+
+
+def _filtered(snapshot: tracemalloc.Snapshot) -> tracemalloc.Snapshot:
+    return snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+def memory_snapshot(seconds: float = 0.0) -> tuple[tracemalloc.Snapshot, tracemalloc.Snapshot | None, bool]:
+    """
+    Take a tracemalloc snapshot. If tracing is off it is switched on for `seconds`
+    (only allocations made meanwhile are seen) and off again.
+    Returns (snapshot, the previous snapshot taken in this process or None, was_tracing).
+    """
+    global _last_snapshot
+    with _exclusive():
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        try:
+            time.sleep(max(0.0, min(seconds, PROFILE_MAX_SECONDS)))
+            snapshot = _filtered(tracemalloc.take_snapshot())
+        finally:
+            if not was_tracing:
+                tracemalloc.stop()
+    previous, _last_snapshot = _last_snapshot, snapshot
+    return snapshot, previous, was_tracing
+
+
+def memory_report(
+    snapshot: tracemalloc.Snapshot,
+    previous: tracemalloc.Snapshot | None = None,
+    limit: int = 30,
+    key: str = "lineno",
+    diff: bool = False,
+) -> str:
+    """Top allocation sites (or growth since `previous` with diff=True) as text."""
+    lines = [f"# tracemalloc snapshot, pid {os.getpid()}, {datetime.utcnow().isoformat()}Z"]
+    if diff and previous is not None:
+        stats = snapshot.compare_to(previous, key)
+        lines.append(f"# growth since the previous snapshot, top {limit} by size difference")
+    else:
+        stats = snapshot.statistics(key)
+        if diff:
+            lines.append("# no previous snapshot to compare with; showing totals")
+        lines.append(f"# top {limit} by size")
+    total = sum(stat.size for stat in snapshot.statistics("filename"))
+    lines.append(f"# traced memory: {total / 1024:.1f} KiB")
+    for rank, stat in enumerate(stats[:limit], start=1):
+        lines.append(f"#{rank}: {stat}")
+        if key == "traceback":
+            lines.extend(f"    {line}" for line in stat.traceback.format())
+    return "\n".join(lines) + "\n"
+
+
+def snapshot_bytes(snapshot: tracemalloc.Snapshot) -> bytes:
+    """The snapshot in tracemalloc's dump format (load with tracemalloc.Snapshot.load)."""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "snapshot"
+        snapshot.dump(str(path))
+        return path.read_bytes()
+
+
+class SlowRequestLog:
+    """Recent slow requests, newest last."""
+
+    def __init__(self, threshold_ms: float, history: int):
+        self.threshold_ms = threshold_ms
+        self._entries: deque = deque(maxlen=max(1, history))
+        self._lock = threading.Lock()
+        self.logged = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0
+
+    def record(self, entry: dict) -> None:
+        with self._lock:
+            self._entries.append(entry)
+            self.logged += 1
+
+    def recent(self) -> list[dict]:
+        with self._lock:
+            return list(self._entries)
+
+
+slow_requests = SlowRequestLog(SLOW_REQUEST_MS, SLOW_REQUEST_HISTORY)
+
+
+class SlowRequestMiddleware:
+    """
+    ASGI middleware: collects the request's SQL (via database.query_log) and logs the
+    request when it takes SMARTQR_SLOW_REQUEST_MS or longer. Event streams and the
+    admin endpoints (slow by design) are skipped.
+    """
+
+    def __init__(self, app, log: SlowRequestLog = slow_requests):
+        self.app = app
+        self.log = log
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/admin/"):
+            await self.app(scope, receive, send)
+            return
+        queries = {"queries": [], "count": 0, "total_ms": 0.0}
+        token = query_log.set(queries)
+        started = time.perf_counter()
+        response = {"status": 500, "stream": False}
+
+        async def send_and_watch(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["stream"] = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_watch)
+        finally:
+            query_log.reset(token)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= self.log.threshold_ms and not response["stream"]:
+                self._report(scope, response["status"], elapsed_ms, queries)
+
+    def _report(self, scope, status: int, elapsed_ms: float, queries: dict) -> None:
+        path = scope["path"] + (f"?{scope['query_string'].decode('latin-1')}" if scope.get("query_string") else "")
+        entry = {
+            "at": datetime.utcnow().isoformat() + "Z",
+            "method": scope["method"],
+            "path": path,
+            "status": status,
+            "duration_ms": round(elapsed_ms, 2),
+            "sql_count": queries["count"],
+            "sql_ms": round(queries["total_ms"], 2),
+            "queries": [{"sql": sql, "ms": round(ms, 3)} for sql, ms in queries["queries"]],
+        }
+        self.log.record(entry)
+        logger.warning(
+            "Slow request %s %s -> %s in %.1f ms (%d SQL statements, %.1f ms in SQL)%s",
+            entry["method"], path, status, elapsed_ms, entry["sql_count"], entry["sql_ms"],
+            "".join(f"\n    {ms:8.2f} ms  {' '.join(sql.split())}" for sql, ms in queries["queries"]),
+        )
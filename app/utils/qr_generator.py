@@ -1,14 +1,32 @@
 # ===== PHASE 3: Basic QR Generation =====
 # ===== PHASE 6: Styling Engine =====
+# ===== PHASE 10: Performance & Scaling =====
 """
 QR code image generation and saving.
 Supports custom colors and optional logo in center.
+Renders PNG, WebP or SVG at any size; rendered bytes are memoized in a
+content-addressed cache (memory + disk), so identical payload/style
+combinations are encoded and rendered only once.
+qrcode and Pillow are imported on the first render (or the render pool's
+warm-up), so processes that only compute cache keys never load them.
 """
 
+import base64
+import hashlib
+import io
+import os
+import threading
+from html import escape
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable
 
-import qrcode
-from PIL import Image
+from app.utils.logo_cache import load_logo
+from app.utils.metrics import capture_stages, stage
+from app.utils.render_cache import RenderCache, make_render_key
+
+if TYPE_CHECKING:
+    import qrcode
+    from PIL import Image
 
 
 def _get_project_root() -> Path:
@@ -20,29 +38,58 @@ def get_qrcodes_dir() -> Path:
     return _get_project_root() / "static" / "qrcodes"
 
 
-def _resize_logo_safe(logo: Image.Image, qr_size: int, max_ratio: float = 0.2) -> Image.Image:
-    """Resize logo to fit safely in QR center (max 20% of QR size by default)."""
-    max_logo = int(qr_size * max_ratio)
-    w, h = logo.size
-    if w <= max_logo and h <= max_logo:
-        return logo
-    ratio = min(max_logo / w, max_logo / h)
-    new_size = (int(w * ratio), int(h * ratio))
-    return logo.resize(new_size, Image.Resampling.LANCZOS)
+RENDER_CACHE_DIR = Path(os.environ.get("SMARTQR_RENDER_CACHE_DIR", str(_get_project_root() / ".cache" / "renders")))
+RENDER_CACHE_MEMORY_MB = float(os.environ.get("SMARTQR_RENDER_CACHE_MEMORY_MB", "32"))
+RENDER_CACHE_DISK_MB = float(os.environ.get("SMARTQR_RENDER_CACHE_DISK_MB", "512"))
+# Comma-separated logos decoded and resized ahead of the first styled render
+PRELOAD_LOGOS = [p.strip() for p in os.environ.get("SMARTQR_PRELOAD_LOGOS", "static/logos/logo.png").split(",") if p.strip()]
 
+render_cache = RenderCache(
+    RENDER_CACHE_DIR,
+    memory_bytes=int(RENDER_CACHE_MEMORY_MB * 1024 * 1024),
+    disk_bytes=int(RENDER_CACHE_DISK_MB * 1024 * 1024),
+)
 
-def _paste_logo_center(qr_img: Image.Image, logo_path: str | Path) -> Image.Image:
-    """Paste resized logo in center of QR image. Returns new image."""
+def _resolve(logo_path: str | Path) -> Path:
     path = Path(logo_path)
-    if not path.is_absolute():
-        path = _get_project_root() / path
-    if not path.exists():
-        return qr_img
+    return path if path.is_absolute() else _get_project_root() / path
+
+
+_logo_digests: dict[tuple, str] = {}
+_logo_digests_lock = threading.Lock()
+
+
+def _logo_digest(logo_path: str | Path | None) -> str | None:
+    """SHA-256 of the logo file contents, memoized by (path, mtime, size)."""
+    if not logo_path:
+        return None
+    path = _resolve(logo_path)
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    stamp = (str(path), st.st_mtime_ns, st.st_size)
+    with _logo_digests_lock:
+        digest = _logo_digests.get(stamp)
+    if digest is None:
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        with _logo_digests_lock:
+            _logo_digests[stamp] = digest
+    return digest
+
+
+def _load_logo_safe(logo_path: str | Path, qr_size: int, max_ratio: float = 0.2) -> "Image.Image | None":
+    """Cached RGBA logo sized to fit safely in the QR center (max 20% of QR size by default)."""
+    return load_logo(_resolve(logo_path), int(qr_size * max_ratio))
+
 
-    logo = Image.open(path).convert("RGBA")
+def _paste_logo_center(qr_img: "Image.Image", logo_path: str | Path) -> "Image.Image":
+    """Paste resized logo in center of QR image. Returns new image."""
     qr_img = qr_img.convert("RGBA")
     qr_w, qr_h = qr_img.size
-    logo = _resize_logo_safe(logo, min(qr_w, qr_h))
+    logo = _load_logo_safe(logo_path, min(qr_w, qr_h))
+    if logo is None:
+        return qr_img.convert("RGB")
 
     lw, lh = logo.size
     x = (qr_w - lw) // 2
@@ -51,31 +98,212 @@ def _paste_logo_center(qr_img: Image.Image, logo_path: str | Path) -> Image.Imag
     return qr_img.convert("RGB")
 
 
+# Output formats served by render_qr -> media type
+IMAGE_FORMATS = {
+    "png": "image/png",
+    "webp": "image/webp",
+    "svg": "image/svg+xml",
+}
+
+
+def _encode(data: str, logo_path: str | Path | None, border: int) -> "qrcode.QRCode":
+    import qrcode
+
+    error_level = qrcode.constants.ERROR_CORRECT_H if logo_path else qrcode.constants.ERROR_CORRECT_M
+    qr = qrcode.QRCode(version=1, error_correction=error_level, border=border)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr
+
+
+def _svg_logo(logo_path: str | Path, modules: int, box_size: int) -> str:
+    """Centered <image> element with the logo embedded as a PNG data URI (max 20% of the code)."""
+    logo = _load_logo_safe(logo_path, modules * box_size)
+    if logo is None:
+        return ""
+    buf = io.BytesIO()
+    logo.save(buf, format="PNG")
+    w, h = logo.size[0] / box_size, logo.size[1] / box_size
+    x, y = (modules - w) / 2, (modules - h) / 2
+    href = "data:image/png;base64," + base64.b64encode(buf.getvalue()).decode()
+    return f'<image x="{x:g}" y="{y:g}" width="{w:g}" height="{h:g}" href="{href}"/>'
+
+
+def _render_svg(qr: "qrcode.QRCode", fill_color: str, back_color: str, logo_path, box_size: int) -> bytes:
+    """Standalone SVG: one background rect and a single path of dark modules (1 unit = 1 module)."""
+    matrix = qr.get_matrix()
+    n = len(matrix)
+    d = "".join(f"M{x} {y}h1v1h-1z" for y, row in enumerate(matrix) for x, dark in enumerate(row) if dark)
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{n * box_size}" height="{n * box_size}" '
+        f'viewBox="0 0 {n} {n}" shape-rendering="crispEdges">',
+        f'<rect width="{n}" height="{n}" fill="{escape(back_color)}"/>',
+        f'<path fill="{escape(fill_color)}" d="{d}"/>',
+    ]
+    if logo_path:
+        parts.append(_svg_logo(logo_path, n, box_size))
+    parts.append("</svg>")
+    return "".join(parts).encode("utf-8")
+
+
+def _render_image(
+    data: str,
+    fill_color: str,
+    back_color: str,
+    logo_path: str | Path | None,
+    box_size: int,
+    border: int,
+    fmt: str = "png",
+    size: int | None = None,
+) -> bytes:
+    """Encode and render a QR code (no caching). `size` (pixels) overrides box_size."""
+    with stage("render.qr_encode"):
+        qr = _encode(data, logo_path, border)
+    if size:
+        box_size = max(1, size // (qr.modules_count + 2 * border))
+    if fmt == "svg":
+        with stage("render.svg"):
+            return _render_svg(qr, fill_color, back_color, logo_path, box_size)
+
+    qr.box_size = box_size
+    with stage("render.rasterize"):
+        img = qr.make_image(fill_color=fill_color, back_color=back_color)
+
+    if logo_path:
+        with stage("render.logo_composite"):
+            img = _paste_logo_center(img, logo_path)
+
+    buf = io.BytesIO()
+    with stage(f"render.{fmt}_encode"):
+        if fmt == "webp":
+            img.save(buf, format="WEBP", lossless=True)
+        else:
+            img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def _render_image_timed(*render_args) -> tuple[bytes, dict[str, float]]:
+    """_render_image for pool workers: also returns its stage timings for the parent to record."""
+    with capture_stages() as timings:
+        content = _render_image(*render_args)
+    return content, timings
+
+
+def render_cache_key(
+    data: str,
+    fill_color: str = "black",
+    back_color: str = "white",
+    logo_path: str | Path | None = None,
+    box_size: int = 10,
+    border: int = 4,
+    fmt: str = "png",
+    size: int | None = None,
+) -> str:
+    """Content address for a render: everything that changes the output bytes."""
+    logo = _logo_digest(logo_path)
+    return make_render_key(
+        data=data,
+        error_level="H" if logo else "M",
+        fill_color=fill_color,
+        back_color=back_color,
+        box_size=None if size else box_size,
+        size=size,
+        border=border,
+        logo=logo,
+        fmt=fmt,
+    )
+
+
+def prepare_render(
+    data: str,
+    fill_color: str = "black",
+    back_color: str = "white",
+    logo_path: str | Path | None = None,
+    box_size: int = 10,
+    border: int = 4,
+    fmt: str = "png",
+    size: int | None = None,
+) -> tuple[str, tuple]:
+    """
+    Validate render arguments and return (cache key, positional args for _render_image).
+    A logo path that does not exist renders (and keys) like no logo.
+    """
+    if fmt not in IMAGE_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(IMAGE_FORMATS)}")
+    if _logo_digest(logo_path) is None:
+        logo_path = None
+    key = render_cache_key(data, fill_color, back_color, logo_path, box_size, border, fmt, size)
+    return key, (data, fill_color, back_color, logo_path, box_size, border, fmt, size)
+
+
+def _render_cached(*args, renderer: Callable[..., bytes] | None = None, **kwargs) -> tuple[str, bytes]:
+    key, render_args = prepare_render(*args, **kwargs)
+    content = render_cache.get(key)
+    if content is None:
+        content = (renderer or _render_image)(*render_args)
+        render_cache.put(key, content)
+    return key, content
+
+
+def render_qr(
+    data: str,
+    fill_color: str = "black",
+    back_color: str = "white",
+    logo_path: str | Path | None = None,
+    box_size: int = 10,
+    border: int = 4,
+    fmt: str = "png",
+    size: int | None = None,
+    renderer: Callable[..., bytes] | None = None,
+) -> bytes:
+    """
+    Return image bytes (png, webp or svg) for a QR code, served from the render cache when possible.
+    `renderer` replaces _render_image on a cache miss (e.g. to run it in a process pool).
+    """
+    return _render_cached(data, fill_color, back_color, logo_path, box_size, border, fmt, size, renderer=renderer)[1]
+
+
 def generate_qr_image(
     data: str,
     filename: str,
     fill_color: str = "black",
     back_color: str = "white",
     logo_path: str | Path | None = None,
+    box_size: int = 10,
+    border: int = 4,
+    renderer: Callable[..., bytes] | None = None,
 ) -> str:
     """
     Generate a QR code PNG and save to static/qrcodes/.
     Supports custom fill/back colors and optional logo in center.
     Uses high error correction when logo is present for better scan reliability.
+    Identical renders are deduplicated: the file is hard-linked to the cached copy when possible.
     """
     qrcodes_dir = get_qrcodes_dir()
     qrcodes_dir.mkdir(parents=True, exist_ok=True)
     filepath = qrcodes_dir / filename
 
-    error_level = qrcode.constants.ERROR_CORRECT_H if logo_path else qrcode.constants.ERROR_CORRECT_M
-    qr = qrcode.QRCode(version=1, error_correction=error_level, box_size=10, border=4)
-    qr.add_data(data)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color=fill_color, back_color=back_color)
+    key, png = _render_cached(data, fill_color, back_color, logo_path, box_size, border, renderer=renderer)
+    cached_file = render_cache.disk_file(key)
+    try:
+        if cached_file is None:
+            raise OSError("no cached file")
+        filepath.unlink(missing_ok=True)
+        os.link(cached_file, filepath)
+    except OSError:
+        filepath.write_bytes(png)
+    return f"qrcodes/{filename}"
 
-    if logo_path:
-        img = _paste_logo_center(img, logo_path)
 
-    img.save(str(filepath))
-    return f"qrcodes/{filename}"
+def preload_logos(logo_paths: list[str] | None = None) -> int:
+    """
+    Warm the logo cache: decode each logo and render a typical redirect QR with it so the
+    most common resized variant is cached too. Returns the number of logos loaded.
+    """
+    loaded = 0
+    for logo_path in PRELOAD_LOGOS if logo_paths is None else logo_paths:
+        if _logo_digest(logo_path) is None:
+            continue
+        _render_image("http://127.0.0.1:8000/r/00000000-0000-0000-0000-000000000000", "black", "white", logo_path, 10, 4)
+        loaded += 1
+    return loaded
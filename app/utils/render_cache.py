@@ -0,0 +1,171 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Content-addressed cache for rendered QR images.
+Keys are hashes of everything that affects the output (encoded data, error level,
+colors, box size, border, logo content, format), so identical renders share bytes.
+Two tiers: a byte-bounded in-memory LRU and a size-bounded directory on disk.
+Async callers check get_memory inline and run get_disk / put in a thread.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+def make_render_key(**params) -> str:
+    """Stable SHA-256 key for a set of render parameters."""
+    payload = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class RenderCache:
+    """Two-tier (memory + disk) byte cache with LRU eviction and hit-rate stats."""
+
+    def __init__(self, directory: Path | None, memory_bytes: int, disk_bytes: int):
+        self.directory = directory
+        self.memory_limit = max(0, memory_bytes)
+        self.disk_limit = max(0, disk_bytes)
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = 0
+        self._disk_size: int | None = None  # computed lazily on first disk write
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+
+    def _disk_path(self, key: str) -> Path | None:
+        if self.directory is None or not self.disk_limit:
+            return None
+        return self.directory / key[:2] / f"{key}.bin"
+
+    @property
+    def disk_enabled(self) -> bool:
+        return self.directory is not None and bool(self.disk_limit)
+
+    def get(self, key: str) -> bytes | None:
+        """Return cached bytes from memory, then disk (promoting to memory), or None."""
+        data = self.get_memory(key)
+        return data if data is not None else self.get_disk(key)
+
+    def get_memory(self, key: str) -> bytes | None:
+        """Memory tier only (no I/O); a miss here is not counted until get_disk also misses."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return data
+
+    def get_disk(self, key: str) -> bytes | None:
+        """Disk tier (promoting a hit to memory), or None; blocking file I/O."""
+        path = self._disk_path(key)
+        if path is not None:
+            try:
+                data = path.read_bytes()
+                os.utime(path)  # mtime doubles as last-access time for disk LRU
+            except OSError:
+                data = None
+            if data is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._put_memory(key, data)
+                return data
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def disk_file(self, key: str) -> Path | None:
+        """Path of the on-disk copy for key, if present (lets callers hard-link instead of copying)."""
+        path = self._disk_path(key)
+        return path if path is not None and path.exists() else None
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store bytes in both tiers."""
+        self._put_memory(key, data)
+        self._put_disk(key, data)
+
+    def _put_memory(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_limit:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_size -= len(old)
+            self._memory[key] = data
+            self._memory_size += len(data)
+            while self._memory_size > self.memory_limit:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= len(evicted)
+                self.memory_evictions += 1
+
+    def _put_disk(self, key: str, data: bytes) -> None:
+        path = self._disk_path(key)
+        if path is None or len(data) > self.disk_limit or path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+            return
+        with self._lock:
+            if self._disk_size is None:
+                self._disk_size = sum(f.stat().st_size for f in self.directory.glob("*/*.bin"))
+            else:
+                self._disk_size += len(data)
+            over_limit = self._disk_size > self.disk_limit
+        if over_limit:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used files until the directory is back under 90% of its limit."""
+        files = []
+        for f in self.directory.glob("*/*.bin"):
+            try:
+                st = f.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, f))
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        target = int(self.disk_limit * 0.9)
+        evicted = 0
+        for _, size, f in files:
+            if total <= target:
+                break
+            f.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_size = total
+            self.disk_evictions += evicted
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            hits = self.memory_hits + self.disk_hits
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "memory_limit": self.memory_limit,
+                "disk_bytes": self._disk_size,
+                "disk_limit": self.disk_limit,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_evictions": self.memory_evictions,
+                "disk_evictions": self.disk_evictions,
+            }
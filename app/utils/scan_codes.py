@@ -0,0 +1,120 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Compact column types for raw scan events.
+The ORM, rollups and API keep working with strings; these types pack them on the way
+into the database and unpack them on the way out:
+  PackedIP    - 4/16-byte binary on SQLite, native INET on PostgreSQL
+  DeviceCode  - small integer code for the device types the redirect route infers
+  CountryCode - ISO 3166-1 alpha-2 country code packed into a small integer
+Values that cannot be encoded (non-IP client strings, unknown device labels,
+country names instead of codes) are stored as NULL and count as "unknown".
+normalize_scan gives a scan record the values a read-back of its row would have,
+so live rollups see the same keys as a rebuild from the stored events.
+"""
+
+import ipaddress
+
+from sqlalchemy import LargeBinary, SmallInteger
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+# Order is the on-disk code (1-based); only append new labels
+DEVICE_TYPES = ("desktop", "mobile", "tablet")
+_DEVICE_CODES = {label: code for code, label in enumerate(DEVICE_TYPES, start=1)}
+
+
+def pack_ip(value) -> bytes | None:
+    """Packed 4-byte (IPv4) or 16-byte (IPv6) address, or None if value is not an IP address."""
+    if value is None:
+        return None
+    try:
+        return ipaddress.ip_address(str(value).strip()).packed
+    except ValueError:
+        return None
+
+
+def unpack_ip(value: bytes | None) -> str | None:
+    return None if value is None else str(ipaddress.ip_address(bytes(value)))
+
+
+def encode_device(label: str | None) -> int | None:
+    return _DEVICE_CODES.get(label.strip().lower()) if label else None
+
+
+def decode_device(code: int | None) -> str | None:
+    return DEVICE_TYPES[code - 1] if code and 0 < code <= len(DEVICE_TYPES) else None
+
+
+def encode_country(label: str | None) -> int | None:
+    """Pack "US" as (U, S) in base 27 (1..728); anything but two ASCII letters -> None."""
+    if not label:
+        return None
+    label = label.strip().upper()
+    if len(label) != 2 or not ("A" <= label[0] <= "Z" and "A" <= label[1] <= "Z"):
+        return None
+    return (ord(label[0]) - 64) * 27 + (ord(label[1]) - 64)
+
+
+def decode_country(code: int | None) -> str | None:
+    if not code:
+        return None
+    high, low = divmod(code, 27)
+    return chr(64 + high) + chr(64 + low)
+
+
+def normalize_scan(record: dict) -> dict:
+    """Copy of a scan record with ip_address, device_type and country as they round-trip through storage."""
+    packed = pack_ip(record.get("ip_address"))
+    return {
+        **record,
+        "ip_address": unpack_ip(packed),
+        "device_type": decode_device(encode_device(record.get("device_type"))),
+        "country": decode_country(encode_country(record.get("country"))),
+    }
+
+
+class PackedIP(TypeDecorator):
+    """Client IP as binary (SQLite) or INET (PostgreSQL); Python values are address strings."""
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.INET())
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        packed = pack_ip(value)
+        if packed is None or dialect.name != "postgresql":
+            return packed
+        return str(ipaddress.ip_address(packed))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return unpack_ip(value)
+        return str(value)  # INET: str (psycopg2) or ipaddress object (asyncpg)
+
+
+class DeviceCode(TypeDecorator):
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode_device(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_device(value)
+
+
+class CountryCode(TypeDecorator):
+    impl = SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return encode_country(value)
+
+    def process_result_value(self, value, dialect):
+        return decode_country(value)
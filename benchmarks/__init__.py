@@ -0,0 +1,9 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Benchmark suite: seeds a throwaway database with synthetic QR codes and scans, drives
+the redirect, create, image and stats endpoints in-process (ASGI) and over a local
+socket (uvicorn), times the underlying functions, and writes the results as JSON.
+
+    python -m benchmarks --qr-codes 1000 --scans 200000 --out results.json
+    python -m benchmarks compare baseline.json results.json
+"""
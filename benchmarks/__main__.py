@@ -0,0 +1,297 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Benchmark runner.
+
+Usage:
+    python -m benchmarks [run] [options]        # seed, load-test, write JSON (see --help)
+    python -m benchmarks compare OLD NEW        # diff two result files, exit 1 on regressions
+    python -m benchmarks startup [options]      # import cost of app.main per module and app profile
+
+By default a throwaway SQLite database and render cache are created in a temp
+directory; pass --database-url to benchmark another database (e.g. a local
+PostgreSQL). It is seeded only if it has no QR codes yet.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MODES = ("inproc", "socket")
+# Scenario names in benchmarks/load.py (not imported here: app modules read the environment at import)
+ENDPOINTS = ("redirect", "create", "image", "stats")
+
+
+def _configure_env(args, workdir: Path) -> None:
+    """Point the app at the benchmark database before any app module is imported."""
+    os.environ["SMARTQR_DATABASE_URL"] = args.database_url or f"sqlite:///{workdir / 'bench.db'}"
+    os.environ.pop("SMARTQR_ASYNC_DATABASE_URL", None)
+    os.environ["SMARTQR_RENDER_CACHE_DIR"] = str(workdir / "renders")
+    os.environ.setdefault("SMARTQR_PARTITION_MAINTENANCE_INTERVAL", "0")
+    os.environ["SMARTQR_AUTO_MIGRATE"] = "0"
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _prepare(args) -> tuple[dict, object]:
+    from sqlalchemy import func, select
+
+    from app.database import SessionLocal
+    from app.migrations import upgrade_database
+    from app.models import QRCode
+    from benchmarks.dataset import load_dataset, seed_database
+
+    upgrade_database()
+    with SessionLocal() as db:
+        if db.execute(select(func.count()).select_from(QRCode)).scalar():
+            seeded = {"reused": True}
+        else:
+            print(f"Seeding {args.qr_codes} QR codes and {args.scans} scans over {args.days} days...", flush=True)
+            seeded = seed_database(db, args.qr_codes, args.scans, args.days, args.seed)
+        dataset = load_dataset(db)
+    seeded.update({"qr_codes_total": len(dataset.qr_ids), "scans_total": dataset.scans})
+    return seeded, dataset
+
+
+async def _run_inproc(args, dataset) -> list[dict]:
+    import httpx
+
+    from app.main import app
+    from benchmarks.load import SCENARIOS, run_scenario
+
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout) as client:
+            for name in args.endpoints:
+                print(f"  inproc {name}...", flush=True)
+                result = await run_scenario(
+                    client, SCENARIOS[name], dataset, args.requests, args.concurrency, args.warmup, args.seed
+                )
+                results.append({"mode": "inproc", **result})
+    return results
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start_server(port: int, timeout: float = 30.0) -> subprocess.Popen:
+    import httpx
+
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT,
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"benchmark server exited with code {server.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("benchmark server did not start")
+
+
+async def _run_socket(args, dataset) -> list[dict]:
+    import httpx
+
+    from benchmarks.load import SCENARIOS, run_scenario
+
+    port = _free_port()
+    server = _start_server(port)
+    results = []
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=args.timeout) as client:
+            for name in args.endpoints:
+                print(f"  socket {name}...", flush=True)
+                result = await run_scenario(
+                    client, SCENARIOS[name], dataset, args.requests, args.concurrency, args.warmup, args.seed,
+                    rss_pid=server.pid,
+                )
+                results.append({"mode": "socket", **result})
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return results
+
+
+def run(args) -> dict:
+    workdir = Path(tempfile.mkdtemp(prefix="smartqr-bench-"))
+    _configure_env(args, workdir)
+    try:
+        started = datetime.utcnow()
+        dataset_info, dataset = _prepare(args)
+        results = []
+        if "socket" in args.modes:
+            results += asyncio.run(_run_socket(args, dataset))
+        if "inproc" in args.modes:
+            results += asyncio.run(_run_inproc(args, dataset))
+        micro = []
+        if args.micro:
+            from benchmarks.micro import run_micro
+
+            print("  micro...", flush=True)
+            micro = run_micro(dataset, args.micro_iterations)
+        from sqlalchemy.engine import make_url
+
+        return {
+            "meta": {
+                "started_at": started.isoformat() + "Z",
+                "duration_s": round((datetime.utcnow() - started).total_seconds(), 1),
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "database": make_url(os.environ["SMARTQR_DATABASE_URL"]).get_backend_name(),
+                "options": {
+                    "requests": args.requests,
+                    "concurrency": args.concurrency,
+                    "warmup": args.warmup,
+                    "seed": args.seed,
+                    "modes": args.modes,
+                    "endpoints": args.endpoints,
+                },
+            },
+            "dataset": dataset_info,
+            "results": results,
+            "micro": micro,
+        }
+    finally:
+        if args.keep:
+            print(f"Benchmark files kept in {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _pct(old: float | None, new: float | None) -> float | None:
+    if not old or new is None:
+        return None
+    return 100 * (new - old) / old
+
+
+def compare(old_path: str, new_path: str, threshold: float) -> int:
+    """Print per-endpoint changes; returns the number of regressions beyond threshold percent."""
+    old, new = (json.loads(Path(path).read_text()) for path in (old_path, new_path))
+    rows = []
+    for key, label in (("results", "{mode} {endpoint}"), ("micro", "{name}")):
+        before = {label.format(**item): item for item in old.get(key, [])}
+        for item in new.get(key, []):
+            name = label.format(**item)
+            if name not in before:
+                continue
+            prev = before[name]
+            rate = "throughput_rps" if key == "results" else "ops_per_s"
+            rows.append((
+                name,
+                prev["latency_ms"]["p95"], item["latency_ms"]["p95"],
+                _pct(prev["latency_ms"]["p95"], item["latency_ms"]["p95"]),
+                _pct(prev.get(rate), item.get(rate)),
+            ))
+    regressions = 0
+    print(f"{'benchmark':40} {'p95 old':>10} {'p95 new':>10} {'p95 %':>8} {'rate %':>8}")
+    for name, p95_old, p95_new, p95_change, rate_change in rows:
+        regressed = (p95_change or 0) > threshold or (rate_change or 0) < -threshold
+        regressions += regressed
+        fmt = lambda v: f"{v:+.1f}" if v is not None else "-"  # noqa: E731
+        print(
+            f"{name:40} {p95_old:>10.2f} {p95_new:>10.2f} {fmt(p95_change):>8} {fmt(rate_change):>8}"
+            + ("  REGRESSED" if regressed else "")
+        )
+    return regressions
+
+
+def startup(args) -> None:
+    from benchmarks.startup import format_report, measure
+
+    results = []
+    for profile in args.profiles:
+        results.append(measure(profile, args.runs))
+        print(format_report(results[-1], args.top) + "\n", flush=True)
+    if args.out:
+        Path(args.out).write_text(json.dumps({"python": platform.python_version(), "results": results}, indent=2) + "\n")
+        print(f"Results written to {args.out}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0].startswith("-"):
+        argv = ["run", *argv]
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="SmartQR benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Seed a database, load-test the endpoints, write JSON")
+    run_parser.add_argument("--database-url", help="Benchmark this database instead of a temporary SQLite file")
+    run_parser.add_argument("--qr-codes", type=int, default=1000)
+    run_parser.add_argument("--scans", type=int, default=200_000)
+    run_parser.add_argument("--days", type=int, default=90)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--requests", type=int, default=2000, help="Timed requests per endpoint and mode")
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--warmup", type=int, default=100, help="Untimed requests before each scenario")
+    run_parser.add_argument("--timeout", type=float, default=30.0)
+    run_parser.add_argument("--endpoints", type=lambda v: v.split(","), default=list(ENDPOINTS))
+    run_parser.add_argument("--modes", type=lambda v: v.split(","), default=list(MODES), help="inproc,socket")
+    run_parser.add_argument("--no-micro", dest="micro", action="store_false", help="Skip function micro-benchmarks")
+    run_parser.add_argument("--micro-iterations", type=int, default=200)
+    run_parser.add_argument("--keep", action="store_true", help="Keep the temporary database and render cache")
+    run_parser.add_argument("--out", help="Write results here (default: stdout)")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="Percent change counted as a regression")
+
+    startup_parser = commands.add_parser("startup", help="Report import time of app.main per module")
+    startup_parser.add_argument("--profiles", type=lambda v: v.split(","), default=["full", "redirect"])
+    startup_parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per profile (medians)")
+    startup_parser.add_argument("--top", type=int, default=20, help="Rows per table")
+    startup_parser.add_argument("--out", help="Also write the full results as JSON here")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        sys.exit(1 if compare(args.old, args.new, args.threshold) else 0)
+    if args.command == "startup":
+        startup(args)
+        return
+
+    bad_modes = [mode for mode in args.modes if mode not in MODES]
+    if bad_modes:
+        parser.error(f"unknown modes: {', '.join(bad_modes)}")
+    bad_endpoints = [name for name in args.endpoints if name not in ENDPOINTS]
+    if bad_endpoints:
+        parser.error(f"unknown endpoints: {', '.join(bad_endpoints)} (choose from {', '.join(ENDPOINTS)})")
+    report = json.dumps(run(args), indent=2)
+    if args.out:
+        Path(args.out).write_text(report + "\n")
+        print(f"Results written to {args.out}")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
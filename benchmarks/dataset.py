@@ -0,0 +1,167 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Synthetic, reproducible benchmark data: QR codes with Zipf-like popularity and scan
+events spread over the last N days with a daily cycle, weekend dip, repeat visitors
+(stable IP, device and country per visitor), an IPv4/IPv6 mix and some unknowns.
+The same seed always produces the same rows.
+"""
+
+import ipaddress
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models import QRCode, ScanDailyRollup, ScanEvent
+from app.services.partition_service import rotate_partitions
+from app.services.qr_service import BASE_URL
+from app.services.rollup_service import rebuild_rollups
+
+ZIPF_S = 1.1
+# Relative scan volume per hour of day (UTC): quiet nights, lunch and evening peaks
+HOURLY_WEIGHTS = [2, 1, 1, 1, 1, 2, 4, 7, 9, 9, 10, 12, 14, 12, 10, 10, 11, 13, 15, 16, 14, 10, 6, 3]
+WEEKEND_FACTOR = 0.7
+DEVICES = [("mobile", 62), ("desktop", 30), ("tablet", 6), (None, 2)]
+COUNTRIES = [
+    ("US", 30), ("IN", 12), ("GB", 8), ("DE", 8), ("BR", 6), ("FR", 5), ("JP", 5),
+    ("CA", 4), ("AU", 3), ("ES", 3), ("NL", 2), ("MX", 2), (None, 12),
+]
+CAMPAIGNS = 10
+VISITORS_PER_SCAN = 1 / 3  # each visitor scans three times on average
+IPV6_SHARE = 0.1
+BATCH = 20000
+
+
+@dataclass
+class Dataset:
+    """QR ids by descending popularity, with cumulative weights for sampling requests."""
+
+    qr_ids: list[str]
+    cum_weights: list[float] = field(repr=False)
+    scans: int = 0
+
+    def sample(self, rng: random.Random) -> str:
+        return rng.choices(self.qr_ids, cum_weights=self.cum_weights)[0]
+
+
+def _zipf_cum_weights(n: int) -> list[float]:
+    return list(accumulate(1 / (rank ** ZIPF_S) for rank in range(1, n + 1)))
+
+
+def _pick(rng: random.Random, choices: list[tuple]) -> object:
+    values, weights = zip(*choices)
+    return rng.choices(values, weights=weights)[0]
+
+
+def _visitors(rng: random.Random, count: int) -> list[tuple]:
+    """(ip, device_type, country) per visitor."""
+    visitors = []
+    for _ in range(count):
+        if rng.random() < IPV6_SHARE:
+            ip = str(ipaddress.IPv6Address((0x2001_0db8 << 96) | rng.getrandbits(96)))
+        else:
+            ip = str(ipaddress.IPv4Address(rng.randrange(0x0B00_0000, 0xDF00_0000)))
+        visitors.append((ip, _pick(rng, DEVICES), _pick(rng, COUNTRIES)))
+    return visitors
+
+
+def seed_database(
+    db: Session,
+    qr_codes: int,
+    scans: int,
+    days: int = 90,
+    seed: int = 42,
+    now: datetime | None = None,
+) -> dict:
+    """
+    Insert `qr_codes` codes and `scans` scan events ending at `now`, then rotate closed
+    months into partitions and rebuild the rollups, as a long-running install would look.
+    Expects an empty database. Returns counts and timings. Commits.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.utcnow().replace(microsecond=0)
+    began = time.perf_counter()
+
+    qr_ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(qr_codes)]
+    db.execute(insert(QRCode), [
+        {
+            "id": qr_id,
+            "name": f"bench-{i}",
+            "original_data": f"https://example.com/p/{i}",
+            "redirect_url": f"https://example.com/p/{i}",
+            "encoded_data": f"{BASE_URL.rstrip('/')}/r/{qr_id}",
+            "campaign": f"campaign-{i % CAMPAIGNS}" if rng.random() < 0.8 else None,
+            "created_at": now - timedelta(days=days, seconds=qr_codes - i),
+        }
+        for i, qr_id in enumerate(qr_ids)
+    ])
+    db.commit()
+
+    visitors = _visitors(rng, max(1, int(scans * VISITORS_PER_SCAN)))
+    qr_weights = _zipf_cum_weights(qr_codes)
+    day_weights = list(accumulate(
+        WEEKEND_FACTOR if (now - timedelta(days=d)).weekday() >= 5 else 1.0 for d in range(days)
+    ))
+    hour_weights = list(accumulate(HOURLY_WEIGHTS))
+    hours = range(24)
+
+    inserted = 0
+    while inserted < scans:
+        rows = []
+        for _ in range(min(BATCH, scans - inserted)):
+            day = rng.choices(range(days), cum_weights=day_weights)[0]
+            hour = rng.choices(hours, cum_weights=hour_weights)[0]
+            timestamp = (now - timedelta(days=day)).replace(hour=hour, minute=0, second=0) + timedelta(
+                seconds=rng.randrange(3600)
+            )
+            if timestamp > now:
+                timestamp -= timedelta(days=1)
+            # Squaring skews visits towards a core of frequent visitors
+            ip, device, country = visitors[int(len(visitors) * rng.random() ** 2)]
+            rows.append({
+                "qr_id": rng.choices(qr_ids, cum_weights=qr_weights)[0],
+                "timestamp": timestamp,
+                "ip_address": ip,
+                "device_type": device,
+                "country": country,
+            })
+        db.execute(insert(ScanEvent), rows)
+        db.commit()
+        inserted += len(rows)
+    inserted_at = time.perf_counter()
+
+    partitions = rotate_partitions(db, now=now)
+    rebuild_rollups(db)
+    return {
+        "qr_codes": qr_codes,
+        "scans": scans,
+        "days": days,
+        "seed": seed,
+        "visitors": len(visitors),
+        "partitions": len(partitions),
+        "insert_s": round(inserted_at - began, 2),
+        "rollups_s": round(time.perf_counter() - inserted_at, 2),
+    }
+
+
+def load_dataset(db: Session) -> Dataset:
+    """QR codes in the database ordered by total scans, weighted Zipf-like for request sampling."""
+    totals = func.coalesce(func.sum(ScanDailyRollup.scans), 0)
+    rows = db.execute(
+        select(QRCode.id, totals)
+        .outerjoin(ScanDailyRollup, ScanDailyRollup.qr_id == QRCode.id)
+        .group_by(QRCode.id)
+        .order_by(totals.desc(), QRCode.id)
+    ).all()
+    if not rows:
+        raise ValueError("the benchmark database has no QR codes; seed it first")
+    return Dataset(
+        qr_ids=[qr_id for qr_id, _ in rows],
+        cum_weights=_zipf_cum_weights(len(rows)),
+        scans=sum(total for _, total in rows),
+    )
@@ -0,0 +1,194 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Closed-loop HTTP load: `concurrency` workers send a pre-built request list as fast as
+responses come back, through any httpx.AsyncClient (ASGI transport in-process, or TCP
+to a uvicorn server). Reports latency percentiles, throughput, errors and the peak RSS
+of the measured process while the scenario ran.
+"""
+
+import asyncio
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import httpx
+
+from benchmarks.dataset import Dataset
+
+USER_AGENTS = [
+    ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_4 like Mac OS X) Mobile/15E148", 45),
+    ("Mozilla/5.0 (Linux; Android 14; Pixel 8) Mobile Safari/537.36", 17),
+    ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/124.0 Safari/537.36", 30),
+    ("Mozilla/5.0 (iPad; CPU OS 17_4 like Mac OS X)", 6),
+    (None, 2),
+]
+
+
+@dataclass
+class Scenario:
+    """One endpoint under load: `build(dataset, rng, i)` returns httpx.request kwargs."""
+
+    name: str
+    build: Callable[[Dataset, random.Random, int], dict]
+    ok: tuple[int, ...] = (200,)
+
+
+def _redirect(dataset: Dataset, rng: random.Random, i: int) -> dict:
+    agent = rng.choices(*zip(*USER_AGENTS))[0]
+    headers = {"X-Forwarded-For": f"198.51.{rng.randrange(100)}.{rng.randrange(1, 255)}"}
+    if agent:
+        headers["User-Agent"] = agent
+    return {"method": "GET", "url": f"/r/{dataset.sample(rng)}", "headers": headers}
+
+
+def _create(dataset: Dataset, rng: random.Random, i: int) -> dict:
+    return {
+        "method": "POST",
+        "url": "/api/qr",
+        "json": {"name": f"bench-new-{i}", "data": f"https://example.com/new/{rng.getrandbits(48):x}"},
+    }
+
+
+def _image(dataset: Dataset, rng: random.Random, i: int) -> dict:
+    return {"method": "GET", "url": f"/qr/{dataset.sample(rng)}/image"}
+
+
+def _stats(dataset: Dataset, rng: random.Random, i: int) -> dict:
+    return {"method": "GET", "url": f"/api/qr/{dataset.sample(rng)}/stats"}
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("redirect", _redirect, ok=(302,)),
+        Scenario("create", _create),
+        Scenario("image", _image),
+        Scenario("stats", _stats),
+    )
+}
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, min(len(ordered), round(q / 100 * len(ordered) + 0.5)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies: list[float], wall: float) -> dict:
+    """Latency percentiles (ms) and throughput for a list of per-call seconds."""
+    ordered = sorted(latencies)
+    ms = [value * 1000 for value in ordered]
+    return {
+        "count": len(ordered),
+        "throughput_rps": round(len(ordered) / wall, 1) if wall > 0 else None,
+        "latency_ms": {
+            "p50": round(percentile(ms, 50), 3),
+            "p95": round(percentile(ms, 95), 3),
+            "p99": round(percentile(ms, 99), 3),
+            "mean": round(sum(ms) / len(ms), 3) if ms else 0.0,
+            "max": round(ms[-1], 3) if ms else 0.0,
+        },
+    }
+
+
+class RSSProbe:
+    """
+    Samples a process's resident set size on a thread and keeps the peak.
+    Reads /proc/<pid>/status (Linux); elsewhere it can only report this process's
+    lifetime peak from getrusage, which never goes down between scenarios.
+    """
+
+    def __init__(self, pid: int | None = None, interval: float = 0.01):
+        self.pid = pid or os.getpid()
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _read_kb(self) -> int | None:
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        if self.pid == os.getpid():
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS
+        return None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_kb = max(self.peak_kb, self._read_kb() or 0)
+
+    def __enter__(self) -> "RSSProbe":
+        self.peak_kb = self._read_kb() or 0
+        self._thread = threading.Thread(target=self._run, name="rss-probe", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, self._read_kb() or 0)
+
+    @property
+    def peak_mb(self) -> float | None:
+        return round(self.peak_kb / 1024, 1) if self.peak_kb else None
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    dataset: Dataset,
+    requests: int,
+    concurrency: int,
+    warmup: int = 0,
+    seed: int = 42,
+    rss_pid: int | None = None,
+) -> dict:
+    """Send `warmup` untimed then `requests` timed requests with `concurrency` in flight."""
+    rng = random.Random(f"{seed}:{scenario.name}")
+    calls = [scenario.build(dataset, rng, i) for i in range(warmup + requests)]
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+
+    async def worker(queue: list[dict], record: bool) -> None:
+        while queue:
+            call = queue.pop()
+            began = time.perf_counter()
+            try:
+                response = await client.request(**call)
+                failure = None if response.status_code in scenario.ok else str(response.status_code)
+            except httpx.HTTPError as e:
+                failure = type(e).__name__
+            if not record:
+                continue
+            if failure is None:
+                latencies.append(time.perf_counter() - began)
+            else:
+                errors[failure] = errors.get(failure, 0) + 1
+
+    warm, timed = calls[:warmup][::-1], calls[warmup:][::-1]
+    await asyncio.gather(*(worker(warm, False) for _ in range(concurrency)))
+    with RSSProbe(rss_pid) as probe:
+        began = time.perf_counter()
+        await asyncio.gather(*(worker(timed, True) for _ in range(concurrency)))
+        wall = time.perf_counter() - began
+    return {
+        "endpoint": scenario.name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        **summarize(latencies, wall),
+        "peak_rss_mb": probe.peak_mb,
+    }
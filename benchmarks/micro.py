@@ -0,0 +1,71 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Micro-benchmarks: the functions behind the hot endpoints, called directly (no HTTP,
+no event loop) so their cost can be tracked separately from the web stack.
+"""
+
+import time
+from typing import Callable
+
+from benchmarks.dataset import Dataset
+from benchmarks.load import summarize
+
+
+def time_calls(name: str, fn: Callable[[int], object], iterations: int, warmup: int = 0) -> dict:
+    """Call fn(i) `warmup` times untimed, then `iterations` times timed."""
+    for i in range(warmup):
+        fn(-1 - i)
+    latencies = []
+    began = time.perf_counter()
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - start)
+    wall = time.perf_counter() - began
+    result = summarize(latencies, wall)
+    return {"name": name, "iterations": iterations, "ops_per_s": result.pop("throughput_rps"), **result}
+
+
+def run_micro(dataset: Dataset, iterations: int = 200) -> list[dict]:
+    from app.database import SessionLocal
+    from app.services.qr_service import create_qr
+    from app.services.redirect_cache import get_redirect_target, invalidate_redirect
+    from app.utils.analytics import get_all_stats
+    from app.utils.qr_generator import generate_qr_image, get_qrcodes_dir
+
+    popular = dataset.qr_ids[0]
+    median = dataset.qr_ids[len(dataset.qr_ids) // 2]
+    written = []
+
+    def render(fixed: bool) -> Callable[[int], object]:
+        def call(i: int):
+            filename = f"bench-micro-{'cached' if fixed else i}.png"
+            written.append(filename)
+            data = "https://example.com/bench" if fixed else f"https://example.com/bench/{time.perf_counter_ns()}"
+            return generate_qr_image(data, filename)
+        return call
+
+    def uncached_redirect(db):
+        def call(i: int):
+            invalidate_redirect(popular)
+            return get_redirect_target(db, popular)
+        return call
+
+    results = []
+    try:
+        results.append(time_calls("generate_qr_image (render)", render(False), iterations, warmup=5))
+        results.append(time_calls("generate_qr_image (cached)", render(True), iterations, warmup=5))
+        with SessionLocal() as db:
+            results.append(time_calls(
+                "create_qr", lambda i: create_qr(db, f"bench-micro-{i}", f"https://example.com/m/{i}"),
+                iterations, warmup=5,
+            ))
+            results.append(time_calls("get_redirect_target (cached)", lambda i: get_redirect_target(db, popular), iterations * 10, warmup=5))
+            results.append(time_calls("get_redirect_target (miss)", uncached_redirect(db), iterations, warmup=5))
+            results.append(time_calls("get_all_stats (most scanned)", lambda i: get_all_stats(db, popular), iterations, warmup=5))
+            results.append(time_calls("get_all_stats (median)", lambda i: get_all_stats(db, median), iterations, warmup=5))
+    finally:
+        qrcodes = get_qrcodes_dir()
+        for filename in set(written):
+            (qrcodes / filename).unlink(missing_ok=True)
+    return results
@@ -0,0 +1,104 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Startup cost report: how long `import app.main` takes per app profile and where
+the time goes, from `python -X importtime` in fresh interpreters (medians over
+several runs; single runs are noisy). Also lists which heavy libraries the import
+loaded, to catch a module that starts importing Pillow, qrcode or Jinja2 eagerly.
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Libraries worth knowing about when they are (or are not) loaded at import
+HEAVY = ("qrcode", "PIL", "jinja2", "alembic", "sqlalchemy", "fastapi", "pydantic", "uvicorn", "httpx")
+
+_PROBE = (
+    "import sys, time\n"
+    "started = time.perf_counter()\n"
+    "import app.main\n"
+    "print(time.perf_counter() - started)\n"
+    f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))\n"
+)
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) for each line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def _import_once(profile: str) -> tuple[float, list[str], list[tuple[str, int, int]]]:
+    env = {**os.environ, "SMARTQR_APP_PROFILE": profile}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing app.main ({profile}) failed:\n{proc.stderr[-2000:]}")
+    seconds, loaded = proc.stdout.strip().splitlines()[-2:]
+    return float(seconds), [m for m in loaded.split(",") if m], parse_importtime(proc.stderr)
+
+
+def measure(profile: str, runs: int = 5) -> dict:
+    """Import app.main `runs` times for one profile; per-module medians in milliseconds."""
+    walls, loaded = [], []
+    self_us: dict[str, list[int]] = {}
+    cumulative_us: dict[str, list[int]] = {}
+    for _ in range(max(1, runs)):
+        seconds, loaded, rows = _import_once(profile)
+        walls.append(seconds)
+        for name, own, total in rows:
+            self_us.setdefault(name, []).append(own)
+            cumulative_us.setdefault(name, []).append(total)
+    modules = [
+        {
+            "module": name,
+            "self_ms": round(statistics.median(self_us[name]) / 1000, 2),
+            "cumulative_ms": round(statistics.median(cumulative_us[name]) / 1000, 2),
+        }
+        for name in self_us
+    ]
+    packages: dict[str, float] = {}
+    for item in modules:
+        package = item["module"].split(".")[0]
+        packages[package] = packages.get(package, 0.0) + item["self_ms"]
+    return {
+        "profile": profile,
+        "runs": len(walls),
+        "import_ms": round(statistics.median(walls) * 1000, 1),
+        "import_ms_min": round(min(walls) * 1000, 1),
+        "loaded": loaded,
+        "not_loaded": [m for m in HEAVY if m not in loaded],
+        "packages": sorted(
+            ({"package": name, "self_ms": round(ms, 2)} for name, ms in packages.items()),
+            key=lambda item: -item["self_ms"],
+        ),
+        "modules": sorted(modules, key=lambda item: -item["cumulative_ms"]),
+    }
+
+
+def format_report(result: dict, top: int = 20) -> str:
+    lines = [
+        f"profile {result['profile']}: import app.main {result['import_ms']} ms "
+        f"(median of {result['runs']}, best {result['import_ms_min']} ms)",
+        f"  loaded:     {', '.join(result['loaded']) or '-'}",
+        f"  not loaded: {', '.join(result['not_loaded']) or '-'}",
+        f"  {'package':32} {'self ms':>10}",
+    ]
+    lines += [f"  {item['package']:32} {item['self_ms']:>10.1f}" for item in result["packages"][:top]]
+    lines.append(f"  {'app module':32} {'self ms':>10} {'cumul. ms':>10}")
+    app_modules = [item for item in result["modules"] if item["module"].split(".")[0] == "app"]
+    lines += [
+        f"  {item['module']:32} {item['self_ms']:>10.1f} {item['cumulative_ms']:>10.1f}"
+        for item in app_modules[:top]
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,46 @@
+# ===== PHASE 10: Performance & Scaling =====
+"""
+Alembic environment: runs migrations against app.database.engine
+(SMARTQR_DATABASE_URL) with the app models as the autogenerate target.
+"""
+
+from alembic import context
+
+import app.models  # noqa: F401 - register models with Base
+from app.database import DATABASE_URL, Base, engine
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    """Emit SQL to stdout instead of executing it (`alembic upgrade --sql`)."""
+    context.configure(
+        url=DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = context.config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    with engine.connect() as connection:
+        _run(connection)
+
+
+def _run(connection) -> None:
+    # Batch mode lets SQLite emulate ALTER operations it does not support natively
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
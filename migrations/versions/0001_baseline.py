@@ -0,0 +1,48 @@
+"""baseline: qrcodes and scan_events
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Databases created by the old create_all startup already have these tables;
+the revision then only records the version.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("qrcodes"):
+        op.create_table(
+            "qrcodes",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("name", sa.String(255), nullable=False),
+            sa.Column("original_data", sa.Text(), nullable=False),
+            sa.Column("redirect_url", sa.Text(), nullable=True),
+            sa.Column("fill_color", sa.String(50)),
+            sa.Column("back_color", sa.String(50)),
+            sa.Column("logo_path", sa.String(500), nullable=True),
+            sa.Column("created_at", sa.DateTime()),
+        )
+    if not inspector.has_table("scan_events"):
+        op.create_table(
+            "scan_events",
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("qr_id", sa.String(36), sa.ForeignKey("qrcodes.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("timestamp", sa.DateTime()),
+            sa.Column("ip_address", sa.String(45), nullable=True),
+            sa.Column("country", sa.String(100), nullable=True),
+            sa.Column("device_type", sa.String(100), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("scan_events")
+    op.drop_table("qrcodes")
@@ -0,0 +1,59 @@
+"""per-day scan rollups and visitor sketches
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+Rollups for existing scans are backfilled at startup (ensure_rollups_backfilled)
+or with `python run.py rebuild-rollups`.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _key_columns():
+    return [
+        sa.Column("qr_id", sa.String(36), sa.ForeignKey("qrcodes.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+    ]
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("scan_daily_rollups"):
+        op.create_table(
+            "scan_daily_rollups",
+            *_key_columns(),
+            sa.Column("scans", sa.Integer(), nullable=False),
+        )
+    if not inspector.has_table("scan_device_rollups"):
+        op.create_table(
+            "scan_device_rollups",
+            *_key_columns(),
+            sa.Column("device_type", sa.String(100), primary_key=True),
+            sa.Column("scans", sa.Integer(), nullable=False),
+        )
+    if not inspector.has_table("scan_country_rollups"):
+        op.create_table(
+            "scan_country_rollups",
+            *_key_columns(),
+            sa.Column("country", sa.String(100), primary_key=True),
+            sa.Column("scans", sa.Integer(), nullable=False),
+        )
+    if not inspector.has_table("scan_visitor_sketches"):
+        op.create_table(
+            "scan_visitor_sketches",
+            *_key_columns(),
+            sa.Column("registers", sa.LargeBinary(), nullable=False),
+        )
+
+
+def downgrade() -> None:
+    for table in ("scan_visitor_sketches", "scan_country_rollups", "scan_device_rollups", "scan_daily_rollups"):
+        op.drop_table(table)
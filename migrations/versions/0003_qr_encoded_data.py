@@ -0,0 +1,28 @@
+"""qrcodes.encoded_data and dashboard keyset index
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "encoded_data" not in {col["name"] for col in inspector.get_columns("qrcodes")}:
+        op.add_column("qrcodes", sa.Column("encoded_data", sa.Text(), nullable=True))
+    if "ix_qrcodes_created_at_id" not in {ix["name"] for ix in inspector.get_indexes("qrcodes")}:
+        op.create_index("ix_qrcodes_created_at_id", "qrcodes", ["created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_qrcodes_created_at_id", table_name="qrcodes")
+    with op.batch_alter_table("qrcodes") as batch:
+        batch.drop_column("encoded_data")
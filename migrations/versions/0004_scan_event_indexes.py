@@ -0,0 +1,34 @@
+"""scan_events (qr_id, timestamp) and (qr_id, ip_address) indexes
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+_INDEXES = {
+    "ix_scan_events_qr_id_timestamp": ["qr_id", "timestamp"],
+    "ix_scan_events_qr_id_ip_address": ["qr_id", "ip_address"],
+}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    present = {ix["name"] for ix in sa.inspect(bind).get_indexes("scan_events")}
+    for name, columns in _INDEXES.items():
+        if name not in present:
+            op.create_index(name, "scan_events", columns)
+    if bind.dialect.name == "sqlite":
+        op.execute("ANALYZE scan_events")  # planner statistics for the new indexes
+
+
+def downgrade() -> None:
+    for name in _INDEXES:
+        op.drop_index(name, table_name="scan_events")
@@ -0,0 +1,139 @@
+"""monthly scan_events partitions: catalog, timestamp index, native partitioning on PostgreSQL
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+SQLite keeps scan_events as the table new scans land in; closed months are rotated
+into scan_events_YYYYMM tables by app.services.partition_service. On PostgreSQL the
+table is rebuilt as PARTITION BY RANGE (timestamp) with one partition per month of
+existing data, the current and next two months, and a DEFAULT partition.
+"""
+
+from datetime import date, datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+_COLUMNS = "id, qr_id, timestamp, ip_address, country, device_type"
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _partition_postgres(bind) -> list[date]:
+    op.execute("ALTER TABLE scan_events RENAME TO scan_events_unpartitioned")
+    op.execute("ALTER TABLE scan_events_unpartitioned RENAME CONSTRAINT scan_events_pkey TO scan_events_unpartitioned_pkey")
+    op.execute("ALTER TABLE scan_events_unpartitioned RENAME CONSTRAINT scan_events_qr_id_fkey TO scan_events_unpartitioned_qr_id_fkey")
+    for index in ("ix_scan_events_qr_id_timestamp", "ix_scan_events_qr_id_ip_address"):
+        op.execute(f"DROP INDEX IF EXISTS {index}")
+    # The partition key must be part of the primary key
+    op.execute("""
+        CREATE TABLE scan_events (
+            id VARCHAR(36) NOT NULL,
+            qr_id VARCHAR(36) NOT NULL REFERENCES qrcodes (id) ON DELETE CASCADE,
+            timestamp TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+            ip_address VARCHAR(45),
+            country VARCHAR(100),
+            device_type VARCHAR(100),
+            PRIMARY KEY (id, timestamp)
+        ) PARTITION BY RANGE (timestamp)
+    """)
+    existing = bind.execute(sa.text(
+        "SELECT DISTINCT date_trunc('month', timestamp)::date FROM scan_events_unpartitioned WHERE timestamp IS NOT NULL"
+    )).scalars().all()
+    current = date.today().replace(day=1)
+    months = set(existing) | {current, _next_month(current), _next_month(_next_month(current))}
+    for month in sorted(months):
+        op.execute(
+            f"CREATE TABLE scan_events_{month:%Y%m} PARTITION OF scan_events "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+    op.execute("CREATE TABLE scan_events_default PARTITION OF scan_events DEFAULT")
+    op.execute(
+        f"INSERT INTO scan_events ({_COLUMNS}) "
+        f"SELECT id, qr_id, COALESCE(timestamp, now() AT TIME ZONE 'utc'), ip_address, country, device_type "
+        f"FROM scan_events_unpartitioned"
+    )
+    op.execute("DROP TABLE scan_events_unpartitioned")
+    return sorted(months)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table("scan_partitions"):
+        op.create_table(
+            "scan_partitions",
+            sa.Column("name", sa.String(64), primary_key=True),
+            sa.Column("month", sa.Date(), nullable=False, unique=True),
+            sa.Column("status", sa.String(16), nullable=False),
+            sa.Column("row_count", sa.Integer(), nullable=True),
+            sa.Column("archive_path", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime()),
+            sa.Column("archived_at", sa.DateTime(), nullable=True),
+        )
+
+    months = []
+    if bind.dialect.name == "postgresql":
+        partitioned = bind.execute(sa.text(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'scan_events'::regclass"
+        )).first()
+        if not partitioned:
+            months = _partition_postgres(bind)
+
+    present = {ix["name"] for ix in sa.inspect(bind).get_indexes("scan_events")}
+    for name, columns in (
+        ("ix_scan_events_qr_id_timestamp", ["qr_id", "timestamp"]),
+        ("ix_scan_events_qr_id_ip_address", ["qr_id", "ip_address"]),
+        ("ix_scan_events_timestamp", ["timestamp"]),
+    ):
+        if name not in present:
+            op.create_index(name, "scan_events", columns)
+
+    if months:
+        catalog = sa.table(
+            "scan_partitions",
+            sa.column("name", sa.String),
+            sa.column("month", sa.Date),
+            sa.column("status", sa.String),
+            sa.column("created_at", sa.DateTime),
+        )
+        op.bulk_insert(catalog, [
+            {"name": f"scan_events_{m:%Y%m}", "month": m, "status": "active", "created_at": datetime.utcnow()}
+            for m in months
+        ])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name == "postgresql":
+        op.execute("ALTER TABLE scan_events RENAME TO scan_events_partitioned")
+        op.execute("""
+            CREATE TABLE scan_events (
+                id VARCHAR(36) NOT NULL PRIMARY KEY,
+                qr_id VARCHAR(36) NOT NULL REFERENCES qrcodes (id) ON DELETE CASCADE,
+                timestamp TIMESTAMP WITHOUT TIME ZONE,
+                ip_address VARCHAR(45),
+                country VARCHAR(100),
+                device_type VARCHAR(100)
+            )
+        """)
+        op.execute(f"INSERT INTO scan_events ({_COLUMNS}) SELECT {_COLUMNS} FROM scan_events_partitioned")
+        op.execute("DROP TABLE scan_events_partitioned CASCADE")
+        op.create_index("ix_scan_events_qr_id_timestamp", "scan_events", ["qr_id", "timestamp"])
+        op.create_index("ix_scan_events_qr_id_ip_address", "scan_events", ["qr_id", "ip_address"])
+    else:
+        # Fold rotated months back into scan_events
+        names = bind.execute(sa.text("SELECT name FROM scan_partitions WHERE status = 'active'")).scalars().all()
+        for name in names:
+            op.execute(f"INSERT INTO scan_events ({_COLUMNS}) SELECT {_COLUMNS} FROM {name}")
+            op.execute(f"DROP TABLE {name}")
+        op.drop_index("ix_scan_events_timestamp", table_name="scan_events")
+    op.drop_table("scan_partitions")
@@ -0,0 +1,288 @@
+"""compact scan_events: integer ids, binary IPs, small-integer device/country codes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+Rewrites scan_events (and rotated scan_events_YYYYMM tables on SQLite) with the
+encodings in app.utils.scan_codes and prints the table + index size before and after.
+Old UUID event ids are replaced by sequential integers in insertion order. IPs,
+devices and countries that cannot be encoded become NULL.
+"""
+
+from alembic import context, op
+import sqlalchemy as sa
+
+from app.utils.scan_codes import (
+    DEVICE_TYPES,
+    decode_country,
+    decode_device,
+    encode_country,
+    encode_device,
+    pack_ip,
+    unpack_ip,
+)
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+_BATCH = 5000
+
+
+def _report(message: str) -> None:
+    context.config.print_stdout("  %s", message)
+
+
+def _mb(size: int) -> str:
+    return f"{size / (1024 * 1024):.2f} MB"
+
+
+# ----- SQLite: rebuild each table -----
+
+def _sqlite_tables(bind) -> list[str]:
+    tables = ["scan_events"]
+    if sa.inspect(bind).has_table("scan_partitions"):
+        tables += bind.execute(sa.text(
+            "SELECT name FROM scan_partitions WHERE status = 'active' ORDER BY month"
+        )).scalars().all()
+    existing = set(sa.inspect(bind).get_table_names())
+    return [name for name in tables if name in existing]
+
+
+def _sqlite_size(bind, name: str) -> int | None:
+    """Bytes used by a table and its indexes (None when SQLite lacks the dbstat table)."""
+    try:
+        return bind.execute(sa.text(
+            "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat "
+            "WHERE name IN (SELECT name FROM sqlite_master WHERE tbl_name = :name)"
+        ), {"name": name}).scalar()
+    except sa.exc.OperationalError:
+        return None
+
+
+def _has_rows(bind, name: str) -> bool:
+    return bind.execute(sa.text(f"SELECT 1 FROM {name} LIMIT 1")).first() is not None
+
+
+def _scan_table(name: str, compact: bool, fk: bool = False) -> sa.Table:
+    metadata = sa.MetaData()
+    if compact:
+        columns = [
+            sa.Column("id", sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column("ip_address", sa.LargeBinary(16)),
+            sa.Column("country", sa.SmallInteger),
+            sa.Column("device_type", sa.SmallInteger),
+        ]
+    else:
+        columns = [
+            sa.Column("id", sa.String(36), primary_key=True),
+            sa.Column("ip_address", sa.String(45)),
+            sa.Column("country", sa.String(100)),
+            sa.Column("device_type", sa.String(100)),
+        ]
+    # As in models.ScanEvent; rotated partitions are created without it (partition_service)
+    foreign_key = []
+    if fk:
+        sa.Table("qrcodes", metadata, sa.Column("id", sa.String(36), primary_key=True))
+        foreign_key = [sa.ForeignKey("qrcodes.id", ondelete="CASCADE")]
+    return sa.Table(
+        name, metadata,
+        columns[0],
+        sa.Column("qr_id", sa.String(36), *foreign_key, nullable=False),
+        sa.Column("timestamp", sa.DateTime),
+        *columns[1:],
+    )
+
+
+def _create_indexes(name: str) -> None:
+    prefix = "ix_scan_events" if name == "scan_events" else f"ix_{name}"
+    op.create_index(f"{prefix}_qr_id_timestamp", name, ["qr_id", "timestamp"])
+    op.create_index(f"{prefix}_qr_id_ip_address", name, ["qr_id", "ip_address"])
+    op.create_index(f"{prefix}_timestamp", name, ["timestamp"])
+
+
+def _rebuild_sqlite(bind, name: str, compact: bool, convert) -> None:
+    """Copy `name` into a new table with the target encoding, in rowid order, then swap it in."""
+    fk = name == "scan_events"
+    if not _has_rows(bind, name):
+        op.drop_table(name)
+        _scan_table(name, compact, fk=fk).create(bind)
+        _create_indexes(name)
+        return
+    staging = _scan_table(f"{name}__rebuild", compact, fk=fk)
+    staging.create(bind)
+    source_cols = "id, qr_id, timestamp, ip_address, country, device_type"
+    last = 0
+    while True:
+        rows = bind.execute(sa.text(
+            f"SELECT rowid, {source_cols} FROM {name} WHERE rowid > :last ORDER BY rowid LIMIT {_BATCH}"
+        ).columns(timestamp=sa.DateTime), {"last": last}).all()
+        if not rows:
+            break
+        bind.execute(staging.insert(), [convert(row) for row in rows])
+        last = rows[-1][0]
+    op.drop_table(name)
+    op.rename_table(staging.name, name)
+    _create_indexes(name)
+
+
+def _to_compact(row) -> dict:
+    _, _, qr_id, timestamp, ip, country, device = row
+    return {
+        "qr_id": qr_id,
+        "timestamp": timestamp,
+        "ip_address": pack_ip(ip),
+        "country": encode_country(country),
+        "device_type": encode_device(device),
+    }
+
+
+def _to_strings(row) -> dict:
+    _, event_id, qr_id, timestamp, ip, country, device = row
+    return {
+        "id": str(event_id),
+        "qr_id": qr_id,
+        "timestamp": timestamp,
+        "ip_address": unpack_ip(ip),
+        "country": decode_country(country),
+        "device_type": decode_device(device),
+    }
+
+
+def _lossy_counts(bind, tables: list[str]) -> tuple[int, int, int]:
+    """Rows whose IP / country / device cannot be encoded (they become NULL)."""
+    ips = countries = devices = 0
+    for name in tables:
+        for ip, country, device in bind.execute(sa.text(
+            f"SELECT ip_address, country, device_type FROM {name} "
+            "WHERE ip_address IS NOT NULL OR country IS NOT NULL OR device_type IS NOT NULL"
+        )):
+            ips += ip is not None and pack_ip(ip) is None
+            countries += country is not None and encode_country(country) is None
+            devices += device is not None and encode_device(device) is None
+    return ips, countries, devices
+
+
+# ----- PostgreSQL: convert columns in place (propagates to every partition) -----
+
+_PG_DEVICE_CODE = "CASE lower(device_type) " + " ".join(
+    f"WHEN '{label}' THEN {code}" for code, label in enumerate(DEVICE_TYPES, start=1)
+) + " END"
+_PG_DEVICE_LABEL = "CASE device_type " + " ".join(
+    f"WHEN {code} THEN '{label}'" for code, label in enumerate(DEVICE_TYPES, start=1)
+) + " END"
+_PG_COUNTRY_CODE = (
+    "CASE WHEN upper(btrim(country)) ~ '^[A-Z]{2}$' THEN "
+    "(ascii(substr(upper(btrim(country)), 1, 1)) - 64) * 27 + ascii(substr(upper(btrim(country)), 2, 1)) - 64 END"
+)
+_PG_COUNTRY_LABEL = "CASE WHEN country > 0 THEN chr(64 + country / 27) || chr(64 + country % 27) END"
+
+
+def _pg_size(bind) -> int:
+    return bind.execute(sa.text(
+        "SELECT COALESCE(SUM(pg_total_relation_size(relid)), 0) FROM pg_partition_tree('scan_events')"
+    )).scalar()
+
+
+def _create_pg_inet_cast() -> None:
+    op.execute("""
+        CREATE FUNCTION pg_temp.smartqr_inet(value text) RETURNS inet AS $$
+        BEGIN
+            RETURN btrim(value)::inet;
+        EXCEPTION WHEN others THEN
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql IMMUTABLE
+    """)
+
+
+def _pg_lossy_counts(bind) -> tuple[int, int, int]:
+    return tuple(bind.execute(sa.text(
+        "SELECT "
+        "count(*) FILTER (WHERE ip_address IS NOT NULL AND pg_temp.smartqr_inet(ip_address) IS NULL), "
+        f"count(*) FILTER (WHERE country IS NOT NULL AND ({_PG_COUNTRY_CODE}) IS NULL), "
+        f"count(*) FILTER (WHERE device_type IS NOT NULL AND ({_PG_DEVICE_CODE}) IS NULL) "
+        "FROM scan_events"
+    )).one())
+
+
+def _upgrade_postgres() -> None:
+    op.execute("CREATE SEQUENCE scan_events_id_seq AS bigint")
+    op.execute("ALTER TABLE scan_events DROP CONSTRAINT scan_events_pkey")
+    op.execute("ALTER TABLE scan_events ADD COLUMN id_new bigint NOT NULL DEFAULT nextval('scan_events_id_seq')")
+    op.execute("ALTER TABLE scan_events DROP COLUMN id")
+    op.execute("ALTER TABLE scan_events RENAME COLUMN id_new TO id")
+    op.execute("ALTER SEQUENCE scan_events_id_seq OWNED BY scan_events.id")
+    op.execute("ALTER TABLE scan_events ADD PRIMARY KEY (id, timestamp)")
+    op.execute(
+        "ALTER TABLE scan_events "
+        "ALTER COLUMN ip_address TYPE inet USING pg_temp.smartqr_inet(ip_address), "
+        f"ALTER COLUMN country TYPE smallint USING {_PG_COUNTRY_CODE}, "
+        f"ALTER COLUMN device_type TYPE smallint USING {_PG_DEVICE_CODE}"
+    )
+
+
+def _downgrade_postgres() -> None:
+    op.execute(
+        "ALTER TABLE scan_events "
+        "ALTER COLUMN ip_address TYPE varchar(45) USING host(ip_address), "
+        f"ALTER COLUMN country TYPE varchar(100) USING {_PG_COUNTRY_LABEL}, "
+        f"ALTER COLUMN device_type TYPE varchar(100) USING {_PG_DEVICE_LABEL}"
+    )
+    op.execute("ALTER TABLE scan_events ALTER COLUMN id DROP DEFAULT")
+    op.execute("ALTER TABLE scan_events ALTER COLUMN id TYPE varchar(36) USING id::text")
+    op.execute("DROP SEQUENCE IF EXISTS scan_events_id_seq")
+
+
+def _is_compact(bind) -> bool:
+    column = next(c for c in sa.inspect(bind).get_columns("scan_events") if c["name"] == "device_type")
+    return isinstance(column["type"], sa.SmallInteger)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if _is_compact(bind):
+        return
+    if bind.dialect.name == "postgresql":
+        _create_pg_inet_cast()
+        has_rows = _has_rows(bind, "scan_events")
+        ips, countries, devices = _pg_lossy_counts(bind)
+        before = _pg_size(bind)
+        _upgrade_postgres()
+        after = _pg_size(bind)
+    else:
+        tables = _sqlite_tables(bind)
+        has_rows = any(_has_rows(bind, name) for name in tables)
+        ips, countries, devices = _lossy_counts(bind, tables)
+        sizes = {name: _sqlite_size(bind, name) for name in tables}
+        for name in tables:
+            _rebuild_sqlite(bind, name, compact=True, convert=_to_compact)
+        op.execute("ANALYZE")
+        if any(size is None for size in sizes.values()):
+            before = after = None
+        else:
+            before = sum(sizes.values())
+            after = sum(_sqlite_size(bind, name) for name in tables)
+
+    if before is not None and has_rows:
+        saved = 100 * (before - after) / before if before else 0.0
+        _report(f"scan events: {_mb(before)} -> {_mb(after)} ({saved:.0f}% smaller, tables + indexes)")
+        if bind.dialect.name == "sqlite":
+            _report("run VACUUM to return the freed pages to the filesystem")
+    if ips or countries or devices:
+        _report(
+            f"stored as NULL (not encodable): {ips} IPs, {countries} countries, {devices} device types"
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if not _is_compact(bind):
+        return
+    if bind.dialect.name == "postgresql":
+        _downgrade_postgres()
+        return
+    for name in _sqlite_tables(bind):
+        _rebuild_sqlite(bind, name, compact=False, convert=_to_strings)
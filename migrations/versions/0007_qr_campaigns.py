@@ -0,0 +1,33 @@
+"""qrcodes.campaign and indexes for cross-QR analytics
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "campaign" not in {col["name"] for col in inspector.get_columns("qrcodes")}:
+        op.add_column("qrcodes", sa.Column("campaign", sa.String(100), nullable=True))
+    if "ix_qrcodes_campaign" not in {ix["name"] for ix in inspector.get_indexes("qrcodes")}:
+        op.create_index("ix_qrcodes_campaign", "qrcodes", ["campaign"])
+    if "ix_scan_daily_rollups_day_qr_id_scans" not in {
+        ix["name"] for ix in inspector.get_indexes("scan_daily_rollups")
+    }:
+        op.create_index("ix_scan_daily_rollups_day_qr_id_scans", "scan_daily_rollups", ["day", "qr_id", "scans"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_scan_daily_rollups_day_qr_id_scans", table_name="scan_daily_rollups")
+    op.drop_index("ix_qrcodes_campaign", table_name="qrcodes")
+    with op.batch_alter_table("qrcodes") as batch:
+        batch.drop_column("campaign")
@@ -0,0 +1,37 @@
+"""timestamp index on rotated SQLite scan partitions
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+Raw event exports walk partitions in (timestamp, id) order; scan_events already has
+ix_scan_events_timestamp and PostgreSQL partitions inherit it from the parent.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def _sqlite_partitions(bind) -> list[str]:
+    if bind.dialect.name != "sqlite":
+        return []
+    existing = set(sa.inspect(bind).get_table_names())
+    names = bind.execute(sa.text("SELECT name FROM scan_partitions WHERE status = 'active'")).scalars().all()
+    return [name for name in names if name in existing]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for name in _sqlite_partitions(bind):
+        if f"ix_{name}_timestamp" not in {ix["name"] for ix in sa.inspect(bind).get_indexes(name)}:
+            op.create_index(f"ix_{name}_timestamp", name, ["timestamp"])
+
+
+def downgrade() -> None:
+    for name in _sqlite_partitions(op.get_bind()):
+        op.drop_index(f"ix_{name}_timestamp", table_name=name)
@@ -1,7 +1,22 @@
 #!/usr/bin/env python3
 # ===== PHASE 3: Basic QR Generation =====
-"""SmartQR launcher - installs deps if needed and runs the app."""
+# ===== PHASE 10: Performance & Scaling =====
+"""SmartQR launcher - installs deps if needed and runs the app.
 
+Usage:
+    python run.py                      # apply migrations, start the dev server
+    python run.py prod [--config FILE] # production: preforked workers, no reload (app/server.py)
+    python run.py rebuild-rollups      # recompute scan rollups from raw events
+    python run.py db upgrade [REV]     # apply schema migrations (default: head)
+    python run.py db downgrade REV     # revert to an older revision
+    python run.py db current           # show database and latest revisions
+    python run.py db revision -m MSG   # new revision (--autogenerate diffs the models)
+    python run.py partitions list      # show monthly scan partitions
+    python run.py partitions maintain  # rotate/create partitions and apply retention now
+    python run.py partitions archive NAME  # archive and drop one partition
+"""
+
+import argparse
 import os
 import socket
 import subprocess
@@ -27,7 +42,7 @@ def get_local_ip() -> str | None:
 
 def ensure_deps():
     """Install requirements if any package is missing."""
-    required = ["sqlalchemy", "fastapi", "uvicorn", "qrcode", "PIL"]  # PIL = Pillow
+    required = ["sqlalchemy", "greenlet", "aiosqlite", "alembic", "fastapi", "uvicorn", "qrcode", "PIL"]  # PIL = Pillow
     missing = []
     for pkg in required:
         try:
@@ -47,9 +62,8 @@ def ensure_deps():
             print("If SSL errors occur, try: pip install -r requirements.txt --trusted-host pypi.org --trusted-host files.pythonhosted.org")
             raise
 
-if __name__ == "__main__":
-    ensure_deps()
-
+def serve():
+    """Start the dev server with auto-reload."""
     # Listen on all interfaces (0.0.0.0) so phones on same WiFi can connect
     host = "0.0.0.0"
     port = 8000
@@ -61,5 +75,130 @@ if __name__ == "__main__":
             os.environ["SMARTQR_BASE_URL"] = f"http://{local_ip}:{port}"
             print(f"SmartQR: New QRs will use http://{local_ip}:{port} (phone-scannable on same WiFi)")
 
+    from app.migrations import upgrade_database
+
+    upgrade_database()
+
     import uvicorn
     uvicorn.run("app.main:app", host=host, port=port, reload=True)
+
+
+def prod(args):
+    """Start the production server: one preloaded worker per core, no reload, no pip."""
+    from app.server import load_config, serve as serve_prod
+
+    try:
+        config = load_config(args.config, host=args.host, port=args.port, workers=args.workers)
+    except (OSError, ValueError) as e:
+        sys.exit(f"SmartQR: {e}")
+    sys.exit(serve_prod(config))
+
+
+def rebuild_rollups(qr_id: str | None = None):
+    """Backfill/rebuild scan rollup tables from raw scan events."""
+    from app.database import SessionLocal
+    from app.migrations import upgrade_database
+    from app.services.rollup_service import rebuild_rollups as _rebuild
+
+    upgrade_database()
+    with SessionLocal() as db:
+        folded = _rebuild(db, qr_id=qr_id)
+    target = f"QR {qr_id}" if qr_id else "all QRs"
+    print(f"SmartQR: Rebuilt rollups for {target} from {folded} scan events")
+
+
+def db(action: str, revision: str | None = None, message: str | None = None, autogenerate: bool = False):
+    """Schema migration commands (Alembic)."""
+    from alembic import command
+
+    from app.migrations import alembic_config, current_revision, downgrade_database, head_revision, upgrade_database
+
+    if action == "upgrade":
+        upgrade_database(revision or "head")
+        print(f"SmartQR: Database at revision {current_revision() or 'none'}")
+    elif action == "downgrade":
+        downgrade_database(revision)
+        print(f"SmartQR: Database at revision {current_revision() or 'none'}")
+    elif action == "current":
+        print(f"SmartQR: Database revision {current_revision() or 'none'} (latest {head_revision()})")
+    elif action == "revision":
+        command.revision(alembic_config(), message=message, autogenerate=autogenerate)
+
+
+def partitions(action: str, name: str | None = None, fmt: str | None = None):
+    """Monthly scan partition commands."""
+    from app.database import SessionLocal
+    from app.migrations import upgrade_database
+    from app.models import ScanPartition
+    from app.services.partition_service import list_partitions, rotate_partitions
+    from app.services.retention_service import SCAN_ARCHIVE_FORMAT, archive_partition, maintain_partitions
+
+    upgrade_database()
+    with SessionLocal() as session:
+        if action == "list":
+            for part in list_partitions(session):
+                rows = "?" if part.row_count is None else part.row_count
+                where = f"  {part.archive_path}" if part.archive_path else ""
+                print(f"{part.name}  {part.status:<8}  {rows:>10} rows{where}")
+        elif action == "rotate":
+            moved = rotate_partitions(session)
+            print(f"SmartQR: Rotated {sum(moved.values())} scan events into {len(moved)} partitions")
+        elif action == "maintain":
+            print(f"SmartQR: {maintain_partitions(session)}")
+        elif action == "archive":
+            part = session.get(ScanPartition, name)
+            if part is None or part.status != "active":
+                sys.exit(f"SmartQR: No active partition named {name}")
+            path = archive_partition(session, part, fmt or SCAN_ARCHIVE_FORMAT)
+            print(f"SmartQR: Archived {part.row_count} scan events from {name} to {path or '(dropped)'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SmartQR launcher")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("serve", help="Run the dev server (default)")
+    prod_parser = commands.add_parser("prod", help="Run the production server (preforked workers)")
+    prod_parser.add_argument("--config", help="TOML config file (default: $SMARTQR_CONFIG)")
+    prod_parser.add_argument("--host")
+    prod_parser.add_argument("--port", type=int)
+    prod_parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    rebuild_parser = commands.add_parser("rebuild-rollups", help="Recompute scan rollups from raw events")
+    rebuild_parser.add_argument("--qr-id", help="Only rebuild this QR code")
+    db_parser = commands.add_parser("db", help="Schema migrations")
+    db_actions = db_parser.add_subparsers(dest="action", required=True)
+    upgrade_parser = db_actions.add_parser("upgrade", help="Apply migrations")
+    upgrade_parser.add_argument("revision", nargs="?", default="head")
+    downgrade_parser = db_actions.add_parser("downgrade", help="Revert migrations")
+    downgrade_parser.add_argument("revision")
+    db_actions.add_parser("current", help="Show the database revision")
+    revision_parser = db_actions.add_parser("revision", help="Create a new revision file")
+    revision_parser.add_argument("-m", "--message", required=True)
+    revision_parser.add_argument("--autogenerate", action="store_true")
+    partitions_parser = commands.add_parser("partitions", help="Monthly scan event partitions")
+    partition_actions = partitions_parser.add_subparsers(dest="action", required=True)
+    partition_actions.add_parser("list", help="List partitions")
+    partition_actions.add_parser("rotate", help="Move closed months out of scan_events (SQLite)")
+    partition_actions.add_parser("maintain", help="Rotate, create upcoming partitions and apply retention")
+    archive_parser = partition_actions.add_parser("archive", help="Archive and drop one partition")
+    archive_parser.add_argument("name")
+    archive_parser.add_argument("--format", choices=["ndjson", "parquet", "none"])
+    args = parser.parse_args()
+
+    if args.command == "prod":
+        prod(args)
+
+    ensure_deps()
+
+    if args.command == "rebuild-rollups":
+        rebuild_rollups(args.qr_id)
+    elif args.command == "db":
+        db(
+            args.action,
+            revision=getattr(args, "revision", None),
+            message=getattr(args, "message", None),
+            autogenerate=getattr(args, "autogenerate", False),
+        )
+    elif args.command == "partitions":
+        partitions(args.action, name=getattr(args, "name", None), fmt=getattr(args, "format", None))
+    else:
+        serve()